@@ -0,0 +1,253 @@
+"""
+Benchmarks de las rutas de código del dashboard (sin levantar Streamlit).
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Benchmarks.DashboardBenchmarks                       # datos reales
+    python -m Utils.Benchmarks.DashboardBenchmarks --synthetic 10000:500000
+    python -m Utils.Benchmarks.DashboardBenchmarks --update-baseline     # guarda la línea base
+
+Por cada ruta se reporta el tiempo (mediana y mínimo de `--repeat` corridas), el pico
+de memoria y la memoria/bloques que quedan asignados al terminar (tracemalloc). Los
+resultados se guardan en JSON y se comparan contra la línea base: si alguna ruta es
+más lenta o usa más memoria que la línea base más el umbral, el proceso termina con
+código 1 (útil en CI).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from streamlit import config as st_config
+from streamlit import logger as st_logger
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.GenMockData import generate_mock_dataset
+from Utils.Data.NgramIndex import build_ngram_index, ngram_frequencies
+from Utils.Data.Ranking import build_score_components, ranking_page, top_k_order
+from Utils.Data.SpatialAggregation import hexbin_aggregate
+from Utils.Data.TrendEngine import build_trend_rollups
+from Utils.Widgets.EmotionMap import render_map_viz
+from Utils.Widgets.Sidebar import create_sidebar_filter
+from Utils.Widgets.WordMap import ENGLISH_STOPWORDS, WORDCLOUD_MAX_WORDS, generate_ngrams
+
+# --- Variables Globales ---
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+LATEST_FILE = os.path.join(RESULTS_DIR, 'latest.json')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'baseline.json')
+
+DEFAULT_REPEAT = 3
+# Tolerancia antes de marcar una regresión (20 % sobre la línea base)
+DEFAULT_THRESHOLD = 0.20
+# Diferencias menores a esto se consideran ruido de medición
+MIN_TIME_DELTA_S = 0.005
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+# --------------------------------------------------------------------------------------
+# MEDICIÓN
+# --------------------------------------------------------------------------------------
+def measure(fn, repeat=DEFAULT_REPEAT):
+    """
+    Corre `fn` `repeat` veces para el tiempo y una vez más bajo tracemalloc para la
+    memoria (el rastreo de memoria distorsiona los tiempos, por eso va aparte).
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        current_before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        current_after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    net_blocks = sys.getallocatedblocks() - blocks_before
+    del result
+
+    return {
+        'wall_s': round(statistics.median(times), 6),
+        'wall_min_s': round(min(times), 6),
+        'peak_mb': round((peak - current_before) / 1e6, 3),
+        'retained_mb': round((current_after - current_before) / 1e6, 3),
+        'retained_blocks': net_blocks,
+    }
+
+
+# --------------------------------------------------------------------------------------
+# RUTAS DEL DASHBOARD
+# --------------------------------------------------------------------------------------
+def _count_ngrams(texts, n=1):
+    """Conteo original del Word Map: un Counter por reseña, sumados."""
+    counts = Counter()
+    for text in texts:
+        counts.update(generate_ngrams(text, n=n, stopwords=ENGLISH_STOPWORDS))
+    return counts
+
+
+def dashboard_cases(businesses, reviews, business_path, reviews_path):
+    """Rutas a medir: nombre -> función sin argumentos (devuelve su resultado)."""
+    texts = reviews['text']
+    filtered = create_sidebar_filter(businesses)
+    components = build_score_components(businesses)
+    positions = np.arange(len(businesses))
+    ngram_index = build_ngram_index(texts, ENGLISH_STOPWORDS)
+    negative_mask = (reviews['sentiment'] == 'Negativo').to_numpy()
+
+    return {
+        'load_reviews_data': lambda: data_loader.parse_reviews_csv(reviews_path, data_loader.WORD_MAP_COLUMNS),
+        'load_business_data': lambda: data_loader.parse_business_csv(business_path),
+        'generate_ngrams': lambda: _count_ngrams(texts),
+        'ngram_index_build': lambda: build_ngram_index(texts, ENGLISH_STOPWORDS),
+        'ngram_index_query': lambda: ngram_frequencies(ngram_index, 2, doc_mask=negative_mask,
+                                                       top_k=WORDCLOUD_MAX_WORDS),
+        'create_sidebar_filter': lambda: create_sidebar_filter(businesses),
+        'top_k_order': lambda: top_k_order(components, positions, 0.5, k=3),
+        'ranking_page': lambda: ranking_page(components, positions, 0.5, page=0, offset=3),
+        'render_map_viz': lambda: render_map_viz(filtered),
+        'hexbin_aggregate': lambda: hexbin_aggregate(filtered, cell_km=15),
+        'trend_rollups': lambda: build_trend_rollups(
+            reviews[['business_id', 'rating', 'sentiment', 'time_created']], businesses
+        ),
+    }
+
+
+def run_suite(businesses, reviews, business_path, reviews_path, repeat=DEFAULT_REPEAT, only=None):
+    cases = dashboard_cases(businesses, reviews, business_path, reviews_path)
+    results = {}
+    for name, fn in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, repeat)
+        print(f"  {name:<24} {results[name]['wall_s'] * 1000:>10.1f} ms  "
+              f"pico {results[name]['peak_mb']:>8.1f} MB", flush=True)
+    return results
+
+
+# --------------------------------------------------------------------------------------
+# DATASETS (reales o sintéticos escalados)
+# --------------------------------------------------------------------------------------
+def _load_real():
+    business_path = data_loader.dataset_path(data_loader.BUSINESS_FILE)
+    reviews_path = data_loader.dataset_path(data_loader.REVIEWS_FILE)
+    return (data_loader.parse_business_csv(business_path), data_loader.parse_reviews_csv(reviews_path),
+            business_path, reviews_path)
+
+
+def _load_synthetic(num_businesses, num_reviews, workdir):
+    businesses, reviews = generate_mock_dataset(num_businesses, num_reviews)
+    business_path = os.path.join(workdir, data_loader.BUSINESS_FILE)
+    reviews_path = os.path.join(workdir, data_loader.REVIEWS_FILE)
+    businesses.to_csv(business_path, index=False)
+    reviews.to_csv(reviews_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    # Se vuelven a leer para tener los mismos tipos que los datos reales
+    return (data_loader.parse_business_csv(business_path), data_loader.parse_reviews_csv(reviews_path),
+            business_path, reviews_path)
+
+
+def _parse_scale(value):
+    businesses, reviews = value.split(':')
+    return int(businesses), int(reviews)
+
+
+# --------------------------------------------------------------------------------------
+# COMPARACIÓN CONTRA LA LÍNEA BASE
+# --------------------------------------------------------------------------------------
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Lista de (dataset, ruta, métrica, base, actual) que superan la línea base + umbral."""
+    regressions = []
+    for dataset, cases in results.items():
+        for name, metrics in cases.items():
+            base = baseline.get(dataset, {}).get(name)
+            if base is None:
+                continue
+            for metric, min_delta in (('wall_s', MIN_TIME_DELTA_S), ('peak_mb', MIN_MEMORY_DELTA_MB)):
+                if metrics[metric] > base[metric] * (1 + threshold) and metrics[metric] - base[metric] > min_delta:
+                    regressions.append((dataset, name, metric, base[metric], metrics[metric]))
+    return regressions
+
+
+def _environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(payload, handle, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas de código del dashboard.")
+    parser.add_argument('--synthetic', action='append', type=_parse_scale, default=[],
+                        metavar='NEGOCIOS:RESEÑAS', help="Agrega un dataset sintético (repetible).")
+    parser.add_argument('--skip-real', action='store_true', help="No medir sobre los datasets reales.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--only', nargs='+', help="Medir solo estas rutas.")
+    parser.add_argument('--output', default=LATEST_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update-baseline', action='store_true', help="Guarda estos resultados como línea base.")
+    args = parser.parse_args()
+
+    # Fuera de `streamlit run` los widgets avisan que no hay contexto de ejecución.
+    # Leer la configuración primero evita que Streamlit restaure después el nivel de log.
+    st_config.set_option('global.showWarningOnDirectExecution', False)
+    st_logger.set_log_level('error')
+
+    results = {}
+    if not args.skip_real:
+        print("Datos reales:")
+        results['real'] = run_suite(*_load_real(), repeat=args.repeat, only=args.only)
+    for num_businesses, num_reviews in args.synthetic:
+        label = f"synthetic_{num_businesses}x{num_reviews}"
+        print(f"Datos sintéticos ({num_businesses:,} negocios, {num_reviews:,} reseñas):")
+        with tempfile.TemporaryDirectory() as workdir:
+            data = _load_synthetic(num_businesses, num_reviews, workdir)
+            results[label] = run_suite(*data, repeat=args.repeat, only=args.only)
+
+    payload = {'environment': _environment(), 'results': results}
+    _write_json(args.output, payload)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.update_baseline:
+        _write_json(args.baseline, payload)
+        print(f"Línea base actualizada: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No hay línea base para comparar (usa --update-baseline).")
+        return
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)['results']
+    regressions = find_regressions(results, baseline, args.threshold)
+    for dataset, name, metric, base, current in regressions:
+        print(f"REGRESIÓN [{dataset}] {name}.{metric}: {base} -> {current}")
+    if regressions:
+        sys.exit(1)
+    print("Sin regresiones respecto a la línea base.")
+
+
+if __name__ == '__main__':
+    main()
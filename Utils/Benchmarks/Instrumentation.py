@@ -0,0 +1,317 @@
+"""
+Instrumentación opcional por rerun del dashboard (tiempos, memoria y perfiles).
+
+Se activa con la variable de entorno SHINY_STATS_PROFILE o, si el servidor lo permite
+(SHINY_STATS_PROFILE_ALLOW_URL=1), con el parámetro de URL `?profile=...`; en un despliegue
+público la URL no puede encender tracemalloc ni escribir perfiles. El valor es una lista
+separada por comas de:
+
+    1 / timers     solo tiempos por etapa (pared y CPU)
+    memory         además, memoria asignada y pico por etapa (tracemalloc; más lento)
+    cprofile       además, un volcado de cProfile (.prof) por rerun
+    pyinstrument   además, un reporte HTML de pyinstrument por rerun (si está instalado)
+
+En PROFILE_DIR solo se conservan los últimos PROFILE_KEEP perfiles.
+
+Desactivada, `stage()` y `instrumented()` no hacen nada más que una consulta de atributo.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import streamlit as st
+
+# --- Variables Globales ---
+PROFILE_ENV_VAR = 'SHINY_STATS_PROFILE'
+PROFILE_ALLOW_URL_ENV_VAR = 'SHINY_STATS_PROFILE_ALLOW_URL'
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_MODES = ('timers', 'memory', 'cprofile', 'pyinstrument')
+PROFILE_DIR = os.environ.get('SHINY_STATS_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'shiny_stats_profiles')
+PROFILE_KEEP = 20
+
+# Reportes de reruns anteriores que se conservan por sesión
+REPORT_HISTORY = 10
+
+# Logs estructurados: una línea JSON por rerun instrumentado
+LOGGER = logging.getLogger('shiny_stats.instrumentation')
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.propagate = False
+
+# Streamlit ejecuta cada rerun en el hilo de su sesión: el registro activo es por hilo
+_state = threading.local()
+
+# tracemalloc es global al proceso: se cuenta cuántos reruns lo usan y solo se detiene
+# cuando termina el último (y solo si lo inició esta instrumentación)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users = max(_tracing_users - 1, 0)
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+# --------------------------------------------------------------------------------------
+# REGISTRO DE ETAPAS
+# --------------------------------------------------------------------------------------
+class RerunRecorder:
+    """Acumula las etapas medidas durante un rerun (en orden de inicio, con su nivel)."""
+
+    def __init__(self, modes):
+        self.modes = set(modes)
+        self.track_memory = 'memory' in self.modes
+        self.stages = []
+        self._stack = []
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.profiler = None
+        self.profile_path = None
+
+    def enter(self, name):
+        record = {'stage': name, 'depth': len(self._stack), 'wall_ms': None, 'cpu_ms': None}
+        self.stages.append(record)
+        frame = {'record': record, 'wall': time.perf_counter(), 'cpu': time.process_time(), 'child_peak': 0}
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            frame['memory'] = current
+            if self._stack:
+                # El pico de la etapa padre hasta ahora se conserva antes de reiniciarlo
+                self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+
+    def exit(self):
+        frame = self._stack.pop()
+        record = frame['record']
+        record['wall_ms'] = round((time.perf_counter() - frame['wall']) * 1000, 2)
+        record['cpu_ms'] = round((time.process_time() - frame['cpu']) * 1000, 2)
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # tracemalloc solo tiene un pico global: las etapas anidadas lo reinician,
+            # así que cada etapa conserva el máximo visto antes y dentro de sus hijas
+            peak = max(peak, frame['child_peak'])
+            record['alloc_mb'] = round((current - frame['memory']) / 1e6, 3)
+            record['peak_mb'] = round((peak - frame['memory']) / 1e6, 3)
+            if self._stack:
+                self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+            else:
+                tracemalloc.reset_peak()
+
+    def report(self):
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'cpu_ms': round((time.process_time() - self.started_cpu) * 1000, 2),
+            'modes': sorted(self.modes),
+            'stages': self.stages,
+            'profile_path': self.profile_path,
+        }
+
+
+def _active_recorder():
+    return getattr(_state, 'recorder', None)
+
+
+@contextmanager
+def _recorded_stage(recorder, name):
+    recorder.enter(name)
+    try:
+        yield
+    finally:
+        recorder.exit()
+
+
+def stage(name):
+    """Context manager que mide una etapa del rerun (sin efecto si la instrumentación está apagada)."""
+    recorder = _active_recorder()
+    if recorder is None:
+        return nullcontext()
+    return _recorded_stage(recorder, name)
+
+
+def instrumented(name=None):
+    """Decorador: mide cada llamada a la función como una etapa."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = _active_recorder()
+            if recorder is None:
+                return fn(*args, **kwargs)
+            with _recorded_stage(recorder, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------------------------------------------------------------------------------
+# CICLO DEL RERUN
+# --------------------------------------------------------------------------------------
+def _url_profiling_allowed():
+    return os.environ.get(PROFILE_ALLOW_URL_ENV_VAR, '').strip().lower() in ('1', 'true', 'on')
+
+
+def requested_modes():
+    """
+    Modos pedidos por variable de entorno o, si el servidor lo permite, por URL
+    (?profile=...); vacío si está apagada.
+    """
+    value = os.environ.get(PROFILE_ENV_VAR, '')
+    if _url_profiling_allowed():
+        try:
+            value = st.query_params.get(PROFILE_QUERY_PARAM, value)
+        except Exception:
+            pass  # Fuera de `streamlit run` no hay parámetros de URL
+    modes = {mode.strip().lower() for mode in value.split(',') if mode.strip()}
+    if not modes or modes & {'0', 'false', 'off'}:
+        return set()
+    return {mode for mode in modes if mode in PROFILE_MODES} | {'timers'}
+
+
+def begin_rerun():
+    """Inicia el registro del rerun si la instrumentación está activa; devuelve el registro o None."""
+    # Un rerun anterior interrumpido sin discard_rerun() no debe dejar recursos tomados
+    discard_rerun()
+    modes = requested_modes()
+    if not modes:
+        _state.recorder = None
+        return None
+
+    recorder = RerunRecorder(modes)
+    if recorder.track_memory:
+        _acquire_tracing()
+    if 'pyinstrument' in modes:
+        try:
+            from pyinstrument import Profiler
+            recorder.profiler = Profiler()
+        except ImportError:
+            LOGGER.warning("pyinstrument no está instalado; se usa cProfile.")
+            recorder.modes.add('cprofile')
+    if recorder.profiler is None and 'cprofile' in recorder.modes:
+        recorder.profiler = cProfile.Profile()
+    if isinstance(recorder.profiler, cProfile.Profile):
+        recorder.profiler.enable()
+    elif recorder.profiler is not None:
+        recorder.profiler.start()
+    _state.recorder = recorder
+    return recorder
+
+
+def _dump_profile(recorder):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{threading.get_ident()}"
+    if isinstance(recorder.profiler, cProfile.Profile):
+        recorder.profiler.disable()
+        path = os.path.join(PROFILE_DIR, f"rerun-{stamp}.prof")
+        recorder.profiler.dump_stats(path)
+    else:
+        recorder.profiler.stop()
+        path = os.path.join(PROFILE_DIR, f"rerun-{stamp}.html")
+        with open(path, 'w') as handle:
+            handle.write(recorder.profiler.output_html())
+    _prune_profiles()
+    return path
+
+
+def _prune_profiles(keep=PROFILE_KEEP):
+    """Borra los perfiles más viejos de PROFILE_DIR (se conservan los `keep` más recientes)."""
+    paths = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.startswith('rerun-')]
+    for path in sorted(paths, key=os.path.getmtime)[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Otra sesión ya lo borró
+
+
+def end_rerun(fragment=None):
+    """
+    Cierra el registro del rerun: guarda el perfil (si se pidió), emite un log JSON
+    y devuelve el reporte (None si la instrumentación está apagada).
+    `fragment` marca el reporte como rerun parcial de esa sección.
+    """
+    recorder = _active_recorder()
+    _state.recorder = None
+    if recorder is None:
+        return None
+    try:
+        if recorder.profiler is not None:
+            recorder.profile_path = _dump_profile(recorder)
+    finally:
+        if recorder.track_memory:
+            _release_tracing()
+
+    report = recorder.report()
+    if fragment is not None:
+        report['fragment'] = fragment
+    LOGGER.info(json.dumps(report, ensure_ascii=False))
+    history = st.session_state.setdefault('_instrumentation_history', [])
+    history.append(report)
+    del history[:-REPORT_HISTORY]
+    return report
+
+
+def discard_rerun():
+    """
+    Descarta el registro activo sin reporte (p. ej. si Streamlit interrumpió el script con
+    un rerun o un stop): detiene el perfilador y libera tracemalloc. Sin registro no hace nada.
+    """
+    recorder = _active_recorder()
+    _state.recorder = None
+    if recorder is None:
+        return
+    if isinstance(recorder.profiler, cProfile.Profile):
+        recorder.profiler.disable()
+    elif recorder.profiler is not None:
+        recorder.profiler.stop()
+    if recorder.track_memory:
+        _release_tracing()
+
+
+@contextmanager
+def section_stage(name):
+    """
+    Etapa de una sección del dashboard (st.fragment). En un rerun completo se mide
+    dentro del registro del script; en un rerun parcial de la sección el script no
+    pasa por begin_rerun(), así que la sección abre y cierra su propio registro.
+    """
+    recorder = _active_recorder()
+    if recorder is not None:
+        with _recorded_stage(recorder, name):
+            yield
+        return
+
+    recorder = begin_rerun()
+    if recorder is None:
+        yield
+        return
+    try:
+        with _recorded_stage(recorder, name):
+            yield
+    finally:
+        end_rerun(fragment=name)
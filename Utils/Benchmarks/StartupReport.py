@@ -0,0 +1,177 @@
+"""
+Reporte del arranque en frío del dashboard: tiempo de importación y de precalentamiento.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Benchmarks.StartupReport                     # solo importaciones
+    python -m Utils.Benchmarks.StartupReport --warmup            # además, pasos de Warmup.py
+    python -m Utils.Benchmarks.StartupReport --update-baseline   # guarda la línea base
+
+Las importaciones se miden en un intérprete nuevo con `python -X importtime`, importando
+los mismos módulos que importa `streamlit_app.py` (leídos de su código, sin ejecutarlo).
+Se reporta el total, el acumulado de cada módulo del dashboard y los paquetes externos
+más pesados. Si el total o algún módulo supera la línea base más el umbral, el proceso
+termina con código 1, para que una importación pesada nueva sea visible en CI.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+from Utils.Benchmarks.DashboardBenchmarks import RESULTS_DIR, _environment, _write_json
+from Utils.Data.Warmup import APP_PATH
+
+# --- Variables Globales ---
+LATEST_FILE = os.path.join(RESULTS_DIR, 'startup_latest.json')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'startup_baseline.json')
+
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.20
+# Diferencias menores a esto se consideran ruido de medición
+MIN_DELTA_MS = 25.0
+TOP_PACKAGES = 10
+
+
+# --------------------------------------------------------------------------------------
+# MEDICIÓN DE IMPORTACIONES
+# --------------------------------------------------------------------------------------
+def app_imports(app_path=APP_PATH):
+    """Módulos importados en el nivel superior de `streamlit_app.py` (en orden)."""
+    with open(app_path) as handle:
+        tree = ast.parse(handle.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def parse_importtime(stderr):
+    """Filas de `-X importtime` como [(módulo, propio_us, acumulado_us, nivel)]; nivel 0 = importado por el código."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return rows
+
+
+def measure_imports(modules, cwd=None):
+    """Importa `modules` en un intérprete nuevo y devuelve el tiempo total y el desglose."""
+    code = '; '.join(f"import {module}" for module in modules)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=cwd or os.path.dirname(APP_PATH), capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"La importación falló:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    top_level = [(name, cumulative) for name, _, cumulative, level in rows if level == 0]
+    # Tiempo propio agrupado por paquete raíz (p. ej. todo lo que cuesta matplotlib)
+    packages = {}
+    for name, self_us, _, _ in rows:
+        root = name.split('.')[0]
+        if root != 'Utils':
+            packages[root] = packages.get(root, 0) + self_us
+    app_modules = {name: cumulative / 1000 for name, cumulative in top_level if name in modules}
+    return {
+        'process_ms': round(wall_ms, 1),
+        'import_ms': round(sum(cumulative for _, cumulative in top_level) / 1000, 1),
+        'modules_ms': {name: round(ms, 1) for name, ms in app_modules.items()},
+        'packages_ms': {name: round(us / 1000, 1)
+                        for name, us in sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]},
+    }
+
+
+def startup_report(repeat=DEFAULT_REPEAT, warmup=False):
+    """Mediana de `repeat` mediciones de importación (y, opcionalmente, el precalentamiento)."""
+    modules = app_imports()
+    runs = sorted((measure_imports(modules) for _ in range(repeat)), key=lambda run: run['import_ms'])
+    report = {'imports': runs[len(runs) // 2]}
+    if warmup:
+        from Utils.Data.Warmup import warm_up
+        report['warmup'] = warm_up()
+    return report
+
+
+# --------------------------------------------------------------------------------------
+# COMPARACIÓN CONTRA LA LÍNEA BASE
+# --------------------------------------------------------------------------------------
+def find_regressions(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """Lista de (métrica, base, actual) de importación que superan la línea base + umbral."""
+    current, base = report['imports'], baseline['imports']
+    pairs = [('import_ms', base['import_ms'], current['import_ms'])]
+    pairs += [(f"modules_ms.{name}", base['modules_ms'][name], ms)
+              for name, ms in current['modules_ms'].items() if name in base['modules_ms']]
+    return [(metric, old, new) for metric, old, new in pairs
+            if new > old * (1 + threshold) and new - old > MIN_DELTA_MS]
+
+
+def print_report(report):
+    imports = report['imports']
+    print(f"Importaciones de streamlit_app.py: {imports['import_ms']:,.0f} ms "
+          f"(proceso completo: {imports['process_ms']:,.0f} ms)")
+    print("  Módulos del dashboard (acumulado):")
+    for name, ms in sorted(imports['modules_ms'].items(), key=lambda item: -item[1]):
+        print(f"    {name:<45} {ms:>8.1f} ms")
+    print("  Paquetes externos más pesados (tiempo propio):")
+    for name, ms in imports['packages_ms'].items():
+        print(f"    {name:<45} {ms:>8.1f} ms")
+    if 'warmup' in report:
+        print(f"Precalentamiento: {report['warmup']['total_ms']:,.0f} ms")
+        for step in report['warmup']['steps']:
+            print(f"    {step['step']:<55} {step['wall_ms']:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío del dashboard.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--warmup', action='store_true', help="Mide también los pasos de precalentamiento.")
+    parser.add_argument('--output', default=LATEST_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update-baseline', action='store_true', help="Guarda estos resultados como línea base.")
+    args = parser.parse_args()
+
+    if args.warmup:
+        from streamlit import config as st_config
+        from streamlit import logger as st_logger
+        st_config.set_option('global.showWarningOnDirectExecution', False)
+        st_logger.set_log_level('error')
+
+    report = startup_report(args.repeat, args.warmup)
+    print_report(report)
+    payload = {'environment': _environment(), 'results': report}
+    _write_json(args.output, payload)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.update_baseline:
+        _write_json(args.baseline, payload)
+        print(f"Línea base actualizada: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No hay línea base para comparar (usa --update-baseline).")
+        return
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)['results']
+    regressions = find_regressions(report, baseline, args.threshold)
+    for metric, base, current in regressions:
+        print(f"REGRESIÓN {metric}: {base} -> {current} ms")
+    if regressions:
+        sys.exit(1)
+    print("Sin regresiones respecto a la línea base.")
+
+
+if __name__ == '__main__':
+    main()
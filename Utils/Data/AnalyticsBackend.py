@@ -0,0 +1,467 @@
+"""
+Backend analítico opcional: los datasets cargados en una base embebida (DuckDB o SQLite)
+para resolver en SQL los filtros de la barra lateral, el ranking del leaderboard, las
+frecuencias del Word Map, los conteos de reseñas por negocio (KPIs y mapa de calor) y los
+agregados diarios de tendencias, sin mantener las reseñas en la memoria de cada proceso.
+
+Se activa con la variable de entorno SHINY_STATS_BACKEND=duckdb (o =sqlite). Si DuckDB
+no está instalado se usa SQLite (incluido en Python). La base se construye la primera vez
+en `Datasets/indexes/analytics.<motor>` y se reconstruye sola si cambian los datasets o
+las stopwords; también se puede preparar antes de desplegar:
+
+    python -m Utils.Data.AnalyticsBackend build --engine duckdb
+
+Tablas (índices entre paréntesis):
+    businesses       (sentiment + rating, city, business_id)  pos = posición en el dataset cargado
+    reviews          (business_id, sentiment + rating)
+    business_ngrams  (n + sentiment + business_id)  frecuencia de cada n-grama por negocio y sentimiento
+    ngram_terms      (n + term_id)
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, INDEX_DIR, NGRAM_SIZES, build_ngram_index, stopwords_version
+from Utils.Data.ProcessCache import process_cache
+from Utils.Data.Ranking import MAX_RATING, MIN_RATING, SENTIMENT_TO_SCORE
+
+# --- Variables Globales ---
+BACKEND_ENV_VAR = 'SHINY_STATS_BACKEND'
+ENGINES = ('duckdb', 'sqlite')
+ANALYTICS_DB_FILE = 'analytics.{engine}'
+# Cambia si cambia el esquema de las tablas (obliga a reconstruir)
+SCHEMA_VERSION = 1
+BUILD_CHUNK_ROWS = 100_000
+
+TABLES = {
+    'businesses': [
+        ('pos', 'INTEGER'), ('business_id', 'VARCHAR'), ('name', 'VARCHAR'), ('city', 'VARCHAR'),
+        ('rating', 'DOUBLE'), ('review_count', 'INTEGER'), ('sentiment', 'VARCHAR'),
+        ('rating_norm', 'DOUBLE'), ('sentiment_score', 'DOUBLE'),
+    ],
+    'reviews': [
+        ('review_id', 'VARCHAR'), ('business_id', 'VARCHAR'), ('rating', 'INTEGER'),
+        ('sentiment', 'VARCHAR'), ('time_created', 'TIMESTAMP'), ('text', 'VARCHAR'),
+    ],
+    'business_ngrams_stage': [
+        ('business_id', 'VARCHAR'), ('sentiment', 'VARCHAR'), ('n', 'INTEGER'),
+        ('term_id', 'INTEGER'), ('frequency', 'INTEGER'),
+    ],
+    'ngram_terms': [('n', 'INTEGER'), ('term_id', 'INTEGER'), ('term', 'VARCHAR')],
+    'meta': [('key', 'VARCHAR'), ('value', 'VARCHAR')],
+}
+INDEXES = {
+    'idx_businesses_filter': ('businesses', ('sentiment', 'rating')),
+    'idx_businesses_city': ('businesses', ('city',)),
+    'idx_businesses_id': ('businesses', ('business_id',)),
+    'idx_reviews_business': ('reviews', ('business_id',)),
+    'idx_reviews_filter': ('reviews', ('sentiment', 'rating')),
+    'idx_business_ngrams': ('business_ngrams', ('n', 'sentiment', 'business_id')),
+    'idx_ngram_terms': ('ngram_terms', ('n', 'term_id')),
+}
+
+# Conexiones por hilo (cada sesión de Streamlit corre en su propio hilo)
+_connections = threading.local()
+
+
+# --------------------------------------------------------------------------------------
+# MOTOR Y CONEXIONES
+# --------------------------------------------------------------------------------------
+def _duckdb_available():
+    try:
+        import duckdb  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def requested_engine():
+    """Motor pedido por SHINY_STATS_BACKEND (None = widgets en memoria, como siempre)."""
+    engine = os.environ.get(BACKEND_ENV_VAR, '').strip().lower()
+    if engine not in ENGINES:
+        return None
+    if engine == 'duckdb' and not _duckdb_available():
+        return 'sqlite'
+    return engine
+
+
+def analytics_db_path(engine):
+    return os.path.join(INDEX_DIR, ANALYTICS_DB_FILE.format(engine=engine))
+
+
+def _connect(engine, path, read_only=True):
+    if engine == 'duckdb':
+        import duckdb
+        return duckdb.connect(path, read_only=read_only)
+    import sqlite3
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    return sqlite3.connect(path)
+
+
+def _connection(backend):
+    """Conexión de solo lectura del hilo actual (se reabre si la base se reconstruyó)."""
+    key = (backend['path'], backend['signature'])
+    cached = getattr(_connections, 'cached', None)
+    if cached is None or cached[0] != key:
+        if cached is not None:
+            cached[1].close()
+        cached = (key, _connect(backend['engine'], backend['path']))
+        _connections.cached = cached
+    return cached[1]
+
+
+def _query_df(con, engine, sql, params=()):
+    if engine == 'duckdb':
+        return con.execute(sql, list(params)).df()
+    return pd.read_sql_query(sql, con, params=list(params))
+
+
+def _insert_df(con, engine, table, df):
+    """Agrega un DataFrame (columnas en el orden de TABLES) a una tabla."""
+    if df.empty:
+        return
+    # Faltantes como NULL (las columnas de texto traen NaN de pandas)
+    text_columns = df.columns[df.dtypes == object]
+    df = df.assign(**{col: df[col].where(df[col].notna(), None) for col in text_columns})
+    if engine == 'duckdb':
+        con.register('insert_frame', df)
+        con.execute(f"INSERT INTO {table} SELECT * FROM insert_frame")
+        con.unregister('insert_frame')
+    else:
+        # SQLite guarda las fechas como texto ISO
+        date_columns = df.columns[[kind.kind == 'M' for kind in df.dtypes]]
+        df = df.assign(**{col: df[col].dt.strftime('%Y-%m-%d %H:%M:%S') for col in date_columns})
+        placeholders = ', '.join('?' * len(df.columns))
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        con.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+
+@contextmanager
+def _scope_table(con, engine, values):
+    """Tabla temporal con los valores de un filtro de pertenencia (posiciones o ids)."""
+    frame = pd.DataFrame({'value': values})
+    if engine == 'duckdb':
+        con.register('scope_values', frame)
+        try:
+            yield 'scope_values'
+        finally:
+            con.unregister('scope_values')
+    else:
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS scope_values (value)")
+        con.execute("DELETE FROM scope_values")
+        con.executemany("INSERT INTO scope_values VALUES (?)", ((value,) for value in frame['value'].tolist()))
+        yield 'scope_values'
+
+
+# --------------------------------------------------------------------------------------
+# CONSTRUCCIÓN (por bloques de reseñas: memoria acotada sin importar el tamaño del CSV)
+# --------------------------------------------------------------------------------------
+def source_signature(stopwords_ver):
+    """Firma de los datos de origen de la base (datasets, stopwords y versión del esquema)."""
+    return json.dumps({
+        'businesses': data_loader.dataset_signature(data_loader.BUSINESS_FILE),
+        'reviews': data_loader.dataset_signature(data_loader.REVIEWS_FILE),
+        'stopwords': stopwords_ver,
+        'schema': SCHEMA_VERSION,
+    })
+
+
+def stored_signature(engine, path):
+    """Firma guardada en una base existente (None si no existe o no se puede leer)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        con = _connect(engine, path)
+        try:
+            rows = con.execute("SELECT value FROM meta WHERE key = 'signature'").fetchall()
+        finally:
+            con.close()
+    except Exception:
+        return None
+    return rows[0][0] if rows else None
+
+
+def _business_rows(businesses):
+    sentiment = businesses['sentiment'].astype(object)
+    rating = businesses['rating'].astype(np.float64)
+    return pd.DataFrame({
+        'pos': np.arange(len(businesses), dtype=np.int64),
+        'business_id': businesses['business_id'].astype(object),
+        'name': businesses['name'].astype(object),
+        'city': businesses['city'].astype(object),
+        'rating': rating,
+        'review_count': businesses['review_count'].astype(np.int64),
+        'sentiment': sentiment,
+        'rating_norm': (rating - MIN_RATING) / (MAX_RATING - MIN_RATING),
+        'sentiment_score': sentiment.map(SENTIMENT_TO_SCORE).astype(np.float64),
+    })
+
+
+def _chunk_ngram_rows(chunk, stopwords, vocabularies):
+    """Frecuencias (negocio, sentimiento, n, término) de un bloque, con ids de término globales."""
+    chunk_index = build_ngram_index(chunk['text'].tolist(), stopwords)
+    business_codes, business_ids = pd.factorize(chunk['business_id'])
+    sentiment_codes = chunk['sentiment'].cat.codes.to_numpy()
+    frames = []
+    for n in NGRAM_SIZES:
+        matrix = chunk_index[n]
+        vocabulary = vocabularies[n]
+        global_ids = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in matrix['vocab'].tolist()),
+                                 dtype=np.int64, count=len(matrix['vocab']))
+        entries = pd.DataFrame({
+            'business': business_codes[matrix['rows']],
+            'sentiment': sentiment_codes[matrix['rows']],
+            'term_id': global_ids[matrix['term_ids']],
+            'frequency': matrix['counts'].astype(np.int64),
+        })
+        grouped = entries.groupby(['business', 'sentiment', 'term_id'], sort=False)['frequency'].sum().reset_index()
+        sentiments = np.array([None] + data_loader.SENTIMENT_CATEGORIES, dtype=object)
+        frames.append(pd.DataFrame({
+            'business_id': np.asarray(business_ids, dtype=object)[grouped['business']],
+            'sentiment': sentiments[grouped['sentiment'] + 1],
+            'n': n,
+            'term_id': grouped['term_id'].to_numpy(),
+            'frequency': grouped['frequency'].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_analytics_db(engine, path, stopwords, signature=None, chunk_rows=BUILD_CHUNK_ROWS):
+    """Construye la base completa en un archivo temporal y la publica con un rename atómico."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = _connect(engine, tmp_path, read_only=False)
+    try:
+        for table, columns in TABLES.items():
+            con.execute(f"CREATE TABLE {table} ({', '.join(f'{name} {kind}' for name, kind in columns)})")
+
+        _insert_df(con, engine, 'businesses', _business_rows(data_loader.load_business_data()))
+
+        vocabularies = {n: {} for n in NGRAM_SIZES}
+        columns = ('review_id', 'business_id', 'rating', 'sentiment', 'time_created', 'text')
+        for chunk in data_loader.iter_reviews_chunks(columns=columns, chunk_rows=chunk_rows):
+            reviews = chunk[list(columns)].astype({'review_id': object, 'business_id': object,
+                                                   'rating': np.int64, 'sentiment': object, 'text': object})
+            _insert_df(con, engine, 'reviews', reviews)
+            _insert_df(con, engine, 'business_ngrams_stage', _chunk_ngram_rows(chunk, stopwords, vocabularies))
+
+        # Un negocio puede aparecer en varios bloques: se suma una vez al final, dentro de la base
+        con.execute("""
+            CREATE TABLE business_ngrams AS
+            SELECT business_id, sentiment, n, term_id, SUM(frequency) AS frequency
+            FROM business_ngrams_stage GROUP BY business_id, sentiment, n, term_id
+        """)
+        con.execute("DROP TABLE business_ngrams_stage")
+        for n, vocabulary in vocabularies.items():
+            _insert_df(con, engine, 'ngram_terms', pd.DataFrame({
+                'n': n, 'term_id': np.arange(len(vocabulary), dtype=np.int64), 'term': list(vocabulary),
+            }))
+
+        for name, (table, columns) in INDEXES.items():
+            con.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+        con.execute("INSERT INTO meta VALUES ('signature', ?)", [signature or source_signature(stopwords_version(stopwords))])
+        con.execute("INSERT INTO meta VALUES ('built_at', ?)", [time.strftime('%Y-%m-%dT%H:%M:%S')])
+        if engine == 'sqlite':
+            con.commit()
+            con.execute("ANALYZE")
+    finally:
+        con.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+@process_cache(max_entries=2)
+def _cached_backend(engine, signature, _stopwords):
+    path = analytics_db_path(engine)
+    if stored_signature(engine, path) != signature:
+        build_analytics_db(engine, path, _stopwords, signature)
+    return {'engine': engine, 'path': path, 'signature': signature}
+
+
+def get_analytics_backend(stopwords):
+    """
+    Backend activo ({engine, path, signature}) o None si SHINY_STATS_BACKEND no lo pide.
+    La base se construye (o reconstruye) una sola vez por versión de los datos.
+    """
+    engine = requested_engine()
+    if engine is None:
+        return None
+    return _cached_backend(engine, source_signature(stopwords_version(stopwords)), stopwords)
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTAS (filtros y agregaciones resueltos dentro de la base)
+# --------------------------------------------------------------------------------------
+def _business_filter_sql(filters):
+    """WHERE de los filtros de la barra lateral (sentimiento y rango de rating)."""
+    sentiments = list(filters['sentiments'])
+    if not sentiments:
+        return "1 = 0", []
+    placeholders = ', '.join('?' * len(sentiments))
+    sql = f"sentiment IN ({placeholders}) AND rating BETWEEN ? AND ?"
+    return sql, sentiments + [float(filters['min_rating']), float(filters['max_rating'])]
+
+
+def filter_positions_sql(backend, filters):
+    """Posiciones (ordenadas) de los negocios que cumplen los filtros de la barra lateral."""
+    con = _connection(backend)
+    where, params = _business_filter_sql(filters)
+    positions = _query_df(con, backend['engine'], f"SELECT pos FROM businesses WHERE {where} ORDER BY pos", params)
+    positions = positions['pos'].to_numpy(dtype=np.int64)
+    if filters.get('location_positions') is not None:
+        positions = np.intersect1d(positions, filters['location_positions'], assume_unique=True)
+    return positions
+
+
+def ranking_sql(backend, filters, sentiment_weight=0.5, limit=50, offset=0):
+    """
+    Lugares [offset, offset + limit) del ranking de los negocios filtrados, con el mismo
+    score y desempate que Ranking.top_k_order (score, total de reseñas, orden original).
+    El índice del resultado es la posición de cada negocio en el dataset.
+    """
+    con = _connection(backend)
+    where, params = _business_filter_sql(filters)
+    sql = f"""
+        SELECT pos, business_id, name, rating, sentiment, review_count, ranking_score FROM (
+            SELECT pos, business_id, name, rating, sentiment, review_count,
+                   ROUND((rating_norm * (1 - ?) + sentiment_score * ?) * 100, 1) AS ranking_score
+            FROM businesses WHERE {where} {{location}}
+        ) ranked
+        ORDER BY ranking_score IS NULL, ranking_score DESC, review_count DESC, pos ASC
+        LIMIT ? OFFSET ?
+    """
+    params = [sentiment_weight, sentiment_weight] + params + [int(limit), int(offset)]
+    location = filters.get('location_positions')
+    if location is None:
+        rows = _query_df(con, backend['engine'], sql.format(location=''), params)
+    else:
+        with _scope_table(con, backend['engine'], np.asarray(location, dtype=np.int64)) as scope:
+            rows = _query_df(con, backend['engine'], sql.format(location=f"AND pos IN (SELECT value FROM {scope})"), params)
+    return rows.set_index('pos')
+
+
+def ngram_frequencies_sql(backend, n, sentiment=None, business_ids=None, top_k=None):
+    """{n-grama: frecuencia} de las reseñas del sentimiento y negocios dados (None = todos)."""
+    con = _connection(backend)
+    clauses, params = ["g.n = ?"], [int(n)]
+    if sentiment is not None:
+        clauses.append("g.sentiment = ?")
+        params.append(sentiment)
+    sql = f"""
+        SELECT t.term, totals.frequency FROM (
+            SELECT g.term_id, SUM(g.frequency) AS frequency FROM business_ngrams g
+            WHERE {' AND '.join(clauses)} {{scope}}
+            GROUP BY g.term_id ORDER BY frequency DESC {'LIMIT ?' if top_k else ''}
+        ) totals
+        JOIN ngram_terms t ON t.n = ? AND t.term_id = totals.term_id
+    """
+    params += ([int(top_k)] if top_k else []) + [int(n)]
+    if business_ids is None:
+        rows = _query_df(con, backend['engine'], sql.format(scope=''), params)
+    else:
+        with _scope_table(con, backend['engine'], np.asarray(business_ids, dtype=object)) as scope:
+            rows = _query_df(con, backend['engine'],
+                             sql.format(scope=f"AND g.business_id IN (SELECT value FROM {scope})"), params)
+    return dict(zip(rows['term'].tolist(), rows['frequency'].astype(int).tolist()))
+
+
+def _sentiment_sums_sql():
+    """Columnas SUM(...) con el número de reseñas de cada sentimiento (parámetros en orden)."""
+    columns = ', '.join(f"SUM(CASE WHEN sentiment = ? THEN 1 ELSE 0 END) AS {name}"
+                        for name in ('positive', 'neutral', 'negative'))
+    return columns, list(data_loader.SENTIMENT_CATEGORIES)
+
+
+def review_sentiment_counts_sql(backend):
+    """
+    Reseñas positivas/neutrales/negativas por negocio (mismo formato que
+    SentimentAggregation.count_review_sentiments: índice business_id, reseñas únicas).
+    """
+    sums, params = _sentiment_sums_sql()
+    counts = _query_df(_connection(backend), backend['engine'], f"""
+        SELECT business_id, {sums} FROM (SELECT DISTINCT review_id, business_id, sentiment FROM reviews) unique_reviews
+        GROUP BY business_id
+    """, params)
+    counts = counts.set_index('business_id').astype(np.int64)
+    counts.columns = ['positive_reviews', 'neutral_reviews', 'negative_reviews']
+    return counts
+
+
+def trend_daily_sql(backend):
+    """
+    Medidas de TrendEngine (reseñas, reseñas con rating, suma de rating y conteo por
+    sentimiento) por negocio y día, para construir los rollups sin leer las reseñas
+    (filas con fecha solamente).
+    """
+    day = "CAST(time_created AS DATE)" if backend['engine'] == 'duckdb' else "DATE(time_created)"
+    sums, params = _sentiment_sums_sql()
+    daily = _query_df(_connection(backend), backend['engine'], f"""
+        SELECT business_id, {day} AS day, COUNT(*) AS reviews, COUNT(rating) AS rated,
+               SUM(COALESCE(rating, 0)) AS rating_sum, {sums}
+        FROM reviews WHERE time_created IS NOT NULL
+        GROUP BY business_id, {day}
+    """, params)
+    daily['day'] = pd.to_datetime(daily['day'])
+    return daily
+
+
+def complaint_inputs_sql(backend, ngram_sizes):
+    """
+    Entradas de ComplaintEngine desde `business_ngrams`: (entradas negativas por n,
+    frecuencias del corpus por n, business_ids, term_lookup), sin leer reseñas.
+    """
+    con = _connection(backend)
+    entries, backgrounds, business_codes = {}, {}, {}
+    for n in ngram_sizes:
+        negative = _query_df(con, backend['engine'], """
+            SELECT business_id, term_id, frequency FROM business_ngrams WHERE n = ? AND sentiment = ?
+        """, [int(n), 'Negativo'])
+        corpus = _query_df(con, backend['engine'], """
+            SELECT term_id, SUM(frequency) AS frequency FROM business_ngrams WHERE n = ? GROUP BY term_id
+        """, [int(n)])
+        term_ids = corpus['term_id'].to_numpy(dtype=np.int64)
+        backgrounds[n] = np.bincount(term_ids, weights=corpus['frequency'].to_numpy(dtype=np.float64),
+                                     minlength=int(term_ids.max()) + 1 if len(term_ids) else 0)
+        codes = np.fromiter((business_codes.setdefault(business_id, len(business_codes))
+                             for business_id in negative['business_id'].tolist()),
+                            dtype=np.int64, count=len(negative))
+        entries[n] = (codes, negative['term_id'].to_numpy(dtype=np.int64),
+                      negative['frequency'].to_numpy(dtype=np.float64))
+
+    def term_lookup(n, ids):
+        with _scope_table(con, backend['engine'], np.asarray(ids, dtype=np.int64)) as scope:
+            terms = _query_df(con, backend['engine'], f"""
+                SELECT term_id, term FROM ngram_terms WHERE n = ? AND term_id IN (SELECT value FROM {scope})
+            """, [int(n)])
+        return pd.Series(terms['term'].to_numpy(), index=terms['term_id'].to_numpy()).reindex(ids).to_numpy()
+
+    return entries, backgrounds, np.array(list(business_codes), dtype=object), term_lookup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye la base analítica embebida (DuckDB o SQLite).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Construye (o reconstruye) la base a partir de 'Datasets/'.")
+    build.add_argument('--engine', choices=ENGINES, default='duckdb' if _duckdb_available() else 'sqlite')
+    build.add_argument('--chunk-rows', type=int, default=BUILD_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    path = build_analytics_db(args.engine, analytics_db_path(args.engine), ENGLISH_STOPWORDS,
+                              chunk_rows=args.chunk_rows)
+    print(f"Base {args.engine} en {path} ({os.path.getsize(path) / 1e6:.1f} MB, "
+          f"{time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
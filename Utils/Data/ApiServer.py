@@ -0,0 +1,431 @@
+"""
+Servicio HTTP/JSON local con las consultas del dashboard (Queries.py), para reportes por
+lotes y otros tableros que no pasan por Streamlit.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.ApiServer --port 8787 [--cache-entries 512] [--warmup]
+    curl 'http://127.0.0.1:8787/v1/ranking?sentiments=Positivo,Neutral&city=Orlando&radius_km=30&limit=10'
+
+Rutas (GET, respuesta JSON):
+
+    /v1/health       estado, firmas de los datasets y estadísticas del caché
+    /v1/businesses   negocios filtrados, paginados (limit, offset)
+    /v1/ranking      ranking combinado (sentiment_weight, limit, offset)
+    /v1/ngrams       n-gramas más frecuentes (n, sentiment, top_k); solo usa el filtro de ubicación
+    /v1/map          celdas hexagonales (mode=hexbin|heatmap, cell_km)
+    /v1/kpis         negocios, rating promedio, mezcla de sentimiento y reseñas por ciudad
+
+Filtros comunes: sentiments (separados por comas), min_rating, max_rating, city, radius_km.
+
+Las respuestas se guardan en un caché LRU compartido por todos los clientes, con llave
+(ruta, parámetros normalizados, firmas de los datasets): la misma consulta desde otro
+tablero o trabajo por lotes se responde sin recalcular, y un dataset nuevo en disco
+cambia la firma (las respuestas viejas salen del caché por LRU). Si varios clientes piden
+a la vez una consulta que no está en caché, se calcula una sola vez. Los datos e índices
+(ProcessCache.process_cache) también son del proceso, así que un solo proceso caliente atiende a todos.
+Con SHINY_STATS_BACKEND=duckdb|sqlite las consultas se resuelven en el backend analítico.
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.AnalyticsBackend import get_analytics_backend
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, NGRAM_SIZES
+from Utils.Data.Queries import (
+    DEFAULT_CELL_KM,
+    MAP_AGGREGATES,
+    MAX_RATING_FILTER,
+    MIN_RATING_FILTER,
+    business_filters,
+    business_kpis,
+    city_centers,
+    filter_business_positions,
+    location_positions,
+    map_cells,
+    ranked_businesses,
+    review_ngram_frequencies,
+)
+from Utils.Data.Ranking import get_score_components
+
+# --- Variables Globales ---
+DEFAULT_PORT = 8787
+DEFAULT_CACHE_ENTRIES = 512
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+DEFAULT_TOP_K = 100
+DEFAULT_RADIUS_KM = 25.0
+
+BUSINESS_COLUMNS = ['business_id', 'name', 'city', 'latitude', 'longitude', 'rating', 'review_count', 'sentiment']
+RANKING_COLUMNS = ['Rank', 'business_id', 'name', 'rating', 'sentiment', 'review_count', 'ranking_score']
+
+
+class ApiError(Exception):
+    """Error de la petición (se responde con `status` y no se guarda en caché)."""
+
+    def __init__(self, status, code, description):
+        super().__init__(description)
+        self.status = status
+        self.code = code
+        self.description = description
+
+
+# --------------------------------------------------------------------------------------
+# CACHÉ DE RESPUESTAS (compartido entre clientes)
+# --------------------------------------------------------------------------------------
+class ResponseCache:
+    """Caché LRU de respuestas ya serializadas, seguro entre hilos."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return body
+
+    def get_or_compute(self, key, compute):
+        """
+        Devuelve (cuerpo, hit). Si la llave no está, `compute()` la calcula; los clientes que
+        pidan la misma llave mientras tanto esperan ese resultado en lugar de repetirlo.
+        """
+        with self._lock:
+            body = self._lookup(key)
+            if body is not None:
+                return body, True
+            key_lock = self._pending.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                body = self._lookup(key)
+                if body is not None:
+                    return body, True
+                self.stats['misses'] += 1
+            try:
+                body = compute()
+                with self._lock:
+                    self._entries[key] = body
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.stats['evictions'] += 1
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return body, False
+
+    def info(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'bytes': sum(len(body) for body in self._entries.values()), **self.stats}
+
+
+# --------------------------------------------------------------------------------------
+# DATOS DEL SERVICIO
+# --------------------------------------------------------------------------------------
+class AnalyticsService:
+    """Acceso a los datasets (recargados solos si cambian en disco) y al backend opcional."""
+
+    def __init__(self, stopwords=ENGLISH_STOPWORDS):
+        self.stopwords = stopwords
+
+    def snapshot(self):
+        """
+        Datos con que se responde una petición. Como streamlit_app.py en cada rerun, el
+        backend se vuelve a pedir: si los datasets cambiaron, la base se reconstruye y su firma
+        (parte de la llave del caché) cambia.
+        """
+        return DataSnapshot(get_analytics_backend(self.stopwords))
+
+
+class DataSnapshot:
+    """Datasets y backend ya resuelto de una petición (mismos datos para la firma y la respuesta)."""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def businesses(self):
+        return data_loader.load_business_data(), data_loader.dataset_signature(data_loader.BUSINESS_FILE)
+
+    def reviews(self):
+        """Reseñas en memoria (None con el backend analítico, que ya tiene los n-gramas)."""
+        if self.backend is not None:
+            return None
+        return data_loader.load_reviews_data(columns=data_loader.WORD_MAP_COLUMNS)
+
+    def signature(self):
+        """Firma de los datos con que se responde: forma parte de la llave del caché."""
+        if self.backend is not None:
+            return ('backend', self.backend['engine'], self.backend['signature'])
+        return (data_loader.dataset_signature(data_loader.BUSINESS_FILE),
+                data_loader.dataset_signature(data_loader.REVIEWS_FILE))
+
+
+def _records(df):
+    """Filas como lista de diccionarios JSON (NaN -> null, tipos de numpy -> nativos)."""
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+
+# --------------------------------------------------------------------------------------
+# PARÁMETROS (validados y normalizados: forman la llave del caché)
+# --------------------------------------------------------------------------------------
+def _number(params, name, default, cast, minimum=None, maximum=None):
+    raw = params.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ApiError(400, 'INVALID_PARAMETER', f"'{name}' debe ser numérico (recibido: {raw!r}).")
+    # NaN no falla ninguna comparación con los límites: se rechazan NaN e infinitos aquí
+    if not math.isfinite(value):
+        raise ApiError(400, 'INVALID_PARAMETER', f"'{name}' debe ser un número finito (recibido: {raw!r}).")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ApiError(400, 'INVALID_PARAMETER', f"'{name}' debe estar entre {minimum} y {maximum}.")
+    return value
+
+
+def _sentiment_list(raw):
+    if raw is None or raw == '':
+        return tuple(data_loader.SENTIMENT_CATEGORIES)
+    requested = {value.strip().title() for value in raw.split(',') if value.strip()}
+    unknown = requested - set(data_loader.SENTIMENT_CATEGORIES)
+    if unknown:
+        raise ApiError(400, 'INVALID_PARAMETER', f"Sentimientos desconocidos: {', '.join(sorted(unknown))}.")
+    # Orden canónico: el mismo filtro escrito en otro orden comparte la entrada del caché
+    return tuple(value for value in data_loader.SENTIMENT_CATEGORIES if value in requested)
+
+
+def _location_query(params):
+    city = params.get('city') or None
+    # Sin ciudad el radio no cambia la respuesta: no debe separar entradas del caché
+    radius_km = _number(params, 'radius_km', DEFAULT_RADIUS_KM, float, 0.0, 1000.0) if city else None
+    return {'city': city, 'radius_km': radius_km}
+
+
+def _filter_query(params):
+    return {
+        'sentiments': _sentiment_list(params.get('sentiments')),
+        'min_rating': _number(params, 'min_rating', MIN_RATING_FILTER, float, MIN_RATING_FILTER, MAX_RATING_FILTER),
+        'max_rating': _number(params, 'max_rating', MAX_RATING_FILTER, float, MIN_RATING_FILTER, MAX_RATING_FILTER),
+        **_location_query(params),
+    }
+
+
+def _page_query(params):
+    return {
+        **_filter_query(params),
+        'limit': _number(params, 'limit', DEFAULT_LIMIT, int, 1, MAX_LIMIT),
+        'offset': _number(params, 'offset', 0, int, 0),
+    }
+
+
+def _ranking_query(params):
+    return {**_page_query(params), 'sentiment_weight': _number(params, 'sentiment_weight', 0.5, float, 0.0, 1.0)}
+
+
+def _ngram_query(params):
+    sentiment = params.get('sentiment') or None
+    if sentiment is not None:
+        sentiment = sentiment.strip().title()
+        if sentiment not in data_loader.SENTIMENT_CATEGORIES:
+            raise ApiError(400, 'INVALID_PARAMETER', f"Sentimiento desconocido: {sentiment}.")
+    return {
+        'n': _number(params, 'n', 1, int, min(NGRAM_SIZES), max(NGRAM_SIZES)),
+        'sentiment': sentiment,
+        'top_k': _number(params, 'top_k', DEFAULT_TOP_K, int, 1, MAX_LIMIT),
+        **_location_query(params),
+    }
+
+
+def _map_query(params):
+    mode = params.get('mode') or MAP_AGGREGATES[0]
+    if mode not in MAP_AGGREGATES:
+        raise ApiError(400, 'INVALID_PARAMETER', f"'mode' debe ser uno de: {', '.join(MAP_AGGREGATES)}.")
+    return {**_filter_query(params), 'mode': mode, 'cell_km': _number(params, 'cell_km', DEFAULT_CELL_KM, float, 1.0, 500.0)}
+
+
+# --------------------------------------------------------------------------------------
+# RESPUESTAS
+# --------------------------------------------------------------------------------------
+def _location(df, signature, query):
+    """Posiciones del filtro de ubicación (None = sin filtro); una ciudad desconocida es un error."""
+    if query['city'] is None:
+        return None
+    if query['city'] not in city_centers(df, signature):
+        raise ApiError(400, 'UNKNOWN_CITY', f"Ciudad sin negocios: {query['city']}.")
+    return location_positions(df, query['city'], query['radius_km'], signature)
+
+
+def _filtered_positions(data, query):
+    df, signature = data.businesses()
+    filters = business_filters(query['sentiments'], query['min_rating'], query['max_rating'],
+                               _location(df, signature, query))
+    return df, signature, filters, filter_business_positions(df, filters, signature, data.backend)
+
+
+def businesses_payload(data, query):
+    df, _, _, positions = _filtered_positions(data, query)
+    page = positions[query['offset']:query['offset'] + query['limit']]
+    rows = df.take(page)[[col for col in BUSINESS_COLUMNS if col in df.columns]]
+    return {'total': int(len(positions)), 'offset': query['offset'], 'businesses': _records(rows)}
+
+
+def ranking_payload(data, query):
+    df, signature, filters, positions = _filtered_positions(data, query)
+    components = None if data.backend is not None else get_score_components(df, signature)
+    rows = ranked_businesses(df, components, positions, query['sentiment_weight'],
+                             limit=query['limit'], offset=query['offset'], backend=data.backend, filters=filters)
+    rows = rows[[col for col in RANKING_COLUMNS if col in rows.columns]].rename(columns={'Rank': 'rank'})
+    return {'total': int(len(positions)), 'offset': query['offset'], 'ranking': _records(rows)}
+
+
+def ngrams_payload(data, query):
+    df, signature = data.businesses()
+    positions = _location(df, signature, query)
+    business_ids = None if positions is None else df['business_id'].to_numpy()[positions]
+    frequencies = review_ngram_frequencies(data.reviews(), query['n'], query['sentiment'], business_ids,
+                                           top_k=query['top_k'], backend=data.backend)
+    return {'n': query['n'], 'sentiment': query['sentiment'],
+            'terms': [{'term': term, 'frequency': int(count)}
+                      for term, count in sorted(frequencies.items(), key=lambda item: -item[1])]}
+
+
+def map_payload(data, query):
+    df, _, _, positions = _filtered_positions(data, query)
+    cells = map_cells(df.take(positions), query['mode'], query['cell_km'], data.backend)
+    return {'mode': query['mode'], 'cell_km': query['cell_km'], 'businesses': int(len(positions)),
+            'cells': _records(cells)}
+
+
+def kpis_payload(data, query):
+    df, signature = data.businesses()
+    filters = business_filters(query['sentiments'], query['min_rating'], query['max_rating'],
+                               _location(df, signature, query))
+    summary = business_kpis(df, filters, signature, data.backend)
+    totals = {key: value for key, value in summary.items() if key != 'by_city'}
+    return {**totals, 'cities': _records(summary['by_city'].reset_index())}
+
+
+ROUTES = {
+    '/v1/businesses': (_page_query, businesses_payload),
+    '/v1/ranking': (_ranking_query, ranking_payload),
+    '/v1/ngrams': (_ngram_query, ngrams_payload),
+    '/v1/map': (_map_query, map_payload),
+    '/v1/kpis': (_filter_query, kpis_payload),
+}
+
+
+# --------------------------------------------------------------------------------------
+# SERVIDOR
+# --------------------------------------------------------------------------------------
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Sin una línea de log por petición
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, description):
+        self._send(status, json.dumps({'error': {'code': code, 'description': description}},
+                                      ensure_ascii=False).encode('utf-8'))
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if path != '/v1/health' and path not in ROUTES:
+            return self._error(404, 'NOT_FOUND', f"Ruta desconocida. Rutas: /v1/health, {', '.join(ROUTES)}.")
+
+        started = time.perf_counter()
+        try:
+            data = server.service.snapshot()
+            if path == '/v1/health':
+                payload = {'status': 'ok', 'backend': data.backend['engine'] if data.backend else None,
+                           'signature': repr(data.signature()), 'cache': server.cache.info()}
+                return self._send(200, json.dumps(payload).encode('utf-8'), {'X-Cache': 'BYPASS'})
+            parse, build = ROUTES[path]
+            query = parse(params)
+            key = (path, tuple(sorted(query.items())), data.signature())
+            body, hit = server.cache.get_or_compute(
+                key, lambda: json.dumps(build(data, query), ensure_ascii=False).encode('utf-8')
+            )
+        except ApiError as exc:
+            return self._error(exc.status, exc.code, exc.description)
+        except FileNotFoundError as exc:
+            return self._error(503, 'DATA_UNAVAILABLE', str(exc))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._send(200, body, {'X-Cache': 'HIT' if hit else 'MISS', 'X-Response-Time-Ms': f"{elapsed_ms:.1f}"})
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, cache_entries=DEFAULT_CACHE_ENTRIES):
+        super().__init__(address, ApiHandler)
+        self.service = service
+        self.cache = ResponseCache(cache_entries)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_api_server(service=None, host='127.0.0.1', port=0, cache_entries=DEFAULT_CACHE_ENTRIES):
+    """Inicia el servicio en un hilo (port=0 elige un puerto libre); devuelve el servidor."""
+    service = service or AnalyticsService()
+    server = ApiServer((host, port), service, cache_entries)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON con las consultas del dashboard.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help="Respuestas que se conservan en el caché compartido (LRU).")
+    parser.add_argument('--warmup', action='store_true', help="Carga datos e índices antes de aceptar peticiones.")
+    args = parser.parse_args()
+
+    if args.warmup:
+        from Utils.Data.Warmup import warm_up
+        warm_up()
+    service = AnalyticsService()
+    # Construye (o valida) la base antes de aceptar peticiones; luego se revisa en cada una
+    backend = service.snapshot().backend
+    server = ApiServer((args.host, args.port), service, args.cache_entries)
+    print(f"API en {server.base_url} (backend: {backend['engine'] if backend else 'memoria'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps({'cache': server.cache.info()}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Genera copias columnares (Feather / Arrow IPC) de todos los CSV de 'Datasets'.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.BuildDatasets                       # zstd (compacto)
+    python -m Utils.Data.BuildDatasets --compression uncompressed   # mmap sin copia
+
+Las copias se escriben en 'Datasets/columnar/' con los mismos tipos explícitos que
+usa DataLoader (categorías, float32, fechas parseadas). DataLoader las prefiere
+automáticamente mientras no sean más antiguas que su CSV de origen.
+"""
+import argparse
+import glob
+import os
+import time
+
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+
+COMPRESSION_OPTIONS = ['zstd', 'lz4', 'uncompressed']
+
+
+def _parse_typed(csv_path):
+    """Elige el parser tipado según el esquema del archivo (reseñas o negocios)."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    if 'review_id' in header:
+        return data_loader.parse_reviews_csv(csv_path)
+    return data_loader.parse_business_csv(csv_path)
+
+
+def build_columnar_copy(csv_path, compression='zstd'):
+    """Convierte un CSV a Feather y devuelve la ruta escrita."""
+    from pyarrow import feather
+
+    df = _parse_typed(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    out_path = os.path.join(os.path.dirname(csv_path), 'columnar', stem + data_loader.COLUMNAR_EXTENSION)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    # Escribir a un archivo temporal y renombrar: un lector nunca ve un archivo a medias
+    tmp_path = out_path + '.tmp'
+    feather.write_feather(df, tmp_path, compression=compression)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def build_all(datasets_dir=data_loader.DATASETS_DIR, compression='zstd'):
+    """Convierte todos los CSV de la carpeta de datasets."""
+    results = []
+    for csv_path in sorted(glob.glob(os.path.join(datasets_dir, '*.csv'))):
+        start = time.perf_counter()
+        out_path = build_columnar_copy(csv_path, compression=compression)
+        results.append({
+            'archivo': os.path.basename(csv_path),
+            'csv_kb': os.path.getsize(csv_path) / 1024,
+            'columnar_kb': os.path.getsize(out_path) / 1024,
+            'segundos': time.perf_counter() - start,
+        })
+    return pd.DataFrame(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera copias columnares de los CSV de 'Datasets'.")
+    parser.add_argument('--datasets-dir', default=data_loader.DATASETS_DIR)
+    parser.add_argument('--compression', choices=COMPRESSION_OPTIONS, default='zstd',
+                        help="'uncompressed' permite lectura mapeada en memoria sin copia.")
+    args = parser.parse_args()
+
+    report = build_all(args.datasets_dir, compression=args.compression)
+    print(report.to_string(index=False, float_format=lambda x: f'{x:,.1f}'))
+
+
+if __name__ == '__main__':
+    main()
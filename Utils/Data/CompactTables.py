@@ -0,0 +1,220 @@
+"""
+Representación compacta en memoria de las tablas de negocios y reseñas.
+
+DataLoader la aplica a las tablas cacheadas por proceso (las que comparten todas las
+sesiones); los CSV y las copias Feather no cambian. Lo que se compacta:
+
+  - URLs de Yelp: se guarda el slug (`url_slug`, sin 'https://www.yelp.com/biz/'), el
+    sufijo de rastreo (`url_suffix`: adjust_creative/utm_*, casi siempre el mismo, como
+    categoría) y el `url_hrid` de cada reseña; `with_urls()` reconstruye la URL exacta.
+  - Llaves y textos repetidos (business_id y user_name de las reseñas, categorías de
+    negocio...) como categorías: cada valor distinto se guarda una sola vez.
+  - Enteros reducidos al tipo más chico que los contiene (p. ej. review_count a int16).
+  - 'color' se descarta: FilterEngine.sentiment_colors lo recalcula del sentimiento.
+
+El sentimiento ya se lee como categoría fija (códigos int8, DataLoader.SENTIMENT_CATEGORIES).
+
+Uso (desde la raíz del proyecto), reporte de memoria antes/después por columna:
+
+    python -m Utils.Data.CompactTables
+    SHINY_STATS_DATASETS_DIR=Datasets/mock python -m Utils.Data.CompactTables
+"""
+import argparse
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+# --- Variables Globales ---
+YELP_BIZ_PREFIX = 'https://www.yelp.com/biz/'
+URL_COLUMN = 'url'
+URL_SLUG_COLUMN = 'url_slug'
+URL_SUFFIX_COLUMN = 'url_suffix'
+URL_HRID_COLUMN = 'url_hrid'
+URL_PARTS = (URL_SLUG_COLUMN, URL_SUFFIX_COLUMN, URL_HRID_COLUMN)
+HRID_PARAM = 'hrid'
+
+# Columnas derivadas que no se guardan (se recalculan al mostrarse)
+DERIVED_COLUMNS = ('color',)
+
+# Columnas de texto candidatas a categoría por tabla
+BUSINESS_INTERNED_COLUMNS = ('categories', 'city', 'state', 'source_city_query', 'source_variant', 'source_sort_by')
+REVIEWS_INTERNED_COLUMNS = ('business_id', 'user_id', 'user_name')
+
+# Solo conviene la categoría si hay a lo más un valor distinto por cada 2 filas
+INTERN_MAX_UNIQUE_RATIO = 0.5
+
+MB = 1024 ** 2
+
+
+# --------------------------------------------------------------------------------------
+# URLS (slug + sufijo de rastreo, reconstruidas a pedido)
+# --------------------------------------------------------------------------------------
+def split_urls(urls):
+    """
+    Separa URLs en (slug, sufijo de rastreo, hrid). El slug es la ruta sin el prefijo de
+    Yelp (URLs de otro sitio se guardan completas); el sufijo es la consulta sin `hrid`.
+    """
+    urls = pd.Series(urls).astype('string')
+    parts = urls.str.partition('?')
+    base, query = parts[0], parts[2]
+    yelp = base.str.startswith(YELP_BIZ_PREFIX).fillna(False)
+    slug = base.where(~yelp, base.str.slice(len(YELP_BIZ_PREFIX)))
+    hrid = query.str.extract(rf'(?:^|&){HRID_PARAM}=([^&]*)', expand=False).astype('string')
+    suffix = query.str.replace(rf'(?:^|&){HRID_PARAM}=[^&]*', '', regex=True).str.lstrip('&')
+    return slug, suffix, hrid
+
+
+def _suffix_halves(suffix):
+    """Parámetros antes y después de `hrid` (Yelp ordena la consulta alfabéticamente)."""
+    params = suffix.split('&') if suffix else []
+    cut = bisect_left([param.split('=', 1)[0] for param in params], HRID_PARAM)
+    return '&'.join(params[:cut]), '&'.join(params[cut:])
+
+
+def join_urls(slug, suffix, hrid=None):
+    """Reconstruye las URLs completas a partir de las partes de split_urls()."""
+    slug = pd.Series(slug).astype('string')
+    base = slug.where(slug.str.contains('://', regex=False).fillna(True), YELP_BIZ_PREFIX + slug)
+    suffix = pd.Series(suffix, index=slug.index).astype('category')
+    categories = [str(value) for value in suffix.cat.categories]
+    halves = [_suffix_halves(value) for value in categories] + [('', '')]
+    codes = suffix.cat.codes.to_numpy()  # -1 (nulo) apunta al último par vacío
+    head = pd.Series(np.array([h for h, _ in halves], dtype=object)[codes], index=slug.index, dtype='string')
+    tail = pd.Series(np.array([t for _, t in halves], dtype=object)[codes], index=slug.index, dtype='string')
+    query = suffix.astype('string').fillna('')
+    if hrid is not None:
+        hrid = pd.Series(hrid, index=slug.index).astype('string')
+        hrid_param = HRID_PARAM + '=' + hrid
+        with_hrid = (
+            head.where(head == '', head + '&') + hrid_param + tail.where(tail == '', '&' + tail)
+        )
+        query = query.where(hrid.isna(), with_hrid)
+    url = base + query.where(query == '', '?' + query)
+    return url.where(slug.notna())
+
+
+def compact_urls(urls):
+    """
+    Columnas compactas (slug, sufijo, hrid) de una serie de URLs. Las URLs que no se
+    reconstruyen idénticas (p. ej. consulta sin orden alfabético) se guardan completas.
+    """
+    slug, suffix, hrid = split_urls(urls)
+    original = pd.Series(urls).astype('string')
+    mismatch = (join_urls(slug, suffix, hrid) != original).fillna(False).to_numpy() | (
+        original.isna().to_numpy() != slug.isna().to_numpy()
+    )
+    if mismatch.any():
+        slug = slug.where(~mismatch, original)
+        suffix = suffix.where(~mismatch, '')
+        hrid = hrid.where(~mismatch, pd.NA)
+    columns = {URL_SLUG_COLUMN: intern_strings(slug), URL_SUFFIX_COLUMN: suffix.astype('category')}
+    if hrid.notna().any():
+        columns[URL_HRID_COLUMN] = hrid
+    return columns
+
+
+def with_urls(df):
+    """Copia de `df` con la columna 'url' reconstruida en lugar de sus partes compactas."""
+    if URL_SLUG_COLUMN not in df.columns:
+        return df
+    url = join_urls(df[URL_SLUG_COLUMN], df[URL_SUFFIX_COLUMN], df.get(URL_HRID_COLUMN))
+    at = df.columns.get_loc(URL_SLUG_COLUMN)
+    df = df.drop(columns=[col for col in URL_PARTS if col in df.columns])
+    df.insert(at, URL_COLUMN, url)
+    return df
+
+
+# --------------------------------------------------------------------------------------
+# LLAVES INTERNADAS Y TIPOS NUMÉRICOS
+# --------------------------------------------------------------------------------------
+def intern_strings(series, max_unique_ratio=INTERN_MAX_UNIQUE_RATIO):
+    """Categoría si la columna repite valores lo suficiente; si no, la misma serie."""
+    if isinstance(series.dtype, pd.CategoricalDtype) or len(series) == 0:
+        return series
+    if series.nunique(dropna=True) > max_unique_ratio * len(series):
+        return series
+    return series.astype('category')
+
+
+def downcast_integers(df):
+    """Reduce cada columna entera al tipo con signo más chico que contiene sus valores."""
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def compact_table(df, interned_columns=()):
+    """Versión compacta de una tabla de negocios o reseñas (ver el docstring del módulo)."""
+    df = df.drop(columns=[col for col in DERIVED_COLUMNS if col in df.columns])
+    if URL_COLUMN in df.columns:
+        at = df.columns.get_loc(URL_COLUMN)
+        parts = compact_urls(df[URL_COLUMN])
+        df = df.drop(columns=[URL_COLUMN])
+        for offset, (name, values) in enumerate(parts.items()):
+            df.insert(at + offset, name, values)
+    for col in interned_columns:
+        if col in df.columns:
+            df[col] = intern_strings(df[col])
+    return downcast_integers(df)
+
+
+def compact_business_table(df):
+    return compact_table(df, BUSINESS_INTERNED_COLUMNS)
+
+
+def compact_reviews_table(df):
+    return compact_table(df, REVIEWS_INTERNED_COLUMNS)
+
+
+# --------------------------------------------------------------------------------------
+# REPORTE DE MEMORIA
+# --------------------------------------------------------------------------------------
+def memory_footprint(df):
+    """Memoria por columna (incluye el contenido de cadenas y categorías)."""
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'mb': (usage / MB).round(3),
+        'bytes_por_fila': (usage / max(len(df), 1)).round(1),
+    })
+
+
+def footprint_summary(df):
+    """Filas, memoria total (MB) y bytes por fila de una tabla."""
+    total = int(df.memory_usage(deep=True, index=True).sum())
+    return {'rows': len(df), 'mb': round(total / MB, 2), 'bytes_per_row': round(total / max(len(df), 1), 1)}
+
+
+def _compare(name, raw, compact):
+    before, after = memory_footprint(raw), memory_footprint(compact)
+    table = before.join(after, how='outer', lsuffix='_antes', rsuffix='_después')
+    summary_before, summary_after = footprint_summary(raw), footprint_summary(compact)
+    print(f"\n{name}: {summary_before['rows']:,} filas, {summary_before['mb']:,.2f} MB -> "
+          f"{summary_after['mb']:,.2f} MB ({summary_before['bytes_per_row']:,.0f} -> "
+          f"{summary_after['bytes_per_row']:,.0f} bytes por fila)")
+    print(table.fillna('').to_string())
+    return summary_after
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de las tablas de negocios y reseñas, antes y después de compactar.")
+    parser.parse_args()
+
+    from Utils.Data import DataLoader as data_loader
+
+    businesses = data_loader.parse_business_csv(data_loader.dataset_path(data_loader.BUSINESS_FILE))
+    _compare("Negocios", businesses, compact_business_table(businesses))
+    reviews = data_loader.parse_reviews_csv(data_loader.dataset_path(data_loader.REVIEWS_FILE))
+    _compare("Reseñas (todas las columnas)", reviews, compact_reviews_table(reviews))
+
+    # Lo que el dashboard mantiene en memoria por proceso (Word Map y búsqueda)
+    columns = list(data_loader.REVIEW_SEARCH_COLUMNS)
+    dashboard = _compare("Reseñas (columnas del dashboard)", reviews[columns], compact_reviews_table(reviews[columns]))
+    print(f"\nReseñas por GB con las columnas del dashboard: {1024 ** 3 / dashboard['bytes_per_row']:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
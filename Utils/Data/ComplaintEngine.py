@@ -0,0 +1,309 @@
+"""
+Motor de quejas por competidor: para cada negocio, los n-gramas de sus reseñas negativas
+más distintivos frente al corpus completo.
+
+El score es el log-odds con prior de Dirichlet informativo (Monroe et al., 2008): compara
+la frecuencia de cada término en las reseñas negativas del negocio contra su frecuencia en
+todas las reseñas, con un prior proporcional al corpus, y lo divide por su desviación
+estándar (z-score). Así un término frecuente en todo el corpus ("wash") no domina y uno
+raro con una sola mención no pesa tanto como una queja repetida. A ese z se suma el del
+término en todas las reseñas negativas frente al corpus: con pocas reseñas por negocio,
+esto prefiere términos de queja ("never showed", "unprofessional") a palabras sueltas
+que solo aparecen en esa reseña.
+
+Todo se calcula en una pasada vectorizada sobre las matrices dispersas (negocio x término)
+que ya existen: el índice de n-gramas en memoria o la tabla `business_ngrams` del backend
+analítico; nunca se vuelve a recorrer el texto. Con corpus grandes la línea de comandos (y
+`Warmup build`) reparte los negocios en rangos entre un pool de procesos; dentro del servidor
+(dashboard, ApiServer, `Warmup serve`) se calcula en el mismo proceso, sin bifurcar un proceso
+con varios hilos. El resultado se guarda en `Datasets/indexes/` y se
+invalida con la firma de las reseñas.
+
+    python -m Utils.Data.ComplaintEngine [--workers 8] [--output quejas.csv]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data.NgramIndex import INDEX_DIR
+from Utils.Data.ProcessCache import process_cache
+
+# --- Variables Globales ---
+COMPLAINT_NGRAM_SIZES = (1, 2)
+TOP_COMPLAINTS = 3
+# Candidatos por negocio antes de descartar términos redundantes ("scratches" / "left scratches")
+CANDIDATES_PER_BUSINESS = 4 * TOP_COMPLAINTS
+# Masa total del prior de Dirichlet (alpha_0), repartida según la frecuencia en el corpus
+PRIOR_STRENGTH = 1000.0
+MIN_NEGATIVE_COUNT = 1
+# Menciones mínimas en todo el corpus (descarta erratas y palabras de una sola reseña)
+MIN_CORPUS_COUNT = 2
+# Por debajo de este número de entradas (negocio, término) no conviene levantar procesos
+PARALLEL_MIN_ENTRIES = 2_000_000
+NEGATIVE_SENTIMENT = 'Negativo'
+
+COMPLAINTS_FILE = 'complaints_{source}.npz'
+COMPLAINT_COLUMNS = ('business_id', 'rank', 'term', 'n', 'negative_count', 'score')
+# Cambia si cambia el cálculo (obliga a recalcular lo guardado en disco)
+ENGINE_VERSION = 1
+
+
+# --------------------------------------------------------------------------------------
+# SCORE (log-odds con prior informativo, vectorizado)
+# --------------------------------------------------------------------------------------
+def log_odds_scores(counts, business_totals, background, background_total, prior_strength=PRIOR_STRENGTH):
+    """
+    z-score del log-odds de cada entrada: `counts` (menciones negativas del término en el
+    negocio), `business_totals` (n-gramas negativos del negocio) y `background` (menciones
+    del término en todo el corpus, de total `background_total`), todos alineados por entrada.
+    """
+    alpha = prior_strength * background / background_total
+    foreground = np.log(counts + alpha) - np.log(business_totals + prior_strength - counts - alpha)
+    corpus = np.log(background + alpha) - np.log(background_total + prior_strength - background - alpha)
+    variance = 1 / (counts + alpha) + 1 / (background + alpha)
+    return (foreground - corpus) / np.sqrt(variance)
+
+
+def term_negativity(term_ids, counts, background):
+    """z-score de cada término del vocabulario en todas las reseñas negativas frente al corpus."""
+    negative = np.bincount(term_ids, weights=counts, minlength=len(background))
+    return log_odds_scores(negative, np.full(len(background), negative.sum()), background, background.sum())
+
+
+def _score_ngram_size(business, term_ids, counts, background, negativity):
+    """Agrega las entradas por (negocio, término) y devuelve las candidatas de score positivo."""
+    vocab_size = len(background)
+    keys, inverse = np.unique(business.astype(np.int64) * vocab_size + term_ids, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts)
+    business, term_ids = keys // vocab_size, keys % vocab_size
+    business_totals = np.bincount(business, weights=totals)[business]
+    scores = log_odds_scores(totals, business_totals, background[term_ids], background.sum()) + negativity[term_ids]
+    keep = ((totals >= MIN_NEGATIVE_COUNT) & (background[term_ids] >= MIN_CORPUS_COUNT)
+            & (negativity[term_ids] > 0) & (scores > 0))
+    return business[keep], term_ids[keep], totals[keep], scores[keep]
+
+
+def _top_candidates(business, scores, limit):
+    """Posiciones de los `limit` mejores scores de cada negocio, ordenadas por negocio y score."""
+    order = np.lexsort((-scores, business))
+    sorted_business = business[order]
+    starts = np.flatnonzero(np.r_[True, sorted_business[1:] != sorted_business[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[np.arange(len(order)) - group_start < limit]
+
+
+def _score_businesses(entries, backgrounds, negativity, limit=CANDIDATES_PER_BUSINESS):
+    """
+    Tarea del pool (o llamada directa): candidatos a queja de un rango de negocios.
+    `entries` = {n: (negocio, term_id, menciones)} de reseñas negativas; `backgrounds` =
+    {n: menciones en el corpus}; `negativity` = {n: term_negativity del corpus completo}.
+    """
+    parts = []
+    for n, (business, term_ids, counts) in entries.items():
+        business, term_ids, totals, scores = _score_ngram_size(business, term_ids, counts, backgrounds[n], negativity[n])
+        parts.append((business, np.full(len(business), n, dtype=np.int8), term_ids, totals, scores))
+    business, sizes, term_ids, totals, scores = (np.concatenate(column) for column in zip(*parts))
+    keep = _top_candidates(business, scores, limit)
+    return business[keep], sizes[keep], term_ids[keep], totals[keep], scores[keep]
+
+
+def _business_ranges(n_businesses, parts):
+    bounds = np.linspace(0, n_businesses, parts + 1).astype(np.int64)
+    return [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def score_candidates(entries, backgrounds, n_businesses, workers=None):
+    """
+    Candidatos (negocio, n, term_id, menciones, score) de todos los negocios. Con muchas
+    entradas y `workers` > 1 los negocios se reparten en rangos entre procesos.
+    """
+    # La negatividad de cada término es global: se calcula antes de repartir los negocios
+    negativity = {n: term_negativity(term_ids, counts, backgrounds[n]) for n, (_, term_ids, counts) in entries.items()}
+    workers = workers or os.cpu_count() or 1
+    total_entries = sum(len(business) for business, _, _ in entries.values())
+    if workers <= 1 or total_entries < PARALLEL_MIN_ENTRIES:
+        return _score_businesses(entries, backgrounds, negativity)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for lo, hi in _business_ranges(n_businesses, workers * 2):
+            chunk = {}
+            for n, (business, term_ids, counts) in entries.items():
+                in_range = (business >= lo) & (business < hi)
+                chunk[n] = (business[in_range], term_ids[in_range], counts[in_range])
+            futures.append(pool.submit(_score_businesses, chunk, backgrounds, negativity))
+        results = [future.result() for future in futures]
+    return tuple(np.concatenate(column) for column in zip(*results))
+
+
+def select_complaints(candidates, business_ids, term_lookup, top_k=TOP_COMPLAINTS):
+    """
+    Tabla final (COMPLAINT_COLUMNS): hasta `top_k` quejas por negocio, saltando términos
+    cuyas palabras ya están cubiertas por una queja mejor ("scratches" y "left scratches").
+    `term_lookup(n, term_ids)` devuelve el texto de los términos.
+    """
+    business, sizes, term_ids, totals, scores = candidates
+    terms = np.empty(len(term_ids), dtype=object)
+    for n in np.unique(sizes):
+        in_size = sizes == n
+        terms[in_size] = term_lookup(int(n), term_ids[in_size])
+
+    rows = []
+    current, chosen = None, []
+    for code, n, term, count, score in zip(business.tolist(), sizes.tolist(), terms.tolist(),
+                                           totals.tolist(), scores.tolist()):
+        if code != current:
+            current, chosen = code, []
+        if len(chosen) >= top_k:
+            continue
+        words = set(term.split())
+        if any(words <= other or other <= words for other in chosen):
+            continue
+        chosen.append(words)
+        rows.append((business_ids[code], len(chosen), term, n, int(count), round(score, 3)))
+    return pd.DataFrame(rows, columns=list(COMPLAINT_COLUMNS))
+
+
+def compute_complaints(inputs, workers=None, top_k=TOP_COMPLAINTS):
+    """Quejas por negocio a partir de las entradas de `index_complaint_inputs` (o del backend)."""
+    entries, backgrounds, business_ids, term_lookup = inputs
+    if not any(len(business) for business, _, _ in entries.values()):
+        return pd.DataFrame(columns=list(COMPLAINT_COLUMNS))
+    candidates = score_candidates(entries, backgrounds, len(business_ids), workers)
+    return select_complaints(candidates, business_ids, term_lookup, top_k)
+
+
+# --------------------------------------------------------------------------------------
+# ENTRADAS DESDE EL ÍNDICE DE N-GRAMAS (reseñas en memoria)
+# --------------------------------------------------------------------------------------
+def index_complaint_inputs(ngram_index, review_business_ids, review_sentiments, ngram_sizes=COMPLAINT_NGRAM_SIZES):
+    """
+    (entradas, fondos, business_ids, term_lookup) a partir del índice de n-gramas
+    alineado con las reseñas: las filas negativas de cada matriz, con el negocio de cada fila.
+    """
+    codes, business_ids = pd.factorize(pd.Series(review_business_ids).astype(object))
+    negative = (pd.Series(review_sentiments).astype(object) == NEGATIVE_SENTIMENT).to_numpy()
+    entries, backgrounds = {}, {}
+    for n in ngram_sizes:
+        matrix = ngram_index[n]
+        backgrounds[n] = np.bincount(matrix['term_ids'], weights=matrix['counts'], minlength=len(matrix['vocab']))
+        selected = negative[matrix['rows']]
+        entries[n] = (codes[matrix['rows'][selected]], matrix['term_ids'][selected], matrix['counts'][selected])
+
+    def term_lookup(n, term_ids):
+        return ngram_index[n]['vocab'][term_ids]
+
+    return entries, backgrounds, np.asarray(business_ids, dtype=object), term_lookup
+
+
+# --------------------------------------------------------------------------------------
+# PERSISTENCIA Y CACHÉ
+# --------------------------------------------------------------------------------------
+def save_complaints(complaints, path, signature):
+    """Guarda la tabla de quejas en un .npz junto con la firma de sus datos de origen."""
+    arrays = {column: complaints[column].to_numpy(dtype=str if column in ('business_id', 'term') else None)
+              for column in COMPLAINT_COLUMNS}
+    arrays['signature'] = np.array(repr(signature))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_complaints(path, signature):
+    """Carga una tabla guardada; None si no existe o si la firma no coincide."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if str(data['signature']) != repr(signature):
+            return None
+        return pd.DataFrame({column: data[column] for column in COMPLAINT_COLUMNS})
+
+
+def _cached_or_computed(source, signature, build_inputs, workers):
+    path = os.path.join(INDEX_DIR, COMPLAINTS_FILE.format(source=source))
+    complaints = load_complaints(path, signature)
+    if complaints is None:
+        complaints = compute_complaints(build_inputs(), workers)
+        try:
+            save_complaints(complaints, path, signature)
+        except OSError:
+            # Sin permisos de escritura (p. ej. despliegue de solo lectura): solo en memoria
+            pass
+    # El resumen por negocio también queda en caché (el leaderboard lo usa en cada rerun)
+    return {'table': complaints, 'by_business': complaints_by_business(complaints)}
+
+
+def _engine_signature(data_signature):
+    return (data_signature, ENGINE_VERSION, COMPLAINT_NGRAM_SIZES, TOP_COMPLAINTS, PRIOR_STRENGTH, MIN_CORPUS_COUNT)
+
+
+@process_cache(max_entries=2)
+def _cached_index_complaints(signature, _ngram_index, _reviews, _workers):
+    return _cached_or_computed('index', signature, lambda: index_complaint_inputs(
+        _ngram_index, _reviews['business_id'], _reviews['sentiment']
+    ), _workers)
+
+
+@process_cache(max_entries=2)
+def _cached_backend_complaints(signature, _backend, _workers):
+    from Utils.Data.AnalyticsBackend import complaint_inputs_sql
+    return _cached_or_computed(_backend['engine'], signature,
+                               lambda: complaint_inputs_sql(_backend, COMPLAINT_NGRAM_SIZES), _workers)
+
+
+def get_complaints(reviews=None, ngram_index=None, backend=None, workers=1):
+    """
+    Quejas por negocio, calculadas una vez por versión de las reseñas: {'table' (COMPLAINT_COLUMNS),
+    'by_business' (complaints_by_business)}. Salen del backend analítico si se pasa `backend`,
+    si no del índice de n-gramas alineado con `reviews` (columnas business_id y sentiment).
+    `workers` es 1 por defecto (el servidor no bifurca procesos); None usa todos los núcleos.
+    """
+    if backend is not None:
+        return _cached_backend_complaints(_engine_signature(backend['signature']), backend, workers)
+    return _cached_index_complaints(_engine_signature(ngram_index['signature']), ngram_index, reviews, workers)
+
+
+def complaints_by_business(complaints, separator=' · '):
+    """Serie business_id -> quejas principales en un solo texto (para tablas y tarjetas)."""
+    if complaints.empty:
+        return pd.Series(dtype=object)
+    ordered = complaints.sort_values(['business_id', 'rank'])
+    return ordered.groupby('business_id', sort=False)['term'].agg(separator.join)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula las quejas distintivas de cada negocio.")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del pool (por defecto, todos los núcleos).")
+    parser.add_argument('--output', default=None, help="CSV opcional con la tabla de quejas.")
+    args = parser.parse_args()
+
+    from Utils.Data import DataLoader as data_loader
+    from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, get_reviews_ngram_index
+
+    started = time.perf_counter()
+    reviews = data_loader.load_reviews_data(columns=data_loader.WORD_MAP_COLUMNS)
+    ngram_index = get_reviews_ngram_index(reviews['text'], ENGLISH_STOPWORDS)
+    loaded = time.perf_counter()
+    complaints = compute_complaints(
+        index_complaint_inputs(ngram_index, reviews['business_id'], reviews['sentiment']),
+        workers=args.workers
+    )
+    # Queda guardada para el dashboard (misma firma que get_complaints)
+    save_complaints(complaints, os.path.join(INDEX_DIR, COMPLAINTS_FILE.format(source='index')),
+                    _engine_signature(ngram_index['signature']))
+    print(f"{complaints['business_id'].nunique():,} negocios con quejas "
+          f"(carga e índice {loaded - started:.1f} s, quejas {time.perf_counter() - loaded:.2f} s)")
+    if args.output:
+        complaints.to_csv(args.output, index=False)
+        print(f"Tabla guardada en {args.output}")
+    else:
+        print(complaints.head(15).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
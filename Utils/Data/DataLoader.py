@@ -0,0 +1,250 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from Utils.Benchmarks.Instrumentation import instrumented
+from Utils.Data.CompactTables import compact_business_table, compact_reviews_table
+from Utils.Data.ProcessCache import process_cache
+
+# --- Variables Globales ---
+# Ruta absoluta a la carpeta de datasets (independiente del directorio de trabajo).
+# SHINY_STATS_DATASETS_DIR permite apuntar a otra carpeta (p. ej. datos de GenMockData.py).
+DATASETS_DIR = os.path.abspath(
+    os.environ.get('SHINY_STATS_DATASETS_DIR')
+    or os.path.join(os.path.dirname(__file__), '..', '..', 'Datasets')
+)
+
+# Copias columnares (Feather/Arrow IPC) generadas por BuildDatasets.py
+COLUMNAR_DIR = os.path.join(DATASETS_DIR, 'columnar')
+COLUMNAR_EXTENSION = '.feather'
+
+BUSINESS_FILE = 'df_business_with_sentiment.csv'
+REVIEWS_FILE = 'reviews_final_with_sentiment.csv'
+
+# Columnas que realmente usa cada widget (lectura por proyección de columnas)
+EMOTION_MAP_COLUMNS = ('name', 'latitude', 'longitude', 'rating', 'review_count', 'sentiment')
+LEADERBOARD_COLUMNS = ('name', 'rating', 'sentiment', 'review_count')
+WORD_MAP_COLUMNS = ('business_id', 'sentiment', 'text')
+REVIEW_SEARCH_COLUMNS = WORD_MAP_COLUMNS + ('rating', 'time_created')
+
+# Tipos explícitos por columna: evitan la inferencia de pandas en cada lectura y
+# reducen memoria (categorías para columnas repetitivas, float32 para coordenadas).
+BUSINESS_DTYPES = {
+    'business_id': 'string',
+    'name': 'string',
+    'city': 'category',
+    'state': 'category',
+    'zip_code': 'float32',
+    'categories': 'string',
+    'rating': 'float32',
+    'review_count': 'int32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'url': 'string',
+    'source_city_query': 'category',
+    'source_variant': 'category',
+    'source_sort_by': 'category',
+    'review_count_from_reviews': 'int32',
+    'sentiment': 'category',
+    'color': 'string',
+}
+
+REVIEWS_DTYPES = {
+    'review_id': 'string',
+    'business_id': 'string',
+    'user_id': 'string',
+    'user_name': 'string',
+    'rating': 'int8',
+    'text': 'string',
+    'url': 'string',
+    'sentiment': 'category',
+}
+
+REVIEWS_DATE_COLUMNS = ['time_created']
+
+SENTIMENT_CATEGORIES = ['Positivo', 'Neutral', 'Negativo']
+
+
+def dataset_path(file_name):
+    """Devuelve la ruta absoluta de un archivo dentro de 'Datasets'."""
+    return os.path.join(DATASETS_DIR, file_name)
+
+
+def file_signature(path):
+    """
+    Firma barata del archivo (mtime en ns + tamaño) usada como llave de caché:
+    si el archivo cambia en disco, la firma cambia y el caché se invalida solo.
+    """
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def dataset_signature(file_name):
+    """
+    Firma del CSV de origen de un dataset (para invalidar cachés e índices derivados).
+    Si solo existe la copia columnar, se usa la firma de esa copia.
+    """
+    path = dataset_path(file_name)
+    if not os.path.exists(path) and os.path.exists(columnar_path(file_name)):
+        path = columnar_path(file_name)
+    return file_signature(path)
+
+
+def columnar_path(file_name):
+    """Ruta de la copia columnar de un CSV de 'Datasets' (p. ej. columnar/reviews.feather)."""
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    return os.path.join(COLUMNAR_DIR, stem + COLUMNAR_EXTENSION)
+
+
+def _fresh_columnar_path(file_name):
+    """
+    Devuelve la copia columnar solo si existe y no es más antigua que el CSV;
+    en otro caso None (se vuelve a leer el CSV para no servir datos obsoletos).
+    """
+    path = columnar_path(file_name)
+    if not os.path.exists(path):
+        return None
+    csv_path = dataset_path(file_name)
+    if os.path.exists(csv_path) and os.stat(path).st_mtime_ns < os.stat(csv_path).st_mtime_ns:
+        return None
+    return path
+
+
+def _as_sentiment_category(series):
+    """Estandariza el sentimiento ('positivo' -> 'Positivo') como categoría fija."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Ya es categoría (p. ej. de un Feather): se recodifican las categorías, no las filas
+        labels = series.cat.categories.astype(str).str.title()
+        codes = np.append(pd.Index(SENTIMENT_CATEGORIES).get_indexer(labels), -1)
+        return pd.Categorical.from_codes(codes[series.cat.codes.to_numpy()], categories=SENTIMENT_CATEGORIES)
+    return pd.Categorical(series.astype(str).str.title(), categories=SENTIMENT_CATEGORIES)
+
+
+def _select_dtypes(dtypes, columns):
+    if columns is None:
+        return dtypes
+    return {col: dtype for col, dtype in dtypes.items() if col in columns}
+
+
+@instrumented("Lectura Feather")
+def _read_columnar(path, columns=None):
+    """
+    Lee una copia Feather mapeada en memoria, materializando solo las columnas pedidas.
+    El sentimiento se estandariza igual que al parsear el CSV (un Feather hecho a mano
+    con 'positivo' en minúsculas no debe dejar los conteos del dashboard en cero).
+    """
+    from pyarrow import feather
+    table = feather.read_table(path, columns=list(columns) if columns else None, memory_map=True)
+    df = table.to_pandas()
+    if 'sentiment' in df.columns:
+        df['sentiment'] = _as_sentiment_category(df['sentiment'])
+    return df
+
+
+# --------------------------------------------------------------------------------------
+# PARSEO TIPADO (sin caché; lo reutilizan los lectores cacheados y BuildDatasets.py)
+# --------------------------------------------------------------------------------------
+@instrumented("Parseo CSV de negocios")
+def parse_business_csv(path, columns=None):
+    """Lee el CSV de negocios con tipos explícitos y, opcionalmente, solo algunas columnas."""
+    df = pd.read_csv(
+        path,
+        usecols=list(columns) if columns else None,
+        dtype=_select_dtypes(BUSINESS_DTYPES, columns),
+    )
+    if 'sentiment' in df.columns:
+        df['sentiment'] = _as_sentiment_category(df['sentiment'])
+    return df
+
+
+@instrumented("Parseo CSV de reseñas")
+def parse_reviews_csv(path, columns=None):
+    """Lee el CSV de reseñas con tipos explícitos y, opcionalmente, solo algunas columnas."""
+    date_columns = [col for col in REVIEWS_DATE_COLUMNS if columns is None or col in columns]
+    df = pd.read_csv(
+        path,
+        usecols=list(columns) if columns else None,
+        dtype=_select_dtypes(REVIEWS_DTYPES, columns),
+        parse_dates=date_columns,
+    )
+    return _normalize_reviews(df)
+
+
+def _normalize_reviews(df):
+    if 'sentiment' in df.columns:
+        df['sentiment'] = _as_sentiment_category(df['sentiment'])
+    if 'text' in df.columns:
+        # Asegurar que la columna de texto sea una cadena (sin nulos)
+        df['text'] = df['text'].fillna('')
+    return df
+
+
+def iter_reviews_chunks(file_name=REVIEWS_FILE, columns=None, chunk_rows=200_000):
+    """
+    Lee las reseñas por bloques tipados de `chunk_rows` filas (memoria acotada), de la
+    copia columnar vigente o del CSV. Sin caché: lo usan los procesos de construcción.
+    """
+    path = _resolve_source(file_name)
+    if path.endswith(COLUMNAR_EXTENSION):
+        from pyarrow import feather
+        table = feather.read_table(path, columns=list(columns) if columns else None, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield _normalize_reviews(batch.to_pandas())
+        return
+
+    date_columns = [col for col in REVIEWS_DATE_COLUMNS if columns is None or col in columns]
+    for chunk in pd.read_csv(
+        path,
+        usecols=list(columns) if columns else None,
+        dtype=_select_dtypes(REVIEWS_DTYPES, columns),
+        parse_dates=date_columns,
+        chunksize=chunk_rows,
+    ):
+        yield _normalize_reviews(chunk)
+
+
+# --------------------------------------------------------------------------------------
+# LECTURA CACHEADA (una vez por proceso, compartida entre sesiones)
+# Nota: process_cache devuelve el MISMO objeto a todas las sesiones, por lo que
+# los widgets nunca deben modificar estos DataFrames in-place (trabajar sobre copias).
+# Las tablas cacheadas se guardan compactas (CompactTables.py): 'url' se reemplaza por
+# url_slug/url_suffix/url_hrid (CompactTables.with_urls la reconstruye) y 'color' no se guarda.
+# --------------------------------------------------------------------------------------
+@process_cache(max_entries=4)
+def _read_business_data(path, signature, columns):
+    if path.endswith(COLUMNAR_EXTENSION):
+        return compact_business_table(_read_columnar(path, columns))
+    return compact_business_table(parse_business_csv(path, columns))
+
+
+@process_cache(max_entries=4)
+def _read_reviews_data(path, signature, columns):
+    if path.endswith(COLUMNAR_EXTENSION):
+        return compact_reviews_table(_read_columnar(path, columns))
+    return compact_reviews_table(parse_reviews_csv(path, columns))
+
+
+def _resolve_source(file_name):
+    """Prefiere la copia columnar vigente; si no existe, usa el CSV original."""
+    return _fresh_columnar_path(file_name) or dataset_path(file_name)
+
+
+def load_business_data(file_name=BUSINESS_FILE, columns=None):
+    """
+    Carga el dataset de negocios con sentimiento (cacheado por firma del archivo).
+    `columns` limita la lectura a las columnas que necesita el widget (p. ej. EMOTION_MAP_COLUMNS).
+    """
+    path = _resolve_source(file_name)
+    columns = tuple(columns) if columns else None
+    return _read_business_data(path, file_signature(path), columns)
+
+
+def load_reviews_data(file_name=REVIEWS_FILE, columns=None):
+    """
+    Carga el dataset de reseñas con sentimiento (cacheado por firma del archivo).
+    `columns` limita la lectura a las columnas que necesita el widget (p. ej. WORD_MAP_COLUMNS).
+    """
+    path = _resolve_source(file_name)
+    columns = tuple(columns) if columns else None
+    return _read_reviews_data(path, file_signature(path), columns)
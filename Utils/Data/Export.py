@@ -0,0 +1,85 @@
+import zlib
+from io import BytesIO
+
+import streamlit as st
+
+from Utils.Data.CompactTables import with_urls
+
+# --- Variables Globales ---
+# Formato -> (etiqueta, extensión, tipo MIME)
+EXPORT_FORMATS = {
+    'csv': ('CSV (.csv)', '.csv', 'text/csv'),
+    'csv.gz': ('CSV comprimido (.csv.gz)', '.csv.gz', 'application/gzip'),
+    'parquet': ('Parquet (.parquet)', '.parquet', 'application/vnd.apache.parquet'),
+}
+
+# Filas por bloque al serializar: acota la memoria temporal de la conversión
+EXPORT_CHUNK_ROWS = 5000
+
+# Columnas solo de visualización que no se incluyen en la descarga
+DISPLAY_ONLY_COLUMNS = ['color']
+
+
+def prepare_export_frame(df):
+    """
+    Quita las columnas de visualización (p. ej. 'color') y reconstruye la columna 'url'
+    de las tablas compactas, para que la descarga tenga el formato del CSV original.
+    """
+    return with_urls(df.drop(columns=[col for col in DISPLAY_ONLY_COLUMNS if col in df.columns]))
+
+
+def iter_csv_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Genera el CSV en bloques de bytes UTF-8 (el encabezado va solo en el primero)."""
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=(start == 0)).encode('utf-8')
+
+
+def iter_gzip_chunks(chunks):
+    """Comprime un flujo de bloques de bytes a gzip de forma incremental."""
+    # wbits=31 -> contenedor gzip (cabecera y CRC) sobre deflate
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_bytes(df, export_format='csv'):
+    """Serializa un DataFrame en el formato pedido ('csv', 'csv.gz' o 'parquet')."""
+    df = prepare_export_frame(df)
+    if export_format == 'csv':
+        return b''.join(iter_csv_chunks(df))
+    if export_format == 'csv.gz':
+        return b''.join(iter_gzip_chunks(iter_csv_chunks(df)))
+    if export_format == 'parquet':
+        buffer = BytesIO()
+        df.to_parquet(buffer, index=False, compression='zstd')
+        return buffer.getvalue()
+    raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_export_bytes(filter_signature, export_format, _df):
+    """
+    Exportación memorizada por firma de filtros: la misma selección de la barra lateral
+    no se vuelve a serializar. `_df` no se hashea; lo determina `filter_signature`.
+    """
+    return export_bytes(_df, export_format)
+
+
+def lazy_export(df, filter_signature, export_format='csv'):
+    """
+    Devuelve un callable sin argumentos para st.download_button: el archivo solo se
+    genera cuando el usuario hace clic (y se reutiliza si la firma ya se exportó).
+    Sin `filter_signature` no se memoriza: `_df` no forma parte de la llave del caché.
+    """
+    def _generate():
+        if filter_signature is None:
+            return export_bytes(df, export_format)
+        return cached_export_bytes(filter_signature, export_format, df)
+    return _generate
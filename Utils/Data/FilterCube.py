@@ -0,0 +1,342 @@
+"""
+Cubo de agregados para las tarjetas de KPIs: medidas presumadas por
+(sentimiento x cubeta de rating x ciudad) de la tabla de negocios y de las reseñas.
+
+Los filtros de la barra lateral forman un espacio chico y discreto (8 combinaciones de
+sentimiento y ratings mínimo/máximo en medias estrellas), así que cualquier estado se
+responde sumando celdas, sin recorrer los negocios:
+
+  - Cubeta de rating j = 2*floor(2r) + (0 si r es múltiplo exacto de 0.5, 1 si no): las
+    pares son los valores exactos (4.5) y las impares los intermedios (4.6, 4.9). El
+    rango [min, max] de los sliders es el rango contiguo de cubetas [4*min, 4*max].
+  - Sobre el eje de rating se guarda la suma acumulada: cada rango cuesta una resta.
+
+El cubo se guarda en `Datasets/indexes/` con la contribución de cada negocio. Cuando los
+datos cambian (SentimentAggregation, IngestionStore export) solo se restan y suman las
+contribuciones de los negocios nuevos, eliminados o modificados.
+
+    python -m Utils.Data.FilterCube      # construye o actualiza el cubo y reporta tiempos
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data.DataLoader import SENTIMENT_CATEGORIES
+from Utils.Data.NgramIndex import INDEX_DIR
+from Utils.Data.ProcessCache import process_cache
+from Utils.Data.SentimentAggregation import SENTIMENT_COUNT_COLUMNS
+
+# --- Variables Globales ---
+RATING_STEP = 0.5
+MAX_RATING = 5.0
+# Cubetas 0..20: 2 por media estrella (exacta e intermedia) más la de 5.0 exacto
+N_RATING_BUCKETS = int(2 * MAX_RATING / RATING_STEP) + 1
+
+REVIEW_MEASURES = tuple(SENTIMENT_COUNT_COLUMNS.values())
+CUBE_MEASURES = ('businesses', 'rated_businesses', 'rating_sum', 'yelp_reviews') + REVIEW_MEASURES
+UNKNOWN_CITY = 'Sin ciudad'
+
+CUBE_FILE = 'filter_cube.npz'
+# Cambia si cambian las medidas o las cubetas (obliga a reconstruir lo guardado en disco)
+CUBE_VERSION = 2
+
+
+# --------------------------------------------------------------------------------------
+# CUBETAS DE RATING
+# --------------------------------------------------------------------------------------
+def rating_buckets(ratings):
+    """Cubeta de cada rating (-1 = sin rating o fuera de [0, 5]: ningún slider lo incluye)."""
+    doubled = np.asarray(ratings, dtype=np.float64) * 2
+    base = np.floor(doubled)
+    buckets = np.where(np.isnan(base), -1, base * 2 + (doubled != base)).astype(np.int64)
+    return np.where((buckets >= 0) & (buckets < N_RATING_BUCKETS), buckets, -1)
+
+
+def _aligned(value):
+    return 0 <= value <= MAX_RATING and float(value / RATING_STEP).is_integer()
+
+
+def cube_supports(filters):
+    """True si el cubo responde `filters` (sin filtro de ubicación y ratings en medias estrellas)."""
+    return (filters.get('location_positions') is None
+            and _aligned(filters['min_rating']) and _aligned(filters['max_rating']))
+
+
+# --------------------------------------------------------------------------------------
+# CONTRIBUCIONES POR NEGOCIO
+# --------------------------------------------------------------------------------------
+def business_contributions(businesses, review_counts):
+    """
+    Celda y medidas de cada negocio que algún filtro puede incluir: business_id, city,
+    sentiment (código), bucket y una columna por medida. `review_counts` son los conteos
+    por sentimiento de SentimentAggregation.count_review_sentiments (índice business_id).
+    """
+    sentiment = businesses['sentiment']
+    if sentiment.dtype != 'category':
+        sentiment = sentiment.astype('category')
+    codes = sentiment.cat.set_categories(SENTIMENT_CATEGORIES).cat.codes.to_numpy()
+    ratings = businesses['rating'].to_numpy(dtype=np.float64, na_value=np.nan)
+    business_ids = businesses['business_id'].astype(object)
+    # Yelp pone rating 0 a los negocios sin reseñas: cuentan como negocios, no en el promedio
+    rated = ratings > 0
+
+    contributions = pd.DataFrame({
+        'business_id': business_ids.astype(str).to_numpy(),
+        'city': businesses['city'].astype(object).fillna(UNKNOWN_CITY).astype(str).to_numpy(),
+        'sentiment': codes.astype(np.int8),
+        'bucket': rating_buckets(ratings).astype(np.int8),
+        'businesses': 1.0,
+        'rated_businesses': rated.astype(np.float64),
+        'rating_sum': np.where(rated, ratings, 0.0),
+        'yelp_reviews': businesses['review_count'].to_numpy(dtype=np.float64, na_value=0),
+    })
+    counts = review_counts.reindex(columns=list(REVIEW_MEASURES)).reindex(business_ids.to_numpy())
+    for column in REVIEW_MEASURES:
+        contributions[column] = counts[column].to_numpy(dtype=np.float64, na_value=0)
+    keep = (contributions['sentiment'] >= 0) & (contributions['bucket'] >= 0)
+    return contributions[keep].reset_index(drop=True)
+
+
+def aggregate_by_city(contributions):
+    """Suma de las medidas por ciudad (mismo formato que query_cube)."""
+    return contributions.groupby('city')[list(CUBE_MEASURES)].sum()
+
+
+def _record_keys(contributions):
+    """Llave de cada contribución (hash del registro + ocurrencia, para registros repetidos)."""
+    hashes = pd.util.hash_pandas_object(contributions, index=False).to_numpy()
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    return pd.MultiIndex.from_arrays([hashes, occurrence])
+
+
+# --------------------------------------------------------------------------------------
+# CONSTRUCCIÓN Y ACTUALIZACIÓN INCREMENTAL
+# --------------------------------------------------------------------------------------
+def _cell_sums(contributions, city_lookup, n_cities, sign=1.0):
+    """Arreglo (sentimiento, cubeta, ciudad, medida) con las medidas de `contributions`."""
+    shape = (len(SENTIMENT_CATEGORIES), N_RATING_BUCKETS, n_cities)
+    flat = np.ravel_multi_index((
+        contributions['sentiment'].to_numpy(np.int64),
+        contributions['bucket'].to_numpy(np.int64),
+        city_lookup.get_indexer(contributions['city']),
+    ), shape)
+    size = int(np.prod(shape))
+    return np.stack([
+        np.bincount(flat, weights=sign * contributions[measure].to_numpy(np.float64), minlength=size)
+        for measure in CUBE_MEASURES
+    ], axis=-1).reshape(shape + (len(CUBE_MEASURES),))
+
+
+def _with_cumulative(cube):
+    """Agrega la suma acumulada sobre el eje de rating (con una cubeta cero al inicio)."""
+    cells = cube['cells']
+    zeros = np.zeros(cells[:, :1].shape)
+    cube['cumulative'] = np.concatenate([zeros, np.cumsum(cells, axis=1)], axis=1)
+    return cube
+
+
+def build_cube(contributions, signature=None):
+    """Cubo completo a partir de las contribuciones de todos los negocios."""
+    cities = pd.Index(np.unique(contributions['city'].to_numpy(dtype=str)))
+    cube = {
+        'signature': signature,
+        'cities': cities,
+        'cells': _cell_sums(contributions, cities, len(cities)),
+        'contributions': contributions,
+    }
+    return _with_cumulative(cube)
+
+
+def update_cube(cube, contributions, signature=None):
+    """
+    Cubo de `contributions` a partir de uno anterior: resta las contribuciones que ya no
+    están y suma las nuevas. Devuelve (cubo, {'added', 'removed'}).
+    """
+    old = cube['contributions']
+    removed = old[~_record_keys(old).isin(_record_keys(contributions))]
+    added = contributions[~_record_keys(contributions).isin(_record_keys(old))]
+
+    new_cities = np.setdiff1d(added['city'].to_numpy(dtype=str), cube['cities'].to_numpy(dtype=str))
+    cities = cube['cities'].append(pd.Index(new_cities))
+    cells = np.zeros((len(SENTIMENT_CATEGORIES), N_RATING_BUCKETS, len(cities), len(CUBE_MEASURES)))
+    cells[:, :, :len(cube['cities'])] = cube['cells']
+    cells += _cell_sums(removed, cities, len(cities), sign=-1.0)
+    cells += _cell_sums(added, cities, len(cities))
+
+    updated = {'signature': signature, 'cities': cities, 'cells': cells, 'contributions': contributions}
+    return _with_cumulative(updated), {'added': len(added), 'removed': len(removed)}
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTAS
+# --------------------------------------------------------------------------------------
+def query_cube(cube, sentiments, min_rating, max_rating):
+    """
+    Medidas por ciudad (DataFrame, índice city) de los negocios con sentimiento en
+    `sentiments` y rating en [min_rating, max_rating] (múltiplos de 0.5, ver cube_supports).
+    """
+    lo = int(round(min_rating / RATING_STEP)) * 2
+    hi = min(int(round(max_rating / RATING_STEP)) * 2, N_RATING_BUCKETS - 1)
+    totals = np.zeros((len(cube['cities']), len(CUBE_MEASURES)))
+    if lo <= hi:
+        for sentiment in sentiments:
+            code = SENTIMENT_CATEGORIES.index(sentiment)
+            totals += cube['cumulative'][code, hi + 1] - cube['cumulative'][code, lo]
+    # Las sumas acumuladas restadas dejan residuos de punto flotante en ciudades vacías
+    present = np.rint(totals[:, CUBE_MEASURES.index('businesses')]) > 0
+    return pd.DataFrame(totals[present], index=cube['cities'][present].rename('city'), columns=list(CUBE_MEASURES))
+
+
+def kpi_summary(by_city):
+    """
+    KPIs de las medidas por ciudad: negocios, rating promedio (solo negocios con rating),
+    reseñas de Yelp, reseñas analizadas, mezcla de sentimiento de esas reseñas y la tabla
+    por ciudad.
+    """
+    values = by_city[list(CUBE_MEASURES)].to_numpy(dtype=np.float64)
+    column = {measure: values[:, i] for i, measure in enumerate(CUBE_MEASURES)}
+    analyzed = sum(column[measure] for measure in REVIEW_MEASURES)
+    rated = column['rated_businesses']
+    businesses = np.rint(column['businesses']).astype(np.int64)
+    yelp_reviews = np.rint(column['yelp_reviews']).astype(np.int64)
+    # Más reseñas primero; a igual número, más negocios
+    order = np.lexsort((-businesses, -yelp_reviews))
+    cities = pd.DataFrame({
+        'businesses': businesses[order],
+        'mean_rating': np.where(rated >= 0.5, column['rating_sum'] / np.maximum(rated, 1), np.nan)[order],
+        'yelp_reviews': yelp_reviews[order],
+        'analyzed_reviews': np.rint(analyzed).astype(np.int64)[order],
+    }, index=by_city.index[order])
+
+    total_businesses, total_analyzed, total_rated = int(businesses.sum()), float(analyzed.sum()), float(rated.sum())
+    return {
+        'businesses': total_businesses,
+        'mean_rating': float(column['rating_sum'].sum() / total_rated) if total_rated >= 0.5 else None,
+        'yelp_reviews': int(yelp_reviews.sum()),
+        'analyzed_reviews': int(round(total_analyzed)),
+        'sentiment_mix': {
+            sentiment: float(column[measure].sum() / total_analyzed) if total_analyzed >= 0.5 else 0.0
+            for sentiment, measure in SENTIMENT_COUNT_COLUMNS.items()
+        },
+        'by_city': cities,
+    }
+
+
+# --------------------------------------------------------------------------------------
+# PERSISTENCIA Y CACHÉ
+# --------------------------------------------------------------------------------------
+def save_cube(cube, path):
+    """Guarda celdas, ciudades y contribuciones del cubo en un .npz con su firma."""
+    contributions = cube['contributions']
+    arrays = {
+        'version': np.array(CUBE_VERSION),
+        'signature': np.array(repr(cube['signature'])),
+        'cities': cube['cities'].to_numpy(dtype=str),
+        'cells': cube['cells'],
+        'business_id': contributions['business_id'].to_numpy(dtype=str),
+        'city': contributions['city'].to_numpy(dtype=str),
+        'sentiment': contributions['sentiment'].to_numpy(),
+        'bucket': contributions['bucket'].to_numpy(),
+        'measures': contributions[list(CUBE_MEASURES)].to_numpy(dtype=np.float64),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_cube(path):
+    """Carga un cubo guardado (con la firma como texto); None si no existe o es de otra versión."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['version']) != CUBE_VERSION:
+            return None
+        contributions = pd.DataFrame({
+            'business_id': data['business_id'].astype(object),
+            'city': data['city'].astype(object),
+            'sentiment': data['sentiment'],
+            'bucket': data['bucket'],
+        })
+        contributions[list(CUBE_MEASURES)] = data['measures']
+        cube = {
+            'signature': str(data['signature']),
+            'cities': pd.Index(data['cities'].astype(object)),
+            'cells': data['cells'],
+            'contributions': contributions,
+        }
+    return _with_cumulative(cube)
+
+
+def load_or_build_cube(path, signature, contributions):
+    """
+    Cubo de `contributions`: el guardado si su firma coincide, el guardado actualizado
+    si los datos cambiaron, o uno nuevo. Devuelve (cubo, modo: 'disco'|'incremental'|'completo').
+    """
+    saved = load_cube(path)
+    if saved is not None and saved['signature'] == repr(signature):
+        saved['signature'] = signature
+        return saved, 'disco'
+    if saved is not None:
+        cube, _ = update_cube(saved, contributions, signature)
+        mode = 'incremental'
+    else:
+        cube, mode = build_cube(contributions, signature), 'completo'
+    try:
+        save_cube(cube, path)
+    except OSError:
+        # Sin permisos de escritura (p. ej. despliegue de solo lectura): solo en memoria
+        pass
+    return cube, mode
+
+
+@process_cache(max_entries=2)
+def _cached_filter_cube(signature, _businesses, _review_counts):
+    contributions = business_contributions(_businesses, _review_counts)
+    return load_or_build_cube(os.path.join(INDEX_DIR, CUBE_FILE), signature, contributions)[0]
+
+
+def get_filter_cube(businesses, review_counts, signature=None):
+    """
+    Cubo de `businesses` y sus conteos de reseñas. Con `signature` (firmas de negocios y
+    reseñas) se prepara una vez por proceso y se persiste; sin firma se construye en el momento.
+    """
+    if signature is None:
+        return build_cube(business_contributions(businesses, review_counts))
+    return _cached_filter_cube((signature, len(businesses)), businesses, review_counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye o actualiza el cubo de KPIs del dashboard.")
+    parser.add_argument('--full', action='store_true', help="Ignora el cubo guardado y lo reconstruye.")
+    args = parser.parse_args()
+
+    from Utils.Data import DataLoader as data_loader
+    from Utils.Data.Queries import review_sentiment_counts
+
+    started = time.perf_counter()
+    businesses = data_loader.load_business_data()
+    review_counts = review_sentiment_counts()
+    # Misma firma que get_filter_cube (la del cubo guardado que usa el dashboard)
+    signature = ((data_loader.dataset_signature(data_loader.BUSINESS_FILE),
+                  data_loader.dataset_signature(data_loader.REVIEWS_FILE)), len(businesses))
+    contributions = business_contributions(businesses, review_counts)
+    loaded = time.perf_counter()
+    path = os.path.join(INDEX_DIR, CUBE_FILE)
+    if args.full and os.path.exists(path):
+        os.remove(path)
+    cube, mode = load_or_build_cube(path, signature, contributions)
+    built = time.perf_counter()
+    summary = kpi_summary(query_cube(cube, SENTIMENT_CATEGORIES, 0.0, MAX_RATING))
+    print(f"Cubo {mode}: {len(contributions):,} negocios, {len(cube['cities']):,} ciudades, "
+          f"{cube['cells'].nbytes / 1024:,.0f} KB (carga {loaded - started:.2f} s, cubo {built - loaded:.3f} s)")
+    print(f"{summary['businesses']:,} negocios, rating promedio {summary['mean_rating']:.2f}, "
+          f"{summary['yelp_reviews']:,} reseñas en Yelp, {summary['analyzed_reviews']:,} analizadas")
+    print(summary['by_city'].head(10).to_string())
+
+
+if __name__ == '__main__':
+    main()
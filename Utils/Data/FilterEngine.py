@@ -0,0 +1,88 @@
+import numpy as np
+
+from Utils.Data.DataLoader import SENTIMENT_CATEGORIES
+from Utils.Data.ProcessCache import process_cache
+
+# --- Variables Globales ---
+# Definición del diccionario de colores para pydeck
+COLOR_MAPPING = {
+    'Positivo': [0, 128, 0, 180],    # Verde
+    'Negativo': [255, 0, 0, 180],    # Rojo
+    'Neutral': [255, 255, 0, 180],   # Amarillo
+}
+# Color para negocios sin sentimiento (código de categoría -1)
+MISSING_COLOR = [128, 128, 128, 180]  # Gris
+
+# Tabla de colores indexada por (código de categoría + 1): la fila 0 es el faltante
+COLOR_LUT = np.array(
+    [MISSING_COLOR] + [COLOR_MAPPING[sentiment] for sentiment in SENTIMENT_CATEGORIES],
+    dtype=np.uint8,
+)
+
+
+# --------------------------------------------------------------------------------------
+# ÍNDICE DE FILTRADO (se construye una vez por dataset)
+#   sentiment_codes -> código de categoría por fila (-1 = sin sentimiento)
+#   rating_order    -> posiciones de las filas ordenadas por rating
+#   ratings_sorted  -> ratings en ese orden (para búsqueda binaria del rango)
+# --------------------------------------------------------------------------------------
+def build_filter_index(df):
+    """Precalcula los códigos de sentimiento y el orden por rating de un DataFrame de negocios."""
+    sentiment = df['sentiment']
+    if sentiment.dtype != 'category':
+        sentiment = sentiment.astype('category')
+    sentiment = sentiment.cat.set_categories(SENTIMENT_CATEGORIES)
+
+    ratings = df['rating'].to_numpy(dtype=np.float64, na_value=np.nan)
+    # Orden estable: a igual rating se conserva el orden original de las filas
+    rating_order = np.argsort(ratings, kind='stable')
+
+    return {
+        'n_rows': len(df),
+        'sentiment_codes': sentiment.cat.codes.to_numpy(),
+        'rating_order': rating_order,
+        'ratings_sorted': ratings[rating_order],
+    }
+
+
+@process_cache(max_entries=4)
+def _cached_filter_index(signature, _df):
+    return build_filter_index(_df)
+
+
+def get_filter_index(df, signature=None):
+    """
+    Índice de filtrado de `df`. Con `signature` (firma del dataset de origen) se construye
+    una sola vez por proceso; sin firma se construye en el momento.
+    """
+    if signature is None:
+        return build_filter_index(df)
+    return _cached_filter_index((signature, len(df)), df)
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTAS
+# --------------------------------------------------------------------------------------
+def filter_positions(filter_index, sentiments, min_rating, max_rating):
+    """
+    Devuelve las posiciones (en orden original) de las filas cuyo sentimiento está en
+    `sentiments` y cuyo rating cae en [min_rating, max_rating], en una sola pasada:
+    el rango de rating se resuelve con búsqueda binaria y el sentimiento con una tabla.
+    """
+    ratings_sorted = filter_index['ratings_sorted']
+    start = np.searchsorted(ratings_sorted, min_rating, side='left')
+    stop = np.searchsorted(ratings_sorted, max_rating, side='right')
+    candidates = filter_index['rating_order'][start:stop]
+
+    allowed = np.zeros(len(SENTIMENT_CATEGORIES) + 1, dtype=bool)
+    for sentiment in sentiments:
+        allowed[SENTIMENT_CATEGORIES.index(sentiment) + 1] = True
+
+    keep = allowed[filter_index['sentiment_codes'][candidates] + 1]
+    return np.sort(candidates[keep])
+
+
+def sentiment_colors(filter_index, positions):
+    """Colores RGBA por fila (listas para pydeck) obtenidos de la tabla COLOR_LUT."""
+    codes = filter_index['sentiment_codes'][positions]
+    return COLOR_LUT[codes + 1].tolist()
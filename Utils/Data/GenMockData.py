@@ -1,43 +1,389 @@
-import streamlit as st
+"""
+Generador de datos simulados con el mismo esquema que los datasets reales.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.GenMockData --businesses 10000 --reviews 5000000
+    python -m Utils.Data.GenMockData --format feather --output-dir Datasets/mock
+
+Para correr el dashboard sobre los datos simulados:
+
+    SHINY_STATS_DATASETS_DIR=Datasets/mock streamlit run streamlit_app.py
+"""
+import argparse
+import os
+import time
+
 import pandas as pd
 import numpy as np
-import pydeck as pdk
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.FilterEngine import COLOR_MAPPING
+from Utils.Data.SentimentAggregation import (
+    BUSINESS_OUTPUT_COLUMNS,
+    LABEL_COLORS,
+    SENTIMENT_COUNT_COLUMNS,
+    business_scores,
+)
 
 # --- Variables Globales ---
-# Definición del diccionario de colores para pydeck
-COLOR_MAPPING = {
-    'Positivo': [0, 128, 0, 180],    # Verde
-    'Negativo': [255, 0, 0, 180],    # Rojo
-    'Neutral': [255, 255, 0, 180],   # Amarillo
+MOCK_DATASETS_DIR = os.path.join(data_loader.DATASETS_DIR, 'mock')
+MOCK_CHUNK_ROWS = 500_000
+
+REVIEW_COLUMNS = ['review_id', 'business_id', 'user_id', 'user_name', 'rating', 'text', 'time_created', 'url', 'sentiment']
+
+# Ciudades de Florida: (centro lat, centro lon, zip base, peso relativo)
+FLORIDA_CITIES = {
+    'Miami': (25.7617, -80.1918, 33125, 8),
+    'Fort Lauderdale': (26.1224, -80.1373, 33301, 7),
+    'Boca Raton': (26.3683, -80.1289, 33431, 5),
+    'Tallahassee': (30.4383, -84.2807, 32301, 5),
+    'Davie': (26.0765, -80.2521, 33314, 4),
+    'Fort Myers': (26.6406, -81.8723, 33901, 4),
+    'Pompano Beach': (26.2379, -80.1248, 33060, 4),
+    'Tampa': (27.9506, -82.4572, 33602, 6),
+    'Jacksonville': (30.3322, -81.6557, 32202, 6),
+    'Hollywood': (26.0112, -80.1495, 33019, 4),
+    'Gainesville': (29.6516, -82.3248, 32601, 4),
+    'Orlando': (28.5383, -81.3792, 32801, 6),
+    'St. Petersburg': (27.7676, -82.6403, 33701, 4),
+    'Cape Coral': (26.5629, -81.9495, 33904, 3),
+    'Sarasota': (27.3364, -82.5307, 34236, 3),
+    'Pensacola': (30.4213, -87.2169, 32501, 3),
+    'West Palm Beach': (26.7153, -80.0534, 33401, 4),
+    'Naples': (26.1420, -81.7948, 34102, 3),
+}
+
+CATEGORY_OPTIONS = {
+    'Auto Detailing': 0.35,
+    'Auto Detailing, Car Wash': 0.34,
+    'Car Wash, Auto Detailing': 0.22,
+    'Car Wash': 0.03,
+    'Auto Detailing, Pressure Washers': 0.03,
+    'Auto Detailing, Car Window Tinting': 0.03,
 }
+SORT_BY_OPTIONS = {'best_match': 0.83, 'distance': 0.15, 'rating': 0.02}
+
+NAME_PREFIXES = ['Shiny', 'Elite', 'Diamond', 'Premier', 'Sunshine', 'Coastal', 'Gulf', 'Royal', 'Precision',
+                 'Mobile', 'Ultimate', 'Pro', 'Crystal', 'Gator', 'Palm', 'Ocean', 'Supreme', 'Express']
+NAME_SUFFIXES = ['Auto Detailing', 'Mobile Detailing', 'Car Wash', 'Auto Spa', 'Detail Co',
+                 'Ceramic Coating', 'Auto Care', 'Shine', 'Hand Wash', 'Detailing & Tint']
+FIRST_NAMES = ['Laura', 'Debra', 'Jeannie', 'Seph', 'Bruce', 'Sara', 'Joel', 'Cindy', 'Reggie', 'Maria',
+               'Carlos', 'Ana', 'John', 'Ashley', 'Mike', 'Jessica', 'David', 'Nicole', 'Luis', 'Karen']
+
+# Fragmentos de texto por sentimiento (las reseñas reales vienen truncadas a ~160 caracteres)
+REVIEW_FRAGMENTS = {
+    'positivo': ['They did an outstanding job on my truck.', 'The interior looks brand new.',
+                 'Showed up on time and were very professional.', 'Great price for a full detail.',
+                 'The ceramic coating came out amazing.', 'Highly recommend this mobile detailer.',
+                 'Every stain in the seats is gone.', 'Friendly staff and quick service.',
+                 'Will definitely be back for another wash.', 'Attention to detail was impressive.'],
+    'neutral': ['The wash was okay but took longer than expected.', 'Decent service for the price.',
+                'Some spots were missed on the windows.', 'Nothing special, it was fine.',
+                'Communication could be better.', 'The exterior was good, interior average.'],
+    'negativo': ['They left scratches on the paint.', 'Waited over two hours past the appointment.',
+                 'The price changed after the job was done.', 'Never showed up and never called back.',
+                 'Water spots everywhere after the wash.', 'Rude staff and poor customer service.',
+                 'The interior still smelled and had stains.', 'Damaged my rims and refused to pay.'],
+}
+REVIEW_TEXT_CHARS = 160
+# Fracción de textos truncados con '...' (como los devuelve la API de Yelp)
+TRUNCATED_SHARE = 0.79
+TEXT_POOL_SIZE = 4096
+
+REVIEW_DATE_RANGE = ('2011-05-01', '2025-09-30')
+URL_TRACKING = 'adjust_creative={token}&utm_campaign=yelp_api_v3&utm_medium={medium}&utm_source={token}'
+_ID_ALPHABET = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'))
+
+
+# --------------------------------------------------------------------------------------
+# UTILIDADES VECTORIZADAS
+# --------------------------------------------------------------------------------------
+def _random_ids(rng, n, length=22):
+    """Identificadores tipo Yelp (base64 url-safe) sin bucle de Python."""
+    chars = _ID_ALPHABET[rng.integers(0, len(_ID_ALPHABET), size=(n, length))]
+    return np.ascontiguousarray(chars).view(f'<U{length}').ravel().astype(object)
+
+
+def _choice(rng, options, n):
+    """Elige n valores de un diccionario {valor: probabilidad}."""
+    values = np.array(list(options), dtype=object)
+    probs = np.array(list(options.values()), dtype=np.float64)
+    return values[rng.choice(len(values), size=n, p=probs / probs.sum())]
+
+
+def _slugify(names):
+    return names.str.lower().str.replace(r'[^a-z0-9]+', '-', regex=True).str.strip('-')
+
+
+def _text_pool(rng, sentiment, size=TEXT_POOL_SIZE):
+    """Textos distintos armados con fragmentos; las reseñas se muestrean de este pool."""
+    fragments = REVIEW_FRAGMENTS[sentiment]
+    pool = []
+    for _ in range(size):
+        text = ' '.join(fragments[i] for i in rng.permutation(len(fragments)))
+        if rng.random() < TRUNCATED_SHARE and len(text) > REVIEW_TEXT_CHARS - 3:
+            text = text[:REVIEW_TEXT_CHARS - 3].rstrip() + '...'
+        else:
+            text = text[:rng.integers(40, REVIEW_TEXT_CHARS)].rsplit(' ', 1)[0] + '.'
+        pool.append(text)
+    return np.array(pool, dtype=object)
+
 
 # --------------------------------------------------------------------------------------
-# FUNCIÓN DE GENERACIÓN DE DATOS SIMULADOS (Mock Data)
-# Nota: En una aplicación real, esta función se reemplazaría por la lectura de tus datos
-# de Yelp, Google Maps y la aplicación de tu modelo de NLP.
+# NEGOCIOS
 # --------------------------------------------------------------------------------------
+def generate_mock_businesses(num_businesses=100, seed=42):
+    """
+    Negocios con el esquema de df_business_with_sentiment.csv (las columnas derivadas
+    de las reseñas se completan en `generate_mock_dataset`).
+    """
+    rng = np.random.default_rng(seed)
+    cities = np.array(list(FLORIDA_CITIES), dtype=object)
+    city_info = np.array([info[:3] for info in FLORIDA_CITIES.values()], dtype=np.float64)
+    city_weights = np.array([info[3] for info in FLORIDA_CITIES.values()], dtype=np.float64)
+    city_codes = rng.choice(len(cities), size=num_businesses, p=city_weights / city_weights.sum())
+
+    names = pd.Series(
+        np.array(NAME_PREFIXES, dtype=object)[rng.integers(0, len(NAME_PREFIXES), num_businesses)] + ' ' +
+        np.array(NAME_SUFFIXES, dtype=object)[rng.integers(0, len(NAME_SUFFIXES), num_businesses)]
+    )
+    city = pd.Series(cities[city_codes])
+    token = _random_ids(rng, 1)[0]
+    urls = ('https://www.yelp.com/biz/' + _slugify(names) + '-' + _slugify(city) + '-' +
+            pd.Series(rng.integers(1, 9, num_businesses)).astype(str) + '?' +
+            URL_TRACKING.format(token=token, medium='api_v3_business_search'))
+
+    return pd.DataFrame({
+        'business_id': _random_ids(rng, num_businesses),
+        'name': names,
+        'city': city,
+        'state': 'FL',
+        'zip_code': (city_info[city_codes, 2] + rng.integers(0, 60, num_businesses)).astype(np.float64),
+        'categories': _choice(rng, CATEGORY_OPTIONS, num_businesses),
+        'rating': 0.0,
+        'review_count': 0,
+        'latitude': city_info[city_codes, 0] + rng.normal(0, 0.06, num_businesses),
+        'longitude': city_info[city_codes, 1] + rng.normal(0, 0.06, num_businesses),
+        'url': urls,
+        'source_city_query': city,
+        'source_variant': 'term=car detailing',
+        'source_sort_by': _choice(rng, SORT_BY_OPTIONS, num_businesses),
+        'review_count_from_reviews': 0,
+        'sentiment': 'Neutral',
+        'color': LABEL_COLORS['Neutral'],
+    })
+
+
 def generate_mock_data(num_businesses=100):
     """Genera datos simulados para negocios de detailing en Florida."""
-    np.random.seed(42)
-
-    # Coordenadas aproximadas para simular ubicaciones en Florida (alrededor de Orlando, Tampa, Miami)
-    latitudes = np.random.uniform(25.7, 30.5, num_businesses)
-    longitudes = np.random.uniform(-82.8, -80.1, num_businesses)
-
-    # Datos de Sentimiento y Calificación
-    sentiments = np.random.choice(['Positivo', 'Negativo', 'Neutral'], num_businesses, p=[0.55, 0.25, 0.20])
-    ratings = np.random.choice([3.0, 3.5, 4.0, 4.5, 5.0], num_businesses, p=[0.05, 0.1, 0.35, 0.3, 0.2])
-
-    data = pd.DataFrame({
-        'name': [f'Detailing Pro {i}' for i in range(num_businesses)],
-        'latitude': latitudes,
-        'longitude': longitudes,
-        'sentiment': sentiments,
-        'rating': ratings,
-        'review_count': np.random.randint(10, 500, num_businesses)
-    })
-    
-    # Añadir la columna RGB para PyDeck
-    data['color'] = data['sentiment'].apply(lambda x: COLOR_MAPPING[x])
-    
-    return data
\ No newline at end of file
+    businesses, _ = generate_mock_dataset(num_businesses, num_businesses * 5, seed=42)
+    # Añadir la columna RGB para PyDeck (lista por fila, como la usa el mapa)
+    businesses['color'] = businesses['sentiment'].map(COLOR_MAPPING)
+    return businesses
+
+
+# --------------------------------------------------------------------------------------
+# RESEÑAS (por bloques, para escalar a millones de filas con memoria acotada)
+# --------------------------------------------------------------------------------------
+def _reviews_per_business(rng, num_businesses, num_reviews, empty_share=0.25):
+    """Reparte las reseñas con una distribución de cola larga; ~25 % de negocios sin reseñas."""
+    weights = rng.lognormal(mean=0.0, sigma=1.2, size=num_businesses)
+    weights[rng.random(num_businesses) < empty_share] = 0.0
+    if weights.sum() == 0:
+        weights[:] = 1.0
+    return rng.multinomial(num_reviews, weights / weights.sum())
+
+
+def _review_chunk(rng, businesses, business_codes, quality, text_pools, start, end):
+    n = len(business_codes)
+    # Rating correlacionado con la calidad del negocio; sentimiento derivado del rating
+    good = rng.random(n) < quality[business_codes]
+    rating = np.where(good,
+                      rng.choice([5, 4], size=n, p=[0.94, 0.06]),
+                      rng.choice([1, 2, 3], size=n, p=[0.73, 0.15, 0.12])).astype(np.int8)
+    sentiment = np.where(rating >= 4, 'positivo', np.where(rating <= 2, 'negativo', 'neutral')).astype(object)
+
+    text = np.empty(n, dtype=object)
+    for label, pool in text_pools.items():
+        rows = np.flatnonzero(sentiment == label)
+        text[rows] = pool[rng.integers(0, len(pool), len(rows))]
+
+    # Fechas sesgadas hacia los años recientes
+    span = (end - start).astype(np.int64)
+    time_created = start + (span * rng.beta(3.0, 1.2, n)).astype('timedelta64[s]')
+
+    review_id = _random_ids(rng, n)
+    business_url = businesses['url'].to_numpy(dtype=object)[business_codes]
+    base_url = pd.Series(business_url).str.split('?', n=1).str[0].to_numpy(dtype=object)
+    token = businesses['url'].iat[0].split('adjust_creative=', 1)[1].split('&', 1)[0]
+    tracking = URL_TRACKING.format(token=token, medium='api_v3_business_reviews').split('&', 1)
+    url = base_url + '?' + tracking[0] + '&hrid=' + review_id + '&' + tracking[1]
+
+    return pd.DataFrame({
+        'review_id': review_id,
+        'business_id': businesses['business_id'].to_numpy(dtype=object)[business_codes],
+        'user_id': _random_ids(rng, n),
+        'user_name': (np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)] + ' ' +
+                      _ID_ALPHABET[rng.integers(0, 26, n)].astype(object) + '.'),
+        'rating': rating,
+        'text': text,
+        'time_created': time_created,
+        'url': url,
+        'sentiment': sentiment,
+    }, columns=REVIEW_COLUMNS)
+
+
+def iter_mock_reviews(businesses, num_reviews, seed=42, chunk_rows=MOCK_CHUNK_ROWS):
+    """Genera las reseñas por bloques de `chunk_rows` filas (agrupadas por negocio)."""
+    rng = np.random.default_rng(seed + 1)
+    per_business = _reviews_per_business(rng, len(businesses), num_reviews)
+    business_codes = np.repeat(np.arange(len(businesses)), per_business)
+    quality = rng.beta(4.0, 1.0, len(businesses))
+    text_pools = {label: _text_pool(rng, label) for label in REVIEW_FRAGMENTS}
+    start, end = (np.datetime64(day, 's') for day in REVIEW_DATE_RANGE)
+
+    for offset in range(0, len(business_codes), chunk_rows):
+        yield _review_chunk(rng, businesses, business_codes[offset:offset + chunk_rows],
+                            quality, text_pools, start, end)
+
+
+def _apply_review_stats(businesses, per_business):
+    """Completa conteo, rating, etiqueta y color de cada negocio a partir de sus reseñas."""
+    counts = pd.DataFrame(per_business['counts'], columns=list(SENTIMENT_COUNT_COLUMNS.values()))
+    scores = business_scores(counts)
+    total = per_business['counts'].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_rating = np.round(per_business['rating_sum'] / total, 1)
+
+    businesses['review_count_from_reviews'] = total
+    # Como en los datos reales, un negocio sin reseñas en la API no tiene rating ni conteo
+    businesses['review_count'] = total + np.where(total > 0, per_business['extra_reviews'], 0)
+    businesses['rating'] = np.nan_to_num(mean_rating, nan=0.0)
+    businesses['sentiment'] = scores['sentiment'].to_numpy()
+    businesses['color'] = businesses['sentiment'].map(LABEL_COLORS)
+    return businesses[BUSINESS_OUTPUT_COLUMNS]
+
+
+def _accumulate_review_stats(stats, businesses, chunk):
+    codes = pd.Index(businesses['business_id']).get_indexer(chunk['business_id'])
+    sentiment = pd.Categorical(chunk['sentiment'].str.title(), categories=list(SENTIMENT_COUNT_COLUMNS))
+    n_businesses = len(businesses)
+    for col in range(len(SENTIMENT_COUNT_COLUMNS)):
+        stats['counts'][:, col] += np.bincount(codes[sentiment.codes == col], minlength=n_businesses)
+    stats['rating_sum'] += np.bincount(codes, weights=chunk['rating'], minlength=n_businesses)
+
+
+def _new_review_stats(rng, n_businesses):
+    return {
+        'counts': np.zeros((n_businesses, len(SENTIMENT_COUNT_COLUMNS)), dtype=np.int64),
+        'rating_sum': np.zeros(n_businesses, dtype=np.float64),
+        # Yelp reporta más reseñas de las que devuelve la API
+        'extra_reviews': rng.poisson(8, n_businesses),
+    }
+
+
+def generate_mock_dataset(num_businesses=100, num_reviews=500, seed=42):
+    """Negocios y reseñas simulados en memoria (para volúmenes que caben en RAM)."""
+    businesses = generate_mock_businesses(num_businesses, seed)
+    stats = _new_review_stats(np.random.default_rng(seed + 2), num_businesses)
+    chunks = []
+    for chunk in iter_mock_reviews(businesses, num_reviews, seed):
+        _accumulate_review_stats(stats, businesses, chunk)
+        chunks.append(chunk)
+    reviews = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=REVIEW_COLUMNS)
+    return _apply_review_stats(businesses, stats), reviews
+
+
+# --------------------------------------------------------------------------------------
+# ESCRITURA A DISCO (CSV o Feather, con la misma estructura que 'Datasets')
+# --------------------------------------------------------------------------------------
+def _as_columnar(df):
+    """
+    Sentimiento con el esquema de las copias columnares de BuildDatasets.py (categoría
+    'Positivo'/'Neutral'/'Negativo'): DataLoader no vuelve a parsear los archivos Feather.
+    """
+    df = df.copy()
+    df['sentiment'] = pd.Categorical(df['sentiment'].str.title(), categories=data_loader.SENTIMENT_CATEGORIES)
+    return df
+
+
+class _ReviewsWriter:
+    """Escribe los bloques de reseñas a CSV (append) o a un archivo Arrow IPC (Feather)."""
+
+    def __init__(self, path, file_format, compression='zstd'):
+        self.path, self.file_format, self.compression = path, file_format, compression
+        self.writer = None
+
+    def write(self, chunk):
+        if self.file_format == 'csv':
+            chunk.to_csv(self.path, mode='a' if self.writer else 'w', header=self.writer is None,
+                         index=False, date_format='%Y-%m-%d %H:%M:%S')
+            self.writer = True
+            return
+        import pyarrow as pa
+        from pyarrow import ipc
+        table = pa.Table.from_pandas(_as_columnar(chunk), preserve_index=False)
+        if self.writer is None:
+            options = ipc.IpcWriteOptions(compression=None if self.compression == 'uncompressed' else self.compression)
+            self.writer = ipc.new_file(self.path, table.schema, options=options)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.file_format != 'csv' and self.writer is not None:
+            self.writer.close()
+
+
+def write_mock_datasets(output_dir=MOCK_DATASETS_DIR, num_businesses=10_000, num_reviews=5_000_000,
+                        file_format='csv', seed=42, chunk_rows=MOCK_CHUNK_ROWS):
+    """
+    Escribe negocios y reseñas simulados con los nombres de archivo de 'Datasets'.
+    En formato Feather se escriben en `<output_dir>/columnar/`, donde los busca DataLoader.
+    Devuelve las rutas escritas.
+    """
+    if file_format == 'feather':
+        target_dir = os.path.join(output_dir, os.path.basename(data_loader.COLUMNAR_DIR))
+        stem = lambda name: os.path.splitext(name)[0] + data_loader.COLUMNAR_EXTENSION
+    else:
+        target_dir = output_dir
+        stem = lambda name: name
+    os.makedirs(target_dir, exist_ok=True)
+    business_path = os.path.join(target_dir, stem(data_loader.BUSINESS_FILE))
+    reviews_path = os.path.join(target_dir, stem(data_loader.REVIEWS_FILE))
+
+    businesses = generate_mock_businesses(num_businesses, seed)
+    stats = _new_review_stats(np.random.default_rng(seed + 2), num_businesses)
+    writer = _ReviewsWriter(reviews_path, file_format)
+    try:
+        for chunk in iter_mock_reviews(businesses, num_reviews, seed, chunk_rows):
+            _accumulate_review_stats(stats, businesses, chunk)
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+    businesses = _apply_review_stats(businesses, stats)
+    if file_format == 'feather':
+        _as_columnar(businesses).to_feather(business_path)
+    else:
+        businesses.to_csv(business_path, index=False)
+    return business_path, reviews_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datasets simulados con el esquema de 'Datasets'.")
+    parser.add_argument('--businesses', type=int, default=10_000)
+    parser.add_argument('--reviews', type=int, default=5_000_000)
+    parser.add_argument('--format', choices=['csv', 'feather'], default='csv')
+    parser.add_argument('--output-dir', default=MOCK_DATASETS_DIR)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = write_mock_datasets(args.output_dir, args.businesses, args.reviews, args.format, args.seed)
+    for path in paths:
+        print(f"{path}: {os.path.getsize(path) / 1e6:,.1f} MB")
+    print(f"Generado en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
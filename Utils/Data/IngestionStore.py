@@ -0,0 +1,429 @@
+"""
+Almacén local de ingesta para scrapes de negocios y reseñas (solo se agregan lotes).
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.IngestionStore ingest --businesses scrape/businesses.csv --reviews scrape/reviews.csv
+    python -m Utils.Data.IngestionStore export --output-dir Datasets
+    python -m Utils.Data.IngestionStore status
+    python -m Utils.Data.IngestionStore compact
+
+Estructura de `Datasets/store/`:
+
+    raw/batch-000001/{businesses,reviews}.feather   lote tal como llegó (historial inmutable)
+    derived/businesses/part-000001.feather          negocios del lote (versión del scrape)
+    derived/review_counts/part-000001.feather       reseñas nuevas por sentimiento y negocio
+    derived/reviews/part-000001.feather             reseñas nuevas (únicas) de cada lote
+    index/{businesses,reviews}/part-000001.npz      índice hash de las llaves nuevas del lote
+    manifest.json                                   lotes ingeridos y sus conteos
+
+Deduplicación: una reseña se guarda solo la primera vez que aparece su review_id (las
+reseñas no cambian); un negocio repetido se actualiza (gana el scrape más reciente,
+p. ej. con rating y review_count actualizados). Ingerir un lote cuesta en proporción al
+lote: cada tabla recibe una parte nueva y las existentes no se reescriben; solo se
+consulta el índice hash. Cuando una tabla acumula más de COMPACT_PARTS partes se unen
+en una base (`base-<lote>`) que reemplaza a las anteriores, así que el costo de
+compactar se reparte entre muchos lotes.
+
+Las reseñas deben llegar con la columna `sentiment` (Utils.Data.SentimentScoring las
+etiqueta); sin ella no entrarían en los conteos y el lote se rechaza.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.SentimentAggregation import (
+    BUSINESS_SOURCE_FILE,
+    SENTIMENT_COUNT_COLUMNS,
+    apply_scores_to_businesses,
+    business_scores,
+    count_review_sentiments,
+)
+
+# --- Variables Globales ---
+STORE_DIR = os.path.join(data_loader.DATASETS_DIR, 'store')
+MANIFEST_FILE = 'manifest.json'
+BATCH_PATTERN = 'batch-{:06d}'
+PART_PATTERN = '{kind}-{number:06d}{extension}'
+_PART_FILE = re.compile(r'^(part|base)-(\d{6})(\.feather|\.npz)$')
+# Partes vigentes por tabla a partir de las cuales se compactan en una base
+COMPACT_PARTS = 16
+
+BUSINESS_KEY = 'business_id'
+REVIEW_KEY = 'review_id'
+
+
+# --------------------------------------------------------------------------------------
+# ÍNDICE HASH (llaves -> uint64 ordenados + fila en la tabla derivada)
+# --------------------------------------------------------------------------------------
+def key_hashes(keys):
+    """Hash de 64 bits (blake2b) de cada llave, como uint64."""
+    digests = b''.join(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest() for key in keys)
+    return np.frombuffer(digests, dtype='<u8').copy()
+
+
+def empty_index():
+    return {'hashes': np.empty(0, dtype=np.uint64), 'rows': np.empty(0, dtype=np.int64)}
+
+
+def index_lookup(index, hashes):
+    """Fila de cada hash en la tabla derivada, o -1 si la llave no se ha visto."""
+    if len(index['hashes']) == 0:
+        return np.full(len(hashes), -1, dtype=np.int64)
+    slots = np.minimum(np.searchsorted(index['hashes'], hashes), len(index['hashes']) - 1)
+    return np.where(index['hashes'][slots] == hashes, index['rows'][slots], -1)
+
+
+def index_insert(index, hashes, rows):
+    """Agrega llaves nuevas (no presentes) manteniendo el orden."""
+    all_hashes = np.concatenate([index['hashes'], hashes])
+    all_rows = np.concatenate([index['rows'], rows])
+    order = np.argsort(all_hashes, kind='stable')
+    return {'hashes': all_hashes[order], 'rows': all_rows[order]}
+
+
+def parts_lookup(parts, hashes):
+    """index_lookup sobre las partes del índice (cada llave está en una sola parte)."""
+    rows = np.full(len(hashes), -1, dtype=np.int64)
+    for part in parts:
+        found = index_lookup(part, hashes)
+        rows = np.where(found >= 0, found, rows)
+    return rows
+
+
+def _new_unique(hashes, parts):
+    """Posiciones (en el lote) de la primera aparición de cada llave aún no indexada."""
+    _, first = np.unique(hashes, return_index=True)
+    first = np.sort(first)
+    return first[parts_lookup(parts, hashes[first]) < 0]
+
+
+# --------------------------------------------------------------------------------------
+# PERSISTENCIA DEL ALMACÉN
+# --------------------------------------------------------------------------------------
+def _path(store_dir, *parts):
+    return os.path.join(store_dir, *parts)
+
+
+def _write_feather(df, path):
+    """Escritura atómica (temporal + rename) para no dejar archivos a medias."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    df.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _part_path(directory, number, extension, kind='part'):
+    return os.path.join(directory, PART_PATTERN.format(kind=kind, number=number, extension=extension))
+
+
+def _part_files(directory, extension):
+    """
+    Archivos vigentes de una tabla, en orden de ingesta: la base compactada más reciente
+    y las partes posteriores a ella (las anteriores quedan cubiertas por la base).
+    """
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _PART_FILE.match(name)
+        if match and match.group(3) == extension:
+            found.append((int(match.group(2)), match.group(1), name))
+    base_number = max((number for number, kind, _ in found if kind == 'base'), default=0)
+    live = sorted((number, kind == 'part', name) for number, kind, name in found
+                  if (kind == 'base' and number == base_number) or (kind == 'part' and number > base_number))
+    return [os.path.join(directory, name) for _, _, name in live]
+
+
+def _read_parts(directory):
+    return [pd.read_feather(path) for path in _part_files(directory, '.feather')]
+
+
+def _save_npz(index, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, hashes=index['hashes'], rows=index['rows'])
+    os.replace(tmp_path, path)
+
+
+def _read_npz(path):
+    with np.load(path) as data:
+        return {'hashes': data['hashes'], 'rows': data['rows']}
+
+
+def _load_index(store_dir, name):
+    """Partes del índice hash de `name` (cada una con las llaves nuevas de un lote)."""
+    return [_read_npz(path) for path in _part_files(_path(store_dir, 'index', name), '.npz')]
+
+
+def _save_index_part(store_dir, name, batch_number, hashes, rows):
+    if len(hashes):
+        _save_npz(index_insert(empty_index(), hashes, rows),
+                  _part_path(_path(store_dir, 'index', name), batch_number, '.npz'))
+
+
+def load_manifest(store_dir=STORE_DIR):
+    path = _path(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'batches': [], 'review_rows': 0}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def _save_manifest(store_dir, manifest):
+    path = _path(store_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as handle:
+        json.dump(manifest, handle, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _frame_digest(df):
+    """Huella del contenido del lote (para que reingerir el mismo archivo no haga nada)."""
+    if df is None:
+        return None
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+# --------------------------------------------------------------------------------------
+# INGESTA INCREMENTAL
+# --------------------------------------------------------------------------------------
+def _sentiment_labels(reviews):
+    return reviews['sentiment'].astype('string').str.strip().str.title()
+
+
+def check_review_sentiments(reviews):
+    """Error si alguna reseña llega sin sentimiento reconocido (no entraría en los conteos)."""
+    if 'sentiment' not in reviews.columns:
+        raise ValueError(
+            "Las reseñas no tienen la columna 'sentiment'. Etiquétalas antes de ingerirlas: "
+            "python -m Utils.Data.SentimentScoring --input <reseñas.csv>"
+        )
+    unlabeled = ~_sentiment_labels(reviews).isin(list(SENTIMENT_COUNT_COLUMNS)).to_numpy(dtype=bool)
+    if unlabeled.any():
+        raise ValueError(
+            f"{int(unlabeled.sum())} reseñas sin sentimiento reconocido "
+            f"({', '.join(SENTIMENT_COUNT_COLUMNS)}); etiquétalas con Utils.Data.SentimentScoring."
+        )
+
+
+def _upsert_businesses(store_dir, batch, batch_number):
+    """Guarda la versión del lote de cada negocio; devuelve (nuevos, actualizados)."""
+    batch = batch.drop_duplicates(BUSINESS_KEY, keep='last').reset_index(drop=True)
+    hashes = key_hashes(batch[BUSINESS_KEY])
+    existing = parts_lookup(_load_index(store_dir, 'businesses'), hashes) >= 0
+
+    _write_feather(batch, _part_path(_path(store_dir, 'derived', 'businesses'), batch_number, '.feather'))
+    new_hashes = hashes[~existing]
+    _save_index_part(store_dir, 'businesses', batch_number, new_hashes,
+                     np.full(len(new_hashes), batch_number, dtype=np.int64))
+    return int((~existing).sum()), int(existing.sum())
+
+
+def _append_reviews(store_dir, batch, batch_number, manifest):
+    """Agrega solo las reseñas con review_id nuevo y sus conteos por negocio."""
+    hashes = key_hashes(batch[REVIEW_KEY])
+    keep = _new_unique(hashes, _load_index(store_dir, 'reviews'))
+    new_reviews = batch.iloc[keep].reset_index(drop=True)
+    if new_reviews.empty:
+        return 0
+
+    first_row = manifest['review_rows']
+    _write_feather(new_reviews, _part_path(_path(store_dir, 'derived', 'reviews'), batch_number, '.feather'))
+    rows = np.arange(first_row, first_row + len(new_reviews), dtype=np.int64)
+    _save_index_part(store_dir, 'reviews', batch_number, hashes[keep], rows)
+    manifest['review_rows'] = first_row + len(new_reviews)
+
+    sentiments = new_reviews[[REVIEW_KEY, BUSINESS_KEY]].assign(sentiment=_sentiment_labels(new_reviews))
+    _write_feather(count_review_sentiments(sentiments).reset_index(),
+                   _part_path(_path(store_dir, 'derived', 'review_counts'), batch_number, '.feather'))
+    return len(new_reviews)
+
+
+# --------------------------------------------------------------------------------------
+# COMPACTACIÓN (une las partes de una tabla en una base; costo repartido entre lotes)
+# --------------------------------------------------------------------------------------
+def _latest_businesses(frames):
+    """Última versión de cada negocio: por columna, el valor no nulo más reciente."""
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, ignore_index=True)
+    latest = combined.groupby(BUSINESS_KEY, sort=False).last().reset_index()
+    return latest[combined.columns]
+
+
+def _summed_counts(frames):
+    if not frames:
+        return count_review_sentiments(pd.DataFrame(columns=[REVIEW_KEY, BUSINESS_KEY, 'sentiment']))
+    # Los conteos son aditivos: se suman los de todos los lotes
+    return pd.concat(frames, ignore_index=True).groupby(BUSINESS_KEY, sort=False).sum().astype(np.int64)
+
+
+def _merged_index(paths):
+    parts = [_read_npz(path) for path in paths]
+    return index_insert(empty_index(), np.concatenate([part['hashes'] for part in parts]),
+                        np.concatenate([part['rows'] for part in parts]))
+
+
+# Cómo se unen las partes de cada tabla: (carpeta, extensión, función rutas -> datos)
+COMPACTIONS = (
+    (('derived', 'businesses'), '.feather',
+     lambda paths: _latest_businesses([pd.read_feather(path) for path in paths])),
+    (('derived', 'reviews'), '.feather',
+     lambda paths: pd.concat([pd.read_feather(path) for path in paths], ignore_index=True)),
+    (('derived', 'review_counts'), '.feather',
+     lambda paths: _summed_counts([pd.read_feather(path) for path in paths]).reset_index()),
+    (('index', 'businesses'), '.npz', _merged_index),
+    (('index', 'reviews'), '.npz', _merged_index),
+)
+
+
+def _compact_directory(directory, extension, batch_number, merge, min_parts):
+    paths = _part_files(directory, extension)
+    if len(paths) <= min_parts:
+        return False
+    base_path = _part_path(directory, batch_number, extension, kind='base')
+    if extension == '.npz':
+        _save_npz(merge(paths), base_path)
+    else:
+        _write_feather(merge(paths), base_path)
+    # La base nueva ya oculta a los archivos anteriores: borrarlos es solo limpieza
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if _PART_FILE.match(name) and path != base_path:
+            os.remove(path)
+    return True
+
+
+def compact_store(store_dir=STORE_DIR, min_parts=COMPACT_PARTS):
+    """Une en una base las tablas con más de `min_parts` partes; devuelve las compactadas."""
+    batch_number = len(load_manifest(store_dir)['batches'])
+    return ['/'.join(dirs) for dirs, extension, merge in COMPACTIONS
+            if _compact_directory(_path(store_dir, *dirs), extension, batch_number, merge, min_parts)]
+
+
+def ingest_batch(businesses=None, reviews=None, store_dir=STORE_DIR, source=None):
+    """
+    Ingiere un lote (DataFrames de negocios y/o reseñas). Devuelve la entrada del
+    manifiesto del lote, o None si ese mismo contenido ya se había ingerido.
+    Las reseñas sin sentimiento se rechazan (ValueError) antes de escribir nada.
+    """
+    if reviews is not None:
+        check_review_sentiments(reviews)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = load_manifest(store_dir)
+    digests = {'businesses': _frame_digest(businesses), 'reviews': _frame_digest(reviews)}
+    if any(batch['digests'] == digests for batch in manifest['batches']):
+        return None
+
+    batch_number = len(manifest['batches']) + 1
+    raw_dir = _path(store_dir, 'raw', BATCH_PATTERN.format(batch_number))
+    entry = {
+        'batch': batch_number,
+        'ingested_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': source,
+        'digests': digests,
+    }
+
+    if businesses is not None:
+        _write_feather(businesses, os.path.join(raw_dir, 'businesses.feather'))
+        new, updated = _upsert_businesses(store_dir, businesses, batch_number)
+        entry.update(business_rows=len(businesses), new_businesses=new, updated_businesses=updated)
+    if reviews is not None:
+        _write_feather(reviews, os.path.join(raw_dir, 'reviews.feather'))
+        new = _append_reviews(store_dir, reviews, batch_number, manifest)
+        entry.update(review_rows=len(reviews), new_reviews=new, duplicate_reviews=len(reviews) - new)
+
+    manifest['batches'].append(entry)
+    _save_manifest(store_dir, manifest)
+    compact_store(store_dir)
+    return entry
+
+
+# --------------------------------------------------------------------------------------
+# TABLAS DERIVADAS (lectura y exportación al esquema que consume el dashboard)
+# --------------------------------------------------------------------------------------
+def load_businesses(store_dir=STORE_DIR):
+    """Última versión de cada negocio (en orden de primera aparición)."""
+    return _latest_businesses(_read_parts(_path(store_dir, 'derived', 'businesses')))
+
+
+def load_reviews(store_dir=STORE_DIR):
+    """Une las particiones de reseñas (en orden de ingesta)."""
+    parts = _read_parts(_path(store_dir, 'derived', 'reviews'))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def load_review_counts(store_dir=STORE_DIR):
+    """Reseñas por sentimiento y negocio (suma de los conteos de cada lote)."""
+    return _summed_counts(_read_parts(_path(store_dir, 'derived', 'review_counts')))
+
+
+def business_table_with_sentiment(store_dir=STORE_DIR):
+    """Negocios con conteo, etiqueta y color de sentimiento (esquema de df_business_with_sentiment.csv)."""
+    return apply_scores_to_businesses(load_businesses(store_dir), business_scores(load_review_counts(store_dir)))
+
+
+def export_tables(store_dir=STORE_DIR, output_dir=data_loader.DATASETS_DIR):
+    """Escribe los CSV que consume el dashboard a partir de las tablas derivadas."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        'businesses': os.path.join(output_dir, BUSINESS_SOURCE_FILE),
+        'business_sentiment': os.path.join(output_dir, data_loader.BUSINESS_FILE),
+        'reviews': os.path.join(output_dir, data_loader.REVIEWS_FILE),
+    }
+    load_businesses(store_dir).to_csv(paths['businesses'], index=False)
+    business_table_with_sentiment(store_dir).to_csv(paths['business_sentiment'], index=False)
+    load_reviews(store_dir).to_csv(paths['reviews'], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Almacén de ingesta deduplicado para scrapes de Yelp.")
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Agrega un lote de negocios y/o reseñas.")
+    ingest.add_argument('--businesses', help="CSV de negocios del scrape.")
+    ingest.add_argument('--reviews', help="CSV de reseñas del scrape.")
+
+    export = commands.add_parser('export', help="Escribe los CSV del dashboard desde el almacén.")
+    export.add_argument('--output-dir', default=data_loader.DATASETS_DIR)
+
+    commands.add_parser('compact', help="Une ya todas las partes de cada tabla en una base.")
+    commands.add_parser('status', help="Muestra los lotes ingeridos.")
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        if not args.businesses and not args.reviews:
+            parser.error("Indica --businesses y/o --reviews.")
+        businesses = pd.read_csv(args.businesses, dtype={BUSINESS_KEY: str}) if args.businesses else None
+        reviews = pd.read_csv(args.reviews, dtype={REVIEW_KEY: str, BUSINESS_KEY: str}) if args.reviews else None
+        try:
+            entry = ingest_batch(businesses, reviews, args.store_dir,
+                                 source={'businesses': args.businesses, 'reviews': args.reviews})
+        except ValueError as error:
+            raise SystemExit(f"Lote rechazado: {error}")
+        print("El lote ya estaba ingerido; no hay cambios." if entry is None else json.dumps(entry, indent=2))
+    elif args.command == 'export':
+        for name, path in export_tables(args.store_dir, args.output_dir).items():
+            print(f"{name}: {path}")
+    elif args.command == 'compact':
+        compacted = compact_store(args.store_dir, min_parts=1)
+        print(f"Compactadas: {', '.join(compacted)}" if compacted else "No había partes que compactar.")
+    else:
+        manifest = load_manifest(args.store_dir)
+        for batch in manifest['batches']:
+            print(json.dumps({key: value for key, value in batch.items() if key != 'digests'}, ensure_ascii=False))
+        print(f"{len(manifest['batches'])} lotes; {manifest['review_rows']} reseñas únicas.")
+
+
+if __name__ == '__main__':
+    main()
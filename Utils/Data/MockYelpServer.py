@@ -0,0 +1,259 @@
+"""
+Servidor local que imita la API Yelp Fusion v3 (búsqueda y reseñas) con datos simulados.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.MockYelpServer --port 8765 --businesses 2000 --reviews 20000 --qps 50
+    python -m Utils.Data.YelpFetcher --api-base http://127.0.0.1:8765/v3 --api-key local
+
+Responde como la API real (paginación con offset/limit y tope de 240 resultados por
+búsqueda, 429 al superar --qps, errores 503 aleatorios con --error-rate y latencia
+artificial con --latency-ms) para medir el throughput del fetcher sin red.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data.GenMockData import FLORIDA_CITIES, generate_mock_dataset
+
+# --- Variables Globales ---
+DEFAULT_PORT = 8765
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_RESULTS = 240
+REVIEWS_MAX_LIMIT = 50
+STREETS = ['Main St', 'Ocean Dr', 'Palm Ave', 'Bay Blvd', 'Gulf Blvd', 'Orange Ave', 'Sunset Dr', 'Lake Rd']
+
+
+# --------------------------------------------------------------------------------------
+# DATOS EN FORMATO DE LA API (JSON de Yelp a partir de las tablas simuladas)
+# --------------------------------------------------------------------------------------
+def _business_payloads(businesses, seed):
+    rng = np.random.default_rng(seed + 2)
+    numbers = rng.integers(100, 9999, len(businesses))
+    streets = rng.integers(0, len(STREETS), len(businesses))
+    phones = rng.integers(2_000_000_000, 9_999_999_999, len(businesses)).astype(str)
+    payloads = []
+    for row, number, street, phone in zip(businesses.itertuples(index=False), numbers, streets, phones):
+        zip_code = str(int(row.zip_code))
+        payloads.append({
+            'id': row.business_id,
+            'name': row.name,
+            'url': row.url,
+            'review_count': int(row.review_count),
+            'categories': [{'alias': title.lower().replace(' ', ''), 'title': title}
+                           for title in row.categories.split(', ')],
+            'rating': float(row.rating),
+            'coordinates': {'latitude': float(row.latitude), 'longitude': float(row.longitude)},
+            'location': {
+                'address1': f"{number} {STREETS[street]}",
+                'city': row.city,
+                'zip_code': zip_code,
+                'state': row.state,
+                'display_address': [f"{number} {STREETS[street]}", f"{row.city}, {row.state} {zip_code}"],
+            },
+            'display_phone': f"({phone[:3]}) {phone[3:6]}-{phone[6:]}",
+        })
+    return payloads
+
+
+def _review_payloads(reviews):
+    created = pd.to_datetime(reviews['time_created']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        {
+            'id': row.review_id,
+            'url': row.url,
+            'text': row.text,
+            'rating': int(row.rating),
+            'time_created': time_created,
+            'user': {'id': row.user_id, 'name': row.user_name},
+        }
+        for row, time_created in zip(reviews.itertuples(index=False), created)
+    ]
+
+
+class MockYelpData:
+    """Negocios por ciudad (con los órdenes de `sort_by` precalculados) y reseñas por negocio."""
+
+    def __init__(self, num_businesses=2_000, num_reviews=20_000, seed=42):
+        businesses, reviews = generate_mock_dataset(num_businesses, num_reviews, seed)
+        self.businesses = _business_payloads(businesses, seed)
+        self.by_city = {}
+        for city, group in businesses.groupby('city', sort=False):
+            center = np.array(FLORIDA_CITIES[city][:2])
+            distance = np.hypot(group['latitude'] - center[0], group['longitude'] - center[1])
+            positions = group.index.to_numpy()
+            self.by_city[city.lower()] = {
+                'best_match': positions,
+                'rating': positions[np.argsort(-group['rating'].to_numpy(), kind='stable')],
+                'review_count': positions[np.argsort(-group['review_count'].to_numpy(), kind='stable')],
+                'distance': positions[np.argsort(distance.to_numpy(), kind='stable')],
+            }
+
+        reviews = reviews.sort_values(['business_id', 'time_created'], ascending=[True, False])
+        payloads = _review_payloads(reviews)
+        self.reviews = {}
+        for business_id, payload in zip(reviews['business_id'], payloads):
+            self.reviews.setdefault(business_id, []).append(payload)
+
+    def search(self, location, sort_by, offset, limit):
+        city = location.split(',')[0].strip().lower()
+        orders = self.by_city.get(city)
+        if orders is None:
+            return {'businesses': [], 'total': 0}
+        order = orders.get(sort_by, orders['best_match'])
+        return {'businesses': [self.businesses[pos] for pos in order[offset:offset + limit]], 'total': len(order)}
+
+    def business_reviews(self, business_id, offset, limit):
+        reviews = self.reviews.get(business_id, [])
+        return {'reviews': reviews[offset:offset + limit], 'total': len(reviews)}
+
+
+# --------------------------------------------------------------------------------------
+# SERVIDOR HTTP (keep-alive, límite de peticiones por segundo y fallas simuladas)
+# --------------------------------------------------------------------------------------
+class _ServerRateLimiter:
+    """Token bucket del lado del servidor: sin fichas disponibles se responde 429."""
+
+    def __init__(self, qps):
+        self.qps = qps
+        self.tokens = float(qps or 0)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.qps:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.qps, self.tokens + (now - self.updated) * self.qps)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class MockYelpHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Sin una línea de log por petición
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, description, headers=None):
+        self._send(status, {'error': {'code': code, 'description': description}}, headers)
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._error(401, 'UNAUTHORIZED_ACCESS_TOKEN', "Falta el encabezado Authorization.")
+        if not server.limiter.allow():
+            server.count('throttled')
+            return self._error(429, 'TOO_MANY_REQUESTS_PER_SECOND', "Límite de peticiones por segundo.",
+                               {'Retry-After': '1'})
+        if server.simulated_failure():
+            server.count('failed')
+            return self._error(503, 'SERVICE_UNAVAILABLE', "Falla simulada.")
+
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        offset = int(params.get('offset', 0))
+        parts = url.path.rstrip('/').split('/')
+
+        if parts[-2:] == ['businesses', 'search']:
+            limit = min(int(params.get('limit', 20)), SEARCH_MAX_LIMIT)
+            if offset + limit > SEARCH_MAX_RESULTS:
+                return self._error(400, 'VALIDATION_ERROR', f"offset + limit no puede superar {SEARCH_MAX_RESULTS}.")
+            payload = server.data.search(params.get('location', ''), params.get('sort_by', 'best_match'), offset, limit)
+        elif len(parts) >= 3 and parts[-1] == 'reviews' and parts[-3] == 'businesses':
+            limit = min(int(params.get('limit', 3)), REVIEWS_MAX_LIMIT)
+            payload = server.data.business_reviews(parts[-2], offset, limit)
+        else:
+            return self._error(404, 'NOT_FOUND', "Ruta desconocida.")
+        self._send(200, payload)
+
+
+class MockYelpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, qps=0, error_rate=0.0, latency_ms=0.0, seed=42):
+        super().__init__(address, MockYelpHandler)
+        self.data = data
+        self.limiter = _ServerRateLimiter(qps)
+        self.error_rate = error_rate
+        self.latency = latency_ms / 1000
+        self.rng = np.random.default_rng(seed)
+        self.stats = {'requests': 0, 'throttled': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass  # Clientes que cierran la conexión a mitad de una petición (p. ej. al interrumpir el fetcher)
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def simulated_failure(self):
+        """Sorteo de la falla simulada; el generador no es seguro entre hilos, se usa con el lock."""
+        if not self.error_rate:
+            return False
+        with self._stats_lock:
+            return self.rng.random() < self.error_rate
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+
+def start_mock_server(data=None, host='127.0.0.1', port=0, **options):
+    """Inicia el servidor en un hilo (port=0 elige un puerto libre); devuelve el servidor."""
+    server = MockYelpServer((host, port), data or MockYelpData(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de Yelp con datos simulados.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--businesses', type=int, default=2_000)
+    parser.add_argument('--reviews', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--qps', type=float, default=0, help="Peticiones por segundo antes de responder 429 (0 = sin límite).")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de respuestas 503 simuladas.")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latencia artificial por petición.")
+    args = parser.parse_args()
+
+    data = MockYelpData(args.businesses, args.reviews, args.seed)
+    server = MockYelpServer((args.host, args.port), data, args.qps, args.error_rate, args.latency_ms, args.seed)
+    print(f"API simulada en {server.api_base} ({args.businesses} negocios, {args.reviews} reseñas)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
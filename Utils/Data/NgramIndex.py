@@ -0,0 +1,214 @@
+import hashlib
+import os
+import re
+from collections import Counter
+from importlib.util import find_spec
+
+import numpy as np
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.ProcessCache import process_cache
+
+# --- Variables Globales ---
+# Mismo tokenizador que usaba WordMap.generate_ngrams
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+NGRAM_SIZES = (1, 2, 3)
+
+# Carpeta de índices persistidos junto a los datasets
+INDEX_DIR = os.path.join(data_loader.DATASETS_DIR, 'indexes')
+NGRAM_INDEX_FILE = 'ngram_index.npz'
+
+
+def tokenize(text, stopwords=frozenset()):
+    """Limpia y tokeniza un texto, descartando stopwords y números."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    return [word for word in words if word not in stopwords and not word.isdigit()]
+
+
+def text_ngrams(words, n):
+    """Devuelve los n-gramas de una lista de tokens como cadenas unidas por espacio."""
+    if n == 1:
+        return words
+    return [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+
+def stopwords_version(stopwords):
+    """Hash corto y estable del conjunto de stopwords (cambia si se edita la lista)."""
+    joined = '\n'.join(sorted(stopwords))
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:12]
+
+
+# --------------------------------------------------------------------------------------
+# STOPWORDS (compartidas por el Word Map, la búsqueda, las quejas y el backend analítico)
+# --------------------------------------------------------------------------------------
+def _wordcloud_stopwords():
+    """
+    Lista STOPWORDS de wordcloud leída de su archivo, sin importar el paquete: importar
+    wordcloud arrastra matplotlib, que solo hace falta al dibujar la primera nube.
+    """
+    package_dir = find_spec('wordcloud').submodule_search_locations[0]
+    with open(os.path.join(package_dir, 'stopwords')) as handle:
+        return set(map(str.strip, handle.readlines()))
+
+# Definición de Stopwords en inglés
+# Combinamos las STOPWORDS estándar con términos comunes en el contexto de detailing/reseñas
+ENGLISH_STOPWORDS = _wordcloud_stopwords() | {
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
+    'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
+    'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
+    'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 
+    'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 
+    'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 
+    'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 
+    'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 
+    'through', 'during', 'before', 'after', 'above', 'below', 'to', 
+    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 
+    'again', 'further', 'then', 'once', 'here', 'there', 'when', 
+    'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 
+    'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 
+    'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 
+    'can', 'will', 'just', 'don', 'should', 'now',
+    
+    # Palabras específicas del contexto de detailing que probablemente no aportan valor
+    'car', 'vehicle', 'auto', 'truck', 'my car', 'service', 'time', 
+    'place', 'shop', 'job', 'they', 'get', 'got', 'day', 'work', 
+    'did', 'was', 'were', 'really', 'much', 'so', 'had', 'looks',
+    'new', 'definitely', 'like', 'would', 'also', 'back', 'detailing', 'detail', 'great', 'good', 'amazing'
+}
+
+# Versión de la lista de stopwords: forma parte de la llave de los cachés (índices e imágenes)
+STOPWORDS_VERSION = stopwords_version(ENGLISH_STOPWORDS)
+
+
+# --------------------------------------------------------------------------------------
+# CONSTRUCCIÓN DEL ÍNDICE
+# Por cada tamaño n se guarda una matriz dispersa reseña x término en formato CSR:
+#   vocab[term_id] -> texto del n-grama
+#   indptr[doc]..indptr[doc+1] -> rango de entradas de la reseña `doc`
+#   term_ids / counts -> término y conteo de cada entrada
+# --------------------------------------------------------------------------------------
+def build_ngram_index(texts, stopwords, sizes=NGRAM_SIZES):
+    """Tokeniza una sola vez todas las reseñas y cuenta sus 1/2/3-gramas."""
+    tokenized = [tokenize(text, stopwords) for text in texts]
+    index = {'n_docs': len(tokenized), 'stopwords_version': stopwords_version(stopwords)}
+
+    for n in sizes:
+        vocabulary = {}
+        indptr = [0]
+        term_ids = []
+        counts = []
+        for words in tokenized:
+            doc_counts = Counter(text_ngrams(words, n))
+            for gram, count in doc_counts.items():
+                term_ids.append(vocabulary.setdefault(gram, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(term_ids))
+
+        index[n] = _with_rows({
+            'vocab': np.array(list(vocabulary), dtype=str),
+            'indptr': np.array(indptr, dtype=np.int64),
+            'term_ids': np.array(term_ids, dtype=np.int32),
+            'counts': np.array(counts, dtype=np.int32),
+        })
+    return index
+
+
+def _with_rows(matrix):
+    """Agrega el número de reseña de cada entrada (para filtrar con una máscara por reseña)."""
+    matrix['rows'] = np.repeat(
+        np.arange(len(matrix['indptr']) - 1, dtype=np.int32), np.diff(matrix['indptr'])
+    )
+    return matrix
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTA
+# --------------------------------------------------------------------------------------
+def ngram_frequencies(index, n, doc_mask=None, top_k=None):
+    """
+    Suma los vectores dispersos de las reseñas seleccionadas (`doc_mask` booleano por
+    reseña; None = todas) y devuelve {n-grama: frecuencia}, opcionalmente solo top_k.
+    """
+    matrix = index[n]
+    term_ids = matrix['term_ids']
+    counts = matrix['counts']
+    if doc_mask is not None:
+        selected = np.asarray(doc_mask, dtype=bool)[matrix['rows']]
+        term_ids = term_ids[selected]
+        counts = counts[selected]
+
+    totals = np.bincount(term_ids, weights=counts, minlength=len(matrix['vocab']))
+    nonzero = np.flatnonzero(totals)
+    if top_k is not None and len(nonzero) > top_k:
+        nonzero = nonzero[np.argpartition(totals[nonzero], -top_k)[-top_k:]]
+    return dict(zip(matrix['vocab'][nonzero].tolist(), totals[nonzero].astype(int).tolist()))
+
+
+# --------------------------------------------------------------------------------------
+# PERSISTENCIA (npz junto a los datasets, invalidado por firma)
+# --------------------------------------------------------------------------------------
+def save_ngram_index(index, path, signature):
+    """Guarda el índice en un .npz comprimido junto con la firma de sus datos de origen."""
+    arrays = {
+        'n_docs': np.array(index['n_docs']),
+        'stopwords_version': np.array(index['stopwords_version']),
+        'signature': np.array(repr(signature)),
+    }
+    for n in NGRAM_SIZES:
+        if n in index:
+            for key in ('vocab', 'indptr', 'term_ids', 'counts'):
+                arrays[f'{n}_{key}'] = index[n][key]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_ngram_index(path, signature):
+    """Carga un índice persistido; devuelve None si no existe o si la firma no coincide."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if str(data['signature']) != repr(signature):
+            return None
+        index = {
+            'n_docs': int(data['n_docs']),
+            'stopwords_version': str(data['stopwords_version']),
+        }
+        for n in NGRAM_SIZES:
+            if f'{n}_vocab' in data:
+                index[n] = _with_rows({
+                    key: data[f'{n}_{key}'] for key in ('vocab', 'indptr', 'term_ids', 'counts')
+                })
+    return index
+
+
+@process_cache(max_entries=4)
+def _cached_reviews_ngram_index(signature, _texts, _stopwords):
+    path = os.path.join(INDEX_DIR, NGRAM_INDEX_FILE)
+    index = load_ngram_index(path, signature)
+    if index is None:
+        index = build_ngram_index(_texts, _stopwords)
+        try:
+            save_ngram_index(index, path, signature)
+        except OSError:
+            # Sin permisos de escritura (p. ej. despliegue de solo lectura): solo en memoria
+            pass
+    # La firma identifica los datos del índice (la usan los cachés derivados, p. ej. imágenes)
+    index['signature'] = signature
+    return index
+
+
+def get_reviews_ngram_index(texts, stopwords):
+    """
+    Índice de n-gramas de las reseñas, construido una vez por proceso (o leído de disco)
+    y alineado fila a fila con `texts`. Se invalida si cambian las reseñas o las stopwords.
+    """
+    signature = (
+        data_loader.dataset_signature(data_loader.REVIEWS_FILE),
+        len(texts),
+        stopwords_version(stopwords),
+    )
+    return _cached_reviews_ngram_index(signature, texts, stopwords)
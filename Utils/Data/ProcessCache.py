@@ -0,0 +1,70 @@
+"""
+Caché de recursos del proceso para la capa de datos, sin depender de Streamlit.
+
+`process_cache` reemplaza a st.cache_resource en Utils/Data: el dashboard, el servicio
+HTTP (ApiServer.py), el precalentamiento y los scripts por lotes comparten el mismo
+objeto por proceso sin necesitar el runtime de Streamlit (ni silenciar sus avisos).
+Sigue sus mismas convenciones:
+
+  - La llave son los argumentos cuyo nombre NO empieza con `_` (los `_df`, `_reviews`...
+    no se hashean: su versión la representa la firma que los acompaña).
+  - Se guardan a lo sumo `max_entries` resultados (se descarta el usado hace más tiempo).
+  - Se devuelve el MISMO objeto a todos los llamadores: no modificarlo in-place.
+  - Dos hilos que piden la misma llave calculan una sola vez; llaves distintas, en paralelo.
+
+Los mensajes de espera (st.spinner) los muestran los widgets alrededor de sus llamadas.
+"""
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+
+# --------------------------------------------------------------------------------------
+# DECORADOR
+# --------------------------------------------------------------------------------------
+def process_cache(max_entries):
+    """Decorador: memoiza la función por proceso, con llave = argumentos sin prefijo `_`."""
+    def decorator(func):
+        signature = inspect.signature(func)
+        key_names = [name for name in signature.parameters if not name.startswith('_')]
+        entries = OrderedDict()
+        pending = {}
+        lock = threading.Lock()
+
+        def _cached(key):
+            # Requiere `lock`; marca la entrada como la más reciente
+            entries.move_to_end(key)
+            return entries[key]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments[name] for name in key_names)
+            with lock:
+                if key in entries:
+                    return _cached(key)
+                key_lock = pending.setdefault(key, threading.Lock())
+            with key_lock:
+                with lock:
+                    if key in entries:
+                        return _cached(key)
+                try:
+                    value = func(*args, **kwargs)
+                    with lock:
+                        entries[key] = value
+                        while len(entries) > max_entries:
+                            entries.popitem(last=False)
+                finally:
+                    with lock:
+                        pending.pop(key, None)
+            return value
+
+        def clear():
+            with lock:
+                entries.clear()
+
+        wrapper.clear = clear
+        return wrapper
+    return decorator
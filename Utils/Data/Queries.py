@@ -0,0 +1,209 @@
+"""
+Consultas analíticas del dashboard, sin elementos de interfaz: filtrado de negocios,
+ranking, frecuencias de n-gramas, agregados del mapa y KPIs.
+
+Los widgets (Sidebar, Leaderboard, WordMap, EmotionMap) solo leen sus controles y
+llaman a estas funciones; el servicio HTTP (ApiServer.py) y los reportes por lotes usan
+las mismas, así que un número del dashboard y uno de la API salen del mismo código.
+
+Convenciones compartidas:
+  - `filters` es el diccionario de business_filters() (mismo formato que Sidebar.selected_filters).
+  - Las posiciones son filas de la tabla completa de negocios (load_business_data()).
+  - Con `backend` (AnalyticsBackend) la consulta se resuelve en la base embebida.
+"""
+import numpy as np
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.AnalyticsBackend import (
+    filter_positions_sql, ngram_frequencies_sql, ranking_sql, review_sentiment_counts_sql,
+)
+from Utils.Data.FilterCube import (
+    aggregate_by_city, business_contributions, cube_supports, get_filter_cube, kpi_summary, query_cube,
+)
+from Utils.Data.FilterEngine import filter_positions, get_filter_index
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, get_reviews_ngram_index, ngram_frequencies
+from Utils.Data.ProcessCache import process_cache
+from Utils.Data.Ranking import get_score_components, top_k_order
+from Utils.Data.SentimentAggregation import count_review_sentiments
+from Utils.Data.SpatialAggregation import hexbin_aggregate
+from Utils.Data.SpatialIndex import get_group_index, get_spatial_index, group_positions, query_radius
+
+# --- Variables Globales ---
+MIN_RATING_FILTER = 0.0
+MAX_RATING_FILTER = 5.0
+DEFAULT_CELL_KM = 15.0
+
+# Modos agregados del mapa (el modo de puntos envía los negocios filtrados tal cual)
+MAP_AGGREGATES = ('hexbin', 'heatmap')
+REVIEW_COUNT_COLUMNS = ('review_id', 'business_id', 'sentiment')
+
+
+# --------------------------------------------------------------------------------------
+# FILTROS DE NEGOCIOS
+# --------------------------------------------------------------------------------------
+def business_filters(sentiments=None, min_rating=MIN_RATING_FILTER, max_rating=MAX_RATING_FILTER,
+                     location_positions=None):
+    """Diccionario de filtros (None en `sentiments` = todos los sentimientos)."""
+    return {
+        'sentiments': list(data_loader.SENTIMENT_CATEGORIES if sentiments is None else sentiments),
+        'min_rating': float(min_rating),
+        'max_rating': float(max_rating),
+        'location_positions': location_positions,
+    }
+
+
+def city_centers(df_businesses, signature=None):
+    """{ciudad: (lat, lon)} de las ciudades con negocios (centros del índice espacial)."""
+    return get_spatial_index(df_businesses, signature).get('city_centers', {})
+
+
+def location_positions(df_businesses, city, radius_km, signature=None):
+    """
+    Posiciones de los negocios a `radius_km` del centro de `city` (índice espacial, sin
+    recorrer la tabla); None si no hay ciudad o no se conoce su centro (= sin filtro).
+    """
+    if city is None:
+        return None
+    spatial_index = get_spatial_index(df_businesses, signature)
+    center = spatial_index.get('city_centers', {}).get(city)
+    if center is None:
+        return None
+    return query_radius(spatial_index, center[0], center[1], radius_km)
+
+
+def filter_business_positions(df_businesses, filters, signature=None, backend=None):
+    """Posiciones (ordenadas) de los negocios que cumplen `filters`."""
+    if backend is not None:
+        return filter_positions_sql(backend, filters)
+    filter_index = get_filter_index(df_businesses, signature)
+    positions = filter_positions(filter_index, filters['sentiments'], filters['min_rating'], filters['max_rating'])
+    if filters.get('location_positions') is not None:
+        positions = np.intersect1d(positions, filters['location_positions'], assume_unique=True)
+    return positions
+
+
+# --------------------------------------------------------------------------------------
+# RANKING
+# --------------------------------------------------------------------------------------
+def ranked_businesses(df_data, score_components, positions, sentiment_weight=0.5, limit=50, offset=0,
+                      backend=None, filters=None):
+    """
+    Lugares [offset, offset + limit) del ranking de `positions`, con columnas Rank y
+    ranking_score. El índice de `df_data` debe ser la posición de cada negocio en la
+    tabla completa (la tabla completa misma o una selección con take()).
+    Con `backend` y `filters` el ranking se ordena y pagina en SQL.
+    """
+    if backend is not None and filters is not None:
+        rows = ranking_sql(backend, filters, sentiment_weight, limit=limit, offset=offset)
+    else:
+        # Selección parcial: solo se ordenan los primeros offset + limit lugares
+        top_positions, top_scores = top_k_order(score_components, positions, sentiment_weight, k=offset + limit)
+        selected = top_positions[offset:offset + limit]
+        rows = df_data.iloc[pd.Index(df_data.index).get_indexer(selected)].copy()
+        rows['ranking_score'] = top_scores[offset:offset + limit]
+    rows['Rank'] = np.arange(offset + 1, offset + 1 + len(rows))
+    return rows
+
+
+def business_ranking(df_businesses, filters, sentiment_weight=0.5, limit=50, offset=0, signature=None, backend=None):
+    """Ranking de los negocios que cumplen `filters` sobre la tabla completa de negocios."""
+    if backend is not None:
+        return ranked_businesses(df_businesses, None, None, sentiment_weight, limit, offset, backend, filters)
+    positions = filter_business_positions(df_businesses, filters, signature)
+    components = get_score_components(df_businesses, signature)
+    return ranked_businesses(df_businesses, components, positions, sentiment_weight, limit, offset)
+
+
+# --------------------------------------------------------------------------------------
+# N-GRAMAS DE LAS RESEÑAS
+# --------------------------------------------------------------------------------------
+def location_mask(df_reviews, business_ids):
+    """Máscara de las reseñas de los negocios dados (vía índice de reseñas por negocio)."""
+    group_index = get_group_index(
+        df_reviews['business_id'], data_loader.dataset_signature(data_loader.REVIEWS_FILE)
+    )
+    mask = np.zeros(len(df_reviews), dtype=bool)
+    mask[group_positions(group_index, business_ids)] = True
+    return mask
+
+
+def review_doc_mask(df_reviews, sentiment=None, business_ids=None):
+    """Máscara de reseñas por sentimiento y negocios (None = todas las reseñas)."""
+    doc_mask = None
+    if sentiment is not None:
+        doc_mask = (df_reviews['sentiment'] == sentiment).to_numpy()
+    if business_ids is not None:
+        scope_mask = location_mask(df_reviews, business_ids)
+        doc_mask = scope_mask if doc_mask is None else doc_mask & scope_mask
+    return doc_mask
+
+
+def review_ngram_frequencies(df_reviews, n, sentiment=None, business_ids=None, top_k=None, backend=None):
+    """{n-grama: frecuencia} de las reseñas del sentimiento y negocios dados (None = todos)."""
+    if backend is not None:
+        return ngram_frequencies_sql(backend, n, sentiment, business_ids, top_k=top_k)
+    doc_mask = review_doc_mask(df_reviews, sentiment, business_ids)
+    if doc_mask is not None and not doc_mask.any():
+        return {}
+    ngram_index = get_reviews_ngram_index(df_reviews['text'], ENGLISH_STOPWORDS)
+    return ngram_frequencies(ngram_index, n, doc_mask=doc_mask, top_k=top_k)
+
+
+# --------------------------------------------------------------------------------------
+# AGREGADOS DEL MAPA
+# --------------------------------------------------------------------------------------
+@process_cache(max_entries=2)
+def _review_sentiment_counts(signature):
+    reviews = data_loader.load_reviews_data(columns=REVIEW_COUNT_COLUMNS)
+    return count_review_sentiments(reviews)
+
+
+@process_cache(max_entries=2)
+def _backend_review_sentiment_counts(signature, _backend):
+    return review_sentiment_counts_sql(_backend)
+
+
+def review_sentiment_counts(backend=None):
+    """
+    Reseñas positivas/neutrales/negativas por negocio (una vez por versión de las reseñas).
+    Con `backend` se cuentan en la base analítica, sin cargar las reseñas.
+    """
+    if backend is not None:
+        return _backend_review_sentiment_counts(backend['signature'], backend)
+    return _review_sentiment_counts(data_loader.dataset_signature(data_loader.REVIEWS_FILE))
+
+
+def negative_reviews_per_business(df, backend=None):
+    """Número de reseñas negativas de cada negocio de `df` (0 si no tiene reseñas)."""
+    counts = review_sentiment_counts(backend)['negative_reviews']
+    return df['business_id'].astype(object).map(counts).fillna(0).to_numpy()
+
+
+def map_cells(df_filtered, mode='hexbin', cell_km=DEFAULT_CELL_KM, backend=None):
+    """
+    Celdas hexagonales de los negocios filtrados (SpatialAggregation.hexbin_aggregate).
+    En modo 'heatmap' el peso de cada celda son las reseñas negativas de sus negocios.
+    """
+    if mode not in MAP_AGGREGATES:
+        raise ValueError(f"Modo de mapa desconocido: {mode!r} (opciones: {', '.join(MAP_AGGREGATES)})")
+    weights = negative_reviews_per_business(df_filtered, backend) if mode == 'heatmap' else None
+    return hexbin_aggregate(df_filtered, cell_km=cell_km, weights=weights)
+
+
+# --------------------------------------------------------------------------------------
+# KPIs (cubo de agregados)
+# --------------------------------------------------------------------------------------
+def business_kpis(df_businesses, filters, signature=None, backend=None):
+    """
+    KPIs de los negocios que cumplen `filters` (FilterCube.kpi_summary). Sin filtro de
+    ubicación y con ratings en medias estrellas se suman celdas del cubo; si no, se
+    agregan las contribuciones de los negocios filtrados.
+    """
+    review_counts = review_sentiment_counts(backend)
+    if signature is not None and cube_supports(filters):
+        cube_signature = (signature, data_loader.dataset_signature(data_loader.REVIEWS_FILE))
+        cube = get_filter_cube(df_businesses, review_counts, cube_signature)
+        return kpi_summary(query_cube(cube, filters['sentiments'], filters['min_rating'], filters['max_rating']))
+    positions = filter_business_positions(df_businesses, filters, signature, backend)
+    return kpi_summary(aggregate_by_city(business_contributions(df_businesses.take(positions), review_counts)))
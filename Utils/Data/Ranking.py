@@ -0,0 +1,96 @@
+import numpy as np
+
+from Utils.Data.ProcessCache import process_cache
+
+# --- Variables Globales ---
+# Mapeo de Sentimiento a Score Numérico (0 a 1)
+SENTIMENT_TO_SCORE = {
+    'Positivo': 1.0,
+    'Neutral': 0.5,
+    'Negativo': 0.0,
+}
+
+# Normalización del Rating (de 1.0-5.0 a 0-1)
+MIN_RATING = 1.0
+MAX_RATING = 5.0
+
+
+# --------------------------------------------------------------------------------------
+# COMPONENTES DEL SCORE (se calculan una vez por dataset; no dependen del peso)
+# --------------------------------------------------------------------------------------
+def build_score_components(df):
+    """Precalcula rating normalizado, score de sentimiento y conteo de reseñas por negocio."""
+    sentiment_score = df['sentiment'].astype(object).map(SENTIMENT_TO_SCORE)
+    return {
+        'rating_norm': ((df['rating'].to_numpy(dtype=np.float64, na_value=np.nan) - MIN_RATING)
+                        / (MAX_RATING - MIN_RATING)),
+        'sentiment_score': sentiment_score.to_numpy(dtype=np.float64, na_value=np.nan),
+        'review_count': df['review_count'].to_numpy(dtype=np.int64),
+    }
+
+
+@process_cache(max_entries=4)
+def _cached_score_components(signature, _df):
+    return build_score_components(_df)
+
+
+def get_score_components(df, signature=None):
+    """Componentes del score de `df`, cacheados por proceso cuando se da la firma del dataset."""
+    if signature is None:
+        return build_score_components(df)
+    return _cached_score_components((signature, len(df)), df)
+
+
+# --------------------------------------------------------------------------------------
+# SCORE Y RANKING (baratos: solo aritmética sobre los componentes)
+# --------------------------------------------------------------------------------------
+def ranking_scores(components, positions, sentiment_weight=0.5):
+    """Score combinado en porcentaje (1 decimal) para los negocios en `positions`."""
+    combined = (
+        components['rating_norm'][positions] * (1 - sentiment_weight) +
+        components['sentiment_score'][positions] * sentiment_weight
+    )
+    return np.round(combined * 100, 1)
+
+
+def _rank_keys(components, positions, scores):
+    """
+    Llave entera única y ordenable: score (en décimas), luego total de reseñas y, como
+    último desempate, el orden original. Los scores faltantes quedan al final.
+    """
+    score_tenths = np.where(np.isnan(scores), -1, np.rint(np.nan_to_num(scores) * 10)).astype(np.int64) + 1
+    review_count = np.maximum(components['review_count'][positions], 0)
+    n_rows = len(components['review_count'])
+    return (score_tenths * (review_count.max(initial=0) + 1) + review_count) * (n_rows + 1) + (n_rows - positions)
+
+
+def top_k_order(components, positions, sentiment_weight=0.5, k=3):
+    """
+    Devuelve (posiciones, scores) de los k mejores negocios ya ordenados, usando
+    selección parcial (argpartition) en lugar de ordenar todo el ranking.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    scores = ranking_scores(components, positions, sentiment_weight)
+    if len(positions) == 0:
+        return positions, scores
+
+    keys = _rank_keys(components, positions, scores)
+    k = min(k, len(positions))
+    if k < len(positions):
+        top = np.argpartition(-keys, k - 1)[:k]
+    else:
+        top = np.arange(len(positions))
+    top = top[np.argsort(-keys[top])]
+    return positions[top], scores[top]
+
+
+def ranking_page(components, positions, sentiment_weight=0.5, page=0, page_size=50, offset=0):
+    """
+    Página `page` del ranking a partir del lugar `offset` (p. ej. 3 para omitir el podio).
+    Solo se ordenan los primeros (offset + (page + 1) * page_size) lugares.
+    """
+    stop = offset + (page + 1) * page_size
+    top_positions, top_scores = top_k_order(components, positions, sentiment_weight, k=stop)
+    start = offset + page * page_size
+    ranks = np.arange(start + 1, start + 1 + len(top_positions[start:stop]))
+    return top_positions[start:stop], top_scores[start:stop], ranks
@@ -0,0 +1,89 @@
+import numpy as np
+
+from Utils.Data.NgramIndex import NGRAM_SIZES, text_ngrams, tokenize
+from Utils.Data.ProcessCache import process_cache
+
+# --------------------------------------------------------------------------------------
+# ÍNDICE INVERTIDO (n-grama -> reseñas), transpuesto del índice de n-gramas
+# Por cada tamaño n (formato CSC del mismo índice reseña x término):
+#   vocab_sorted / vocab_order -> búsqueda binaria del texto del n-grama a su term_id
+#   indptr[term]..indptr[term+1] -> rango de reseñas que contienen el término
+#   postings / counts -> reseña (orden ascendente) y ocurrencias del término en ella
+# --------------------------------------------------------------------------------------
+def build_search_index(ngram_index):
+    """Transpone las matrices de NgramIndex (sin volver a tokenizar las reseñas)."""
+    index = {'n_docs': ngram_index['n_docs']}
+    for n in NGRAM_SIZES:
+        matrix = ngram_index[n]
+        vocab = matrix['vocab']
+        # Orden estable: dentro de cada término las reseñas quedan en orden ascendente
+        order = np.argsort(matrix['term_ids'], kind='stable')
+        vocab_order = np.argsort(vocab)
+        index[n] = {
+            'vocab_sorted': vocab[vocab_order],
+            'vocab_order': vocab_order,
+            'indptr': np.concatenate([[0], np.cumsum(np.bincount(matrix['term_ids'], minlength=len(vocab)))]),
+            'postings': matrix['rows'][order],
+            'counts': matrix['counts'][order],
+        }
+    return index
+
+
+@process_cache(max_entries=2)
+def _cached_search_index(signature, _ngram_index):
+    return build_search_index(_ngram_index)
+
+
+def get_search_index(ngram_index):
+    """Índice invertido de `ngram_index`, construido una vez por versión del índice de n-gramas."""
+    return _cached_search_index(ngram_index['signature'], ngram_index)
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTA
+# --------------------------------------------------------------------------------------
+def term_postings(search_index, n, term):
+    """(reseñas, ocurrencias) del n-grama `term`; arreglos vacíos si no aparece."""
+    matrix = search_index[n]
+    slot = np.searchsorted(matrix['vocab_sorted'], term)
+    if slot == len(matrix['vocab_sorted']) or matrix['vocab_sorted'][slot] != term:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    term_id = matrix['vocab_order'][slot]
+    start, stop = matrix['indptr'][term_id], matrix['indptr'][term_id + 1]
+    return matrix['postings'][start:stop], matrix['counts'][start:stop]
+
+
+def query_terms(query, stopwords):
+    """
+    N-gramas a buscar para una consulta, con el tokenizador y las stopwords del Word Map:
+    hasta 3 palabras se buscan como un solo n-grama (igual que los términos del WordCloud);
+    frases más largas, como todos sus trigramas.
+    """
+    words = tokenize(query, stopwords)
+    if not words:
+        return 0, []
+    n = min(len(words), max(NGRAM_SIZES))
+    return n, list(dict.fromkeys(text_ngrams(words, n)))
+
+
+def search_reviews(search_index, query, stopwords, doc_mask=None):
+    """
+    Reseñas que contienen la consulta: (posiciones, ocurrencias), ordenadas por
+    ocurrencias descendentes. `doc_mask` (booleano por reseña) limita la búsqueda.
+    """
+    n, terms = query_terms(query, stopwords)
+    docs, counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    for i, term in enumerate(terms):
+        term_docs, term_counts = term_postings(search_index, n, term)
+        if i == 0:
+            docs, counts = term_docs, term_counts
+            continue
+        # Todos los trigramas de la frase: intersección de listas ordenadas
+        docs, left, right = np.intersect1d(docs, term_docs, assume_unique=True, return_indices=True)
+        counts = np.minimum(counts[left], term_counts[right])
+    if doc_mask is not None and len(docs):
+        keep = np.asarray(doc_mask, dtype=bool)[docs]
+        docs, counts = docs[keep], counts[keep]
+    order = np.argsort(-counts, kind='stable')
+    return docs[order].astype(np.int64), counts[order].astype(np.int64)
@@ -0,0 +1,214 @@
+"""
+Pipeline reproducible de sentimiento por negocio a partir de las reseñas.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.SentimentAggregation          # incremental (solo reseñas nuevas)
+    python -m Utils.Data.SentimentAggregation --full   # recalcula todo desde cero
+
+Regla de etiquetado (reproduce df_business_with_sentiment.csv):
+    net_score = (positivas - negativas) / total de reseñas
+    net_score > 0.2  -> 'Positivo'
+    net_score < -0.2 -> 'Negativo'
+    en otro caso (o sin reseñas) -> 'Neutral'
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+
+# --- Variables Globales ---
+SENTIMENT_COUNT_COLUMNS = {
+    'Positivo': 'positive_reviews',
+    'Neutral': 'neutral_reviews',
+    'Negativo': 'negative_reviews',
+}
+# Mismo peso por sentimiento que el score del leaderboard (Ranking.SENTIMENT_TO_SCORE)
+SENTIMENT_WEIGHTS = {'Positivo': 1.0, 'Neutral': 0.5, 'Negativo': 0.0}
+LABEL_THRESHOLD = 0.2
+
+# Color RGB serializado que guarda df_business_with_sentiment.csv
+LABEL_COLORS = {
+    'Positivo': '[0, 128, 0]',
+    'Neutral': '[255, 255, 0]',
+    'Negativo': '[255, 0, 0]',
+}
+
+BUSINESS_SOURCE_FILE = 'businesses_final.csv'
+BUSINESS_OUTPUT_COLUMNS = [
+    'business_id', 'name', 'city', 'state', 'zip_code', 'categories', 'rating',
+    'review_count', 'latitude', 'longitude', 'url', 'source_city_query',
+    'source_variant', 'source_sort_by', 'review_count_from_reviews', 'sentiment', 'color',
+]
+AGGREGATES_FILE = 'business_review_sentiment.csv'
+
+# Estado incremental (conteos acumulados + posición leída del CSV de reseñas)
+STATE_DIR = os.path.join(data_loader.DATASETS_DIR, 'indexes')
+STATE_COUNTS_FILE = 'sentiment_counts.feather'
+STATE_IDS_FILE = 'sentiment_review_ids.feather'
+STATE_META_FILE = 'sentiment_state.json'
+# Bytes previos a la posición leída que se verifican para detectar reescrituras del CSV
+TAIL_CHECK_BYTES = 4096
+
+
+# --------------------------------------------------------------------------------------
+# AGREGACIÓN (una sola agregación hash por business_id)
+# --------------------------------------------------------------------------------------
+def count_review_sentiments(reviews):
+    """Conteo de reseñas positivas/neutrales/negativas por negocio (reseñas únicas)."""
+    reviews = reviews.drop_duplicates('review_id')
+    sentiment = pd.Categorical(reviews['sentiment'], categories=list(SENTIMENT_COUNT_COLUMNS))
+    # One-hot de los códigos (-1 = sin sentimiento -> fila de ceros)
+    one_hot = np.zeros((len(reviews), len(SENTIMENT_COUNT_COLUMNS)), dtype=np.int64)
+    valid = sentiment.codes >= 0
+    one_hot[np.flatnonzero(valid), sentiment.codes[valid]] = 1
+
+    counts = pd.DataFrame(one_hot, columns=list(SENTIMENT_COUNT_COLUMNS.values()))
+    counts = counts.groupby(reviews['business_id'].to_numpy(), sort=False).sum()
+    counts.index.name = 'business_id'
+    return counts
+
+
+def merge_counts(counts, new_counts):
+    """Suma conteos nuevos a los acumulados (los conteos son aditivos)."""
+    if counts is None or counts.empty:
+        return new_counts
+    return counts.add(new_counts, fill_value=0).astype(np.int64)
+
+
+def business_scores(counts):
+    """Deriva total de reseñas, proporciones, scores y etiqueta a partir de los conteos."""
+    scores = counts.copy()
+    total = counts.sum(axis=1)
+    safe_total = total.where(total > 0)
+    scores['review_count_from_reviews'] = total
+
+    for sentiment, column in SENTIMENT_COUNT_COLUMNS.items():
+        scores[column.replace('_reviews', '_share')] = (counts[column] / safe_total).fillna(0.0)
+
+    weighted = sum(counts[column] * SENTIMENT_WEIGHTS[sentiment]
+                   for sentiment, column in SENTIMENT_COUNT_COLUMNS.items())
+    scores['weighted_score'] = (weighted / safe_total).fillna(SENTIMENT_WEIGHTS['Neutral'])
+    scores['net_score'] = ((counts['positive_reviews'] - counts['negative_reviews']) / safe_total).fillna(0.0)
+    scores['sentiment'] = np.select(
+        [scores['net_score'] > LABEL_THRESHOLD, scores['net_score'] < -LABEL_THRESHOLD],
+        ['Positivo', 'Negativo'],
+        default='Neutral',
+    )
+    return scores
+
+
+def apply_scores_to_businesses(businesses, scores):
+    """Actualiza conteo, etiqueta y color de cada negocio (sin reseñas -> Neutral)."""
+    df = businesses.drop(columns=['review_count_from_reviews', 'sentiment', 'color'], errors='ignore')
+    df = df.merge(
+        scores[['review_count_from_reviews', 'sentiment']],
+        left_on='business_id', right_index=True, how='left',
+    )
+    df['review_count_from_reviews'] = df['review_count_from_reviews'].fillna(0).astype(np.int64)
+    df['sentiment'] = df['sentiment'].fillna('Neutral')
+    df['color'] = df['sentiment'].map(LABEL_COLORS)
+    return df[[col for col in BUSINESS_OUTPUT_COLUMNS if col in df.columns]]
+
+
+# --------------------------------------------------------------------------------------
+# ESTADO INCREMENTAL
+# --------------------------------------------------------------------------------------
+def _tail_digest(path, offset):
+    with open(path, 'rb') as handle:
+        handle.seek(max(offset - TAIL_CHECK_BYTES, 0))
+        return hashlib.sha1(handle.read(min(offset, TAIL_CHECK_BYTES))).hexdigest()
+
+
+def _load_state(state_dir):
+    meta_path = os.path.join(state_dir, STATE_META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as handle:
+        meta = json.load(handle)
+    counts = pd.read_feather(os.path.join(state_dir, STATE_COUNTS_FILE)).set_index('business_id')
+    review_ids = pd.read_feather(os.path.join(state_dir, STATE_IDS_FILE))['review_id']
+    return meta, counts, set(review_ids)
+
+
+def _save_state(state_dir, meta, counts, review_ids):
+    os.makedirs(state_dir, exist_ok=True)
+    counts.reset_index().to_feather(os.path.join(state_dir, STATE_COUNTS_FILE))
+    pd.DataFrame({'review_id': sorted(review_ids)}).to_feather(os.path.join(state_dir, STATE_IDS_FILE))
+    with open(os.path.join(state_dir, STATE_META_FILE), 'w') as handle:
+        json.dump(meta, handle, indent=2)
+
+
+def _read_appended_reviews(path, offset, header):
+    """Lee solo las filas agregadas al CSV después del byte `offset`."""
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        return pd.read_csv(handle, names=header, header=None, usecols=['review_id', 'business_id', 'sentiment'])
+
+
+def refresh_review_counts(reviews_path, state_dir=STATE_DIR, full=False):
+    """
+    Actualiza los conteos por negocio leyendo solo las reseñas agregadas desde la última
+    ejecución. Si el CSV fue reescrito (no solo extendido) o `full=True`, recalcula todo.
+    Devuelve (conteos, número de reseñas nuevas procesadas).
+    """
+    size = os.path.getsize(reviews_path)
+    state = None if full else _load_state(state_dir)
+    if state is not None:
+        meta, counts, seen_ids = state
+        offset = meta['byte_offset']
+        if size < offset or _tail_digest(reviews_path, offset) != meta['tail_digest']:
+            state = None
+
+    if state is None:
+        header = list(pd.read_csv(reviews_path, nrows=0).columns)
+        new_reviews = pd.read_csv(reviews_path, usecols=['review_id', 'business_id', 'sentiment'])
+        counts, seen_ids = None, set()
+    else:
+        header = meta['header']
+        new_reviews = _read_appended_reviews(reviews_path, offset, header) if size > offset else None
+
+    processed = 0
+    if new_reviews is not None and not new_reviews.empty:
+        new_reviews = new_reviews[~new_reviews['review_id'].isin(seen_ids)]
+        new_reviews = new_reviews.assign(sentiment=new_reviews['sentiment'].astype(str).str.title())
+        counts = merge_counts(counts, count_review_sentiments(new_reviews))
+        seen_ids.update(new_reviews['review_id'])
+        processed = new_reviews['review_id'].nunique()
+
+    if counts is None:
+        counts = count_review_sentiments(pd.DataFrame(columns=['review_id', 'business_id', 'sentiment']))
+
+    meta = {'header': header, 'byte_offset': size, 'tail_digest': _tail_digest(reviews_path, size)}
+    _save_state(state_dir, meta, counts, seen_ids)
+    return counts, processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula el sentimiento por negocio a partir de las reseñas.")
+    parser.add_argument('--reviews', default=data_loader.dataset_path(data_loader.REVIEWS_FILE))
+    parser.add_argument('--businesses', default=data_loader.dataset_path(BUSINESS_SOURCE_FILE))
+    parser.add_argument('--output', default=data_loader.dataset_path(data_loader.BUSINESS_FILE),
+                        help="Tabla de negocios con sentimiento que consume el dashboard.")
+    parser.add_argument('--aggregates', default=data_loader.dataset_path(AGGREGATES_FILE),
+                        help="Conteos, proporciones y scores por negocio.")
+    parser.add_argument('--state-dir', default=STATE_DIR)
+    parser.add_argument('--full', action='store_true', help="Ignora el estado incremental.")
+    args = parser.parse_args()
+
+    counts, processed = refresh_review_counts(args.reviews, args.state_dir, full=args.full)
+    scores = business_scores(counts)
+    scores.sort_index().to_csv(args.aggregates)
+
+    businesses = pd.read_csv(args.businesses)
+    apply_scores_to_businesses(businesses, scores).to_csv(args.output, index=False)
+    print(f"{processed} reseñas nuevas procesadas; {len(scores)} negocios con reseñas.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Etiquetado de sentimiento por lotes para reseñas nuevas o re-scrapeadas (sin red).
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.SentimentScoring --input Datasets/scrape/reviews.csv --workers 8
+
+Sin `--output` el resultado se escribe junto a la entrada (`<entrada>_with_sentiment.csv`);
+nunca se sobrescribe por omisión el dataset que lee el dashboard.
+
+Modelo: VADER (léxico incluido en el paquete `vaderSentiment`; si no está instalado
+se usa `nltk.sentiment.vader` con el recurso 'vader_lexicon' ya descargado).
+    compound >= 0.05  -> 'positivo'
+    compound <= -0.05 -> 'negativo'
+    en otro caso      -> 'neutral'
+
+Los textos se identifican por hash: cada texto distinto se evalúa una sola vez y los
+resultados se guardan por partes en `--state-dir`. Si el proceso se interrumpe, la
+siguiente ejecución retoma desde la última parte escrita, y al re-etiquetar un scrape
+más grande solo se evalúan los textos que no se habían visto.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+
+# --- Variables Globales ---
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+SCORES_DIR = os.path.join(data_loader.DATASETS_DIR, 'indexes', 'sentiment_scores')
+SCORES_PART_PATTERN = 'part-{:06d}.feather'
+
+# Filas leídas del CSV por bloque y textos enviados a cada tarea del pool
+READ_CHUNK_ROWS = 200_000
+BATCH_TEXTS = 2_000
+
+# Estado del analizador en cada proceso del pool (se crea una vez por proceso)
+_analyzer = None
+
+
+# --------------------------------------------------------------------------------------
+# MODELO (VADER, sin acceso a red)
+# --------------------------------------------------------------------------------------
+def load_analyzer():
+    """Analizador VADER con léxico local; error claro si no hay ninguno disponible."""
+    try:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+    except ImportError:
+        pass
+    try:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+    except LookupError:
+        raise SystemExit(
+            "No hay léxico VADER local. Instala `pip install vaderSentiment` (incluye el léxico) "
+            "o descarga una vez el recurso de NLTK: python -m nltk.downloader vader_lexicon"
+        )
+
+
+def model_version(analyzer):
+    """Huella del léxico y de los umbrales: si cambian, los textos se vuelven a evaluar."""
+    lexicon = json.dumps(sorted(analyzer.lexicon.items()))
+    payload = f"{lexicon}|{POSITIVE_THRESHOLD}|{NEGATIVE_THRESHOLD}"
+    return 'vader-' + hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def label_scores(compound):
+    """Etiqueta (minúsculas, como en los CSV de origen) a partir del score compuesto."""
+    compound = np.asarray(compound, dtype=np.float64)
+    return np.where(compound >= POSITIVE_THRESHOLD, 'positivo',
+                    np.where(compound <= NEGATIVE_THRESHOLD, 'negativo', 'neutral'))
+
+
+def _init_worker():
+    global _analyzer
+    _analyzer = load_analyzer()
+
+
+def _score_batch(hashes, texts):
+    """Tarea del pool: score compuesto de cada texto del lote."""
+    compound = np.fromiter((_analyzer.polarity_scores(text)['compound'] for text in texts),
+                           dtype=np.float32, count=len(texts))
+    return hashes, compound
+
+
+# --------------------------------------------------------------------------------------
+# HASH DE TEXTOS Y ALMACÉN DE SCORES (partes Feather, solo se agregan)
+# --------------------------------------------------------------------------------------
+def text_hashes(texts):
+    """Hash de 64 bits (blake2b) de cada texto, como uint64."""
+    digests = b''.join(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest() for text in texts)
+    return np.frombuffer(digests, dtype='<u8').copy()
+
+
+def _model_dir(state_dir, version):
+    return os.path.join(state_dir, version)
+
+
+def load_scores(state_dir, version):
+    """Scores ya calculados para esta versión del modelo: DataFrame (text_hash, compound)."""
+    parts = sorted(glob.glob(os.path.join(_model_dir(state_dir, version), 'part-*.feather')))
+    if not parts:
+        return pd.DataFrame({'text_hash': np.empty(0, dtype=np.uint64), 'compound': np.empty(0, dtype=np.float32)})
+    scores = pd.concat([pd.read_feather(part) for part in parts], ignore_index=True)
+    return scores.drop_duplicates('text_hash', keep='last')
+
+
+def _write_part(state_dir, version, part_number, hashes, compound):
+    """Escribe una parte de forma atómica (archivo temporal + rename): el checkpoint."""
+    directory = _model_dir(state_dir, version)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SCORES_PART_PATTERN.format(part_number))
+    tmp_path = path + '.tmp'
+    pd.DataFrame({'text_hash': hashes, 'compound': compound}).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _next_part_number(state_dir, version):
+    parts = glob.glob(os.path.join(_model_dir(state_dir, version), 'part-*.feather'))
+    return 1 + max((int(os.path.basename(p)[5:11]) for p in parts), default=-1)
+
+
+def _read_texts(path, chunk_rows=READ_CHUNK_ROWS):
+    for chunk in pd.read_csv(path, usecols=['text'], dtype={'text': 'string'}, chunksize=chunk_rows):
+        yield chunk['text'].fillna('').to_numpy(dtype=object)
+
+
+# --------------------------------------------------------------------------------------
+# PIPELINE
+# --------------------------------------------------------------------------------------
+def score_new_texts(input_path, state_dir=SCORES_DIR, workers=None, batch_texts=BATCH_TEXTS):
+    """
+    Evalúa en paralelo los textos del CSV que aún no tienen score y guarda cada lote
+    terminado como una parte nueva. Devuelve (versión del modelo, textos evaluados).
+    """
+    version = model_version(load_analyzer())
+    known = load_scores(state_dir, version)['text_hash'].to_numpy()
+    seen = np.sort(known)
+    part_number = _next_part_number(state_dir, version)
+    workers = workers or os.cpu_count() or 1
+    scored = 0
+
+    def save(done):
+        nonlocal part_number, scored
+        for future in done:
+            hashes, compound = future.result()
+            _write_part(state_dir, version, part_number, hashes, compound)
+            part_number += 1
+            scored += len(hashes)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        for texts in _read_texts(input_path):
+            hashes = text_hashes(texts)
+            # Solo textos nuevos (ni evaluados antes ni repetidos dentro del bloque)
+            hashes, first = np.unique(hashes, return_index=True)
+            is_new = ~np.isin(hashes, seen, assume_unique=True)
+            hashes, texts = hashes[is_new], texts[first[is_new]]
+            seen = np.union1d(seen, hashes)
+
+            for start in range(0, len(hashes), batch_texts):
+                # Ventana acotada de tareas en vuelo para no cargar todo el CSV en memoria
+                while len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    save(done)
+                pending.add(pool.submit(_score_batch, hashes[start:start + batch_texts],
+                                        list(texts[start:start + batch_texts])))
+        save(wait(pending).done)
+    return version, scored
+
+
+def compact_scores(state_dir, version):
+    """Une todas las partes en una sola (lecturas más rápidas en la siguiente ejecución)."""
+    scores = load_scores(state_dir, version)
+    directory = _model_dir(state_dir, version)
+    old_parts = glob.glob(os.path.join(directory, 'part-*.feather'))
+    if len(old_parts) <= 1:
+        return
+    part_number = _next_part_number(state_dir, version)
+    _write_part(state_dir, version, part_number, scores['text_hash'].to_numpy(), scores['compound'].to_numpy())
+    for part in old_parts:
+        os.remove(part)
+
+
+def write_labeled_reviews(input_path, output_path, state_dir, version, chunk_rows=READ_CHUNK_ROWS):
+    """Escribe el CSV de entrada con la columna 'sentiment' (nueva o reemplazada)."""
+    scores = load_scores(state_dir, version)
+    score_index = pd.Index(scores['text_hash'].to_numpy())
+    labels = label_scores(scores['compound'].to_numpy())
+
+    tmp_path = output_path + '.tmp'
+    header = True
+    for chunk in pd.read_csv(input_path, chunksize=chunk_rows, dtype=str, keep_default_na=False):
+        positions = score_index.get_indexer(text_hashes(chunk['text'].to_numpy(dtype=object)))
+        chunk['sentiment'] = np.where(positions >= 0, labels[positions], '')
+        chunk.to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    os.replace(tmp_path, output_path)
+
+
+def default_output_path(input_path):
+    """Ruta del resultado junto a la entrada: reviews.csv -> reviews_with_sentiment.csv."""
+    stem, extension = os.path.splitext(input_path)
+    return f"{stem}_with_sentiment{extension or '.csv'}"
+
+
+def label_reviews_file(input_path, output_path=None, state_dir=SCORES_DIR, workers=None, batch_texts=BATCH_TEXTS):
+    """
+    Pipeline completo: evalúa los textos nuevos, compacta los scores y escribe el CSV
+    etiquetado. Devuelve (ruta del resultado, versión del modelo, textos evaluados).
+    """
+    output_path = output_path or default_output_path(input_path)
+    if os.path.abspath(output_path) == os.path.abspath(input_path):
+        raise ValueError("La salida no puede ser el mismo archivo que la entrada.")
+    version, scored = score_new_texts(input_path, state_dir, workers, batch_texts)
+    compact_scores(state_dir, version)
+    write_labeled_reviews(input_path, output_path, state_dir, version)
+    return output_path, version, scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Etiqueta el sentimiento de reseñas con VADER, en paralelo y de forma reanudable.")
+    parser.add_argument('--input', default=data_loader.dataset_path('reviews.csv'),
+                        help="CSV de reseñas con columna 'text'.")
+    parser.add_argument('--output', default=None,
+                        help="CSV etiquetado (por defecto, junto a la entrada con sufijo _with_sentiment).")
+    parser.add_argument('--state-dir', default=SCORES_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del pool (por defecto, todos los núcleos).")
+    parser.add_argument('--batch-texts', type=int, default=BATCH_TEXTS)
+    args = parser.parse_args()
+    if args.output and os.path.abspath(args.output) == os.path.abspath(args.input):
+        parser.error("--output no puede ser el mismo archivo que --input.")
+
+    started = time.perf_counter()
+    output, version, scored = label_reviews_file(args.input, args.output, args.state_dir, args.workers, args.batch_texts)
+    print(f"{scored} textos nuevos evaluados ({version}) en {time.perf_counter() - started:.1f} s; "
+          f"resultado en {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# --- Variables Globales ---
+# Kilómetros por grado (aproximación equirectangular, suficiente a escala estatal)
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+SQRT3 = np.sqrt(3.0)
+
+
+# --------------------------------------------------------------------------------------
+# PROYECCIÓN Y REDONDEO HEXAGONAL
+# Se proyecta lat/lon a km alrededor de una latitud de referencia y se asigna cada punto
+# a un hexágono (orientación "pointy-top", coordenadas axiales q/r) de radio `cell_km`.
+# --------------------------------------------------------------------------------------
+def _project_km(lat, lon, ref_lat):
+    x = lon * KM_PER_DEG_LON_EQUATOR * np.cos(np.radians(ref_lat))
+    y = lat * KM_PER_DEG_LAT
+    return x, y
+
+
+def _unproject_km(x, y, ref_lat):
+    lat = y / KM_PER_DEG_LAT
+    lon = x / (KM_PER_DEG_LON_EQUATOR * np.cos(np.radians(ref_lat)))
+    return lat, lon
+
+
+def _hex_round(q, r):
+    """Redondeo cúbico vectorizado de coordenadas axiales fraccionarias."""
+    s = -q - r
+    rq, rr, rs = np.rint(q), np.rint(r), np.rint(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def hex_cells(lat, lon, cell_km, ref_lat=None):
+    """Asigna a cada punto las coordenadas axiales (q, r) de su hexágono."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if ref_lat is None:
+        ref_lat = float(np.nanmean(lat)) if len(lat) else 0.0
+    x, y = _project_km(lat, lon, ref_lat)
+    q = (SQRT3 / 3 * x - y / 3) / cell_km
+    r = (2 / 3 * y) / cell_km
+    return _hex_round(q, r)
+
+
+def hex_centers(q, r, cell_km, ref_lat):
+    """Centro (lat, lon) de los hexágonos con coordenadas axiales (q, r)."""
+    x = cell_km * SQRT3 * (q + r / 2)
+    y = cell_km * 1.5 * r
+    return _unproject_km(x, y, ref_lat)
+
+
+# --------------------------------------------------------------------------------------
+# AGREGACIÓN POR CELDA
+# --------------------------------------------------------------------------------------
+def hexbin_aggregate(df, cell_km=15.0, weights=None, ref_lat=None):
+    """
+    Agrupa negocios en hexágonos y devuelve una fila por celda ocupada con:
+    latitude/longitude (centro), businesses, reviews (suma de review_count),
+    mean_rating, negative_share (fracción de negocios Negativos) y weight
+    (suma de `weights`, p. ej. reseñas negativas por negocio; por defecto 1 por negocio).
+    """
+    valid = df['latitude'].notna().to_numpy() & df['longitude'].notna().to_numpy()
+    lat = df['latitude'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    lon = df['longitude'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    if ref_lat is None:
+        ref_lat = float(lat.mean()) if len(lat) else 0.0
+
+    columns = ['latitude', 'longitude', 'businesses', 'reviews', 'mean_rating', 'negative_share', 'weight']
+    if len(lat) == 0:
+        return pd.DataFrame(columns=columns)
+
+    q, r = hex_cells(lat, lon, cell_km, ref_lat)
+    cells, inverse = np.unique(np.stack([q, r], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    n_cells = len(cells)
+
+    businesses = np.bincount(inverse, minlength=n_cells)
+    ratings = df['rating'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    rated = ~np.isnan(ratings)
+    rating_sum = np.bincount(inverse[rated], weights=ratings[rated], minlength=n_cells)
+    rating_n = np.bincount(inverse[rated], minlength=n_cells)
+    negatives = (df['sentiment'].astype(object).to_numpy()[valid] == 'Negativo')
+    reviews = np.bincount(inverse, weights=df['review_count'].to_numpy(dtype=np.float64)[valid], minlength=n_cells)
+    if weights is None:
+        weight = businesses.astype(np.float64)
+    else:
+        weight = np.bincount(inverse, weights=np.asarray(weights, dtype=np.float64)[valid], minlength=n_cells)
+
+    center_lat, center_lon = hex_centers(cells[:, 0], cells[:, 1], cell_km, ref_lat)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_rating = np.round(rating_sum / rating_n, 2)
+    return pd.DataFrame({
+        'latitude': center_lat,
+        'longitude': center_lon,
+        'businesses': businesses,
+        'reviews': reviews.astype(np.int64),
+        'mean_rating': mean_rating,
+        'negative_share': np.bincount(inverse, weights=negatives, minlength=n_cells) / businesses,
+        'weight': weight,
+    }, columns=columns)
+
+
+def share_to_color(share, alpha=200):
+    """Color RGBA por celda: verde (0 % negativos) a rojo (100 % negativos)."""
+    share = np.clip(np.nan_to_num(np.asarray(share, dtype=np.float64)), 0.0, 1.0)
+    colors = np.empty((len(share), 4), dtype=np.uint8)
+    colors[:, 0] = np.rint(255 * share)
+    colors[:, 1] = np.rint(160 * (1 - share))
+    colors[:, 2] = 0
+    colors[:, 3] = alpha
+    return colors.tolist()
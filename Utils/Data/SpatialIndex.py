@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from Utils.Data.ProcessCache import process_cache
+from Utils.Data.SpatialAggregation import KM_PER_DEG_LAT, KM_PER_DEG_LON_EQUATOR
+
+# --- Variables Globales ---
+# Tamaño de la celda de la rejilla en grados (~11 km de lado en Florida)
+GRID_CELL_DEG = 0.1
+# Factor para combinar (fila, columna) de la celda en una sola llave entera
+_GRID_COLUMNS = 1 << 20
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+# --------------------------------------------------------------------------------------
+# ÍNDICE DE REJILLA (geohash simple sobre lat/lon)
+# Las posiciones se ordenan por llave de celda; las celdas de una misma fila de la
+# rejilla son contiguas, así que una franja de columnas es un único rango del arreglo.
+# --------------------------------------------------------------------------------------
+def _cell_rows_cols(lat, lon, cell_deg):
+    rows = np.floor((lat + 90.0) / cell_deg).astype(np.int64)
+    cols = np.floor((lon + 180.0) / cell_deg).astype(np.int64)
+    return rows, cols
+
+
+def build_spatial_index(df, cell_deg=GRID_CELL_DEG):
+    """Construye el índice de rejilla de un DataFrame con columnas latitude/longitude."""
+    lat = df['latitude'].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = df['longitude'].to_numpy(dtype=np.float64, na_value=np.nan)
+    positions = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+
+    rows, cols = _cell_rows_cols(lat[positions], lon[positions], cell_deg)
+    keys = rows * _GRID_COLUMNS + cols
+    order = np.argsort(keys, kind='stable')
+
+    index = {
+        'cell_deg': cell_deg,
+        'keys': keys[order],
+        'positions': positions[order],
+        'latitude': lat[positions][order],
+        'longitude': lon[positions][order],
+    }
+    if 'city' in df.columns:
+        index['city_centers'] = _city_centers(df)
+    return index
+
+
+def _city_centers(df):
+    """Centro (promedio de coordenadas) de los negocios de cada ciudad."""
+    centers = (
+        df[['city', 'latitude', 'longitude']]
+        .dropna()
+        .astype({'city': object, 'latitude': np.float64, 'longitude': np.float64})
+        .groupby('city')[['latitude', 'longitude']]
+        .mean()
+    )
+    return {city: (row.latitude, row.longitude) for city, row in centers.iterrows()}
+
+
+@process_cache(max_entries=4)
+def _cached_spatial_index(signature, _df):
+    return build_spatial_index(_df)
+
+
+def get_spatial_index(df, signature=None):
+    """Índice espacial de `df`, construido una vez por proceso cuando se da la firma del dataset."""
+    if signature is None:
+        return build_spatial_index(df)
+    return _cached_spatial_index((signature, len(df)), df)
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTAS
+# --------------------------------------------------------------------------------------
+def _concat_ranges(starts, stops):
+    """Concatena los rangos [start, stop) sin bucle de Python."""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+
+def _bbox_slots(spatial_index, min_lat, max_lat, min_lon, max_lon):
+    """Índices (en el orden del índice) de los puntos en las celdas que cubren la caja."""
+    cell_deg = spatial_index['cell_deg']
+    row_lo, col_lo = _cell_rows_cols(np.array([min_lat]), np.array([min_lon]), cell_deg)
+    row_hi, col_hi = _cell_rows_cols(np.array([max_lat]), np.array([max_lon]), cell_deg)
+
+    rows = np.arange(row_lo[0], row_hi[0] + 1)
+    starts = np.searchsorted(spatial_index['keys'], rows * _GRID_COLUMNS + col_lo[0], side='left')
+    stops = np.searchsorted(spatial_index['keys'], rows * _GRID_COLUMNS + col_hi[0], side='right')
+    return _concat_ranges(starts, stops)
+
+
+def query_bbox(spatial_index, min_lat, max_lat, min_lon, max_lon):
+    """Posiciones (ordenadas) de los negocios dentro de la caja lat/lon (p. ej. el viewport)."""
+    slots = _bbox_slots(spatial_index, min_lat, max_lat, min_lon, max_lon)
+    lat = spatial_index['latitude'][slots]
+    lon = spatial_index['longitude'][slots]
+    inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return np.sort(spatial_index['positions'][slots[inside]])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia en km sobre la esfera (vectorizada)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def query_radius(spatial_index, lat, lon, radius_km):
+    """Posiciones (ordenadas) de los negocios a menos de `radius_km` del punto (lat, lon)."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / (KM_PER_DEG_LON_EQUATOR * max(np.cos(np.radians(lat)), 1e-6))
+    slots = _bbox_slots(spatial_index, lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+    distances = haversine_km(lat, lon, spatial_index['latitude'][slots], spatial_index['longitude'][slots])
+    return np.sort(spatial_index['positions'][slots[distances <= radius_km]])
+
+
+# --------------------------------------------------------------------------------------
+# ÍNDICE POR LLAVE (p. ej. reseñas agrupadas por business_id)
+# --------------------------------------------------------------------------------------
+def build_group_index(keys):
+    """Agrupa posiciones por llave: llaves únicas ordenadas + offsets (formato CSR)."""
+    keys = pd.Series(keys).astype(object).to_numpy()
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    return {
+        'keys': unique_keys,
+        'order': order,
+        'offsets': np.append(starts, len(keys)),
+    }
+
+
+@process_cache(max_entries=4)
+def _cached_group_index(signature, _keys):
+    return build_group_index(_keys)
+
+
+def get_group_index(keys, signature=None):
+    """Índice por llave de `keys`, construido una vez por proceso cuando se da la firma."""
+    if signature is None:
+        return build_group_index(keys)
+    return _cached_group_index((signature, len(keys)), keys)
+
+
+def group_positions(group_index, selected_keys):
+    """Posiciones (ordenadas) de todas las filas cuya llave está en `selected_keys`."""
+    keys = group_index['keys']
+    selected_keys = pd.Series(selected_keys).astype(object).to_numpy()
+    slots = np.searchsorted(keys, selected_keys)
+    in_range = slots < len(keys)
+    slots, selected_keys = slots[in_range], selected_keys[in_range]
+    slots = slots[keys[slots] == selected_keys]
+    slots = _concat_ranges(group_index['offsets'][slots], group_index['offsets'][slots + 1])
+    return np.sort(group_index['order'][slots])
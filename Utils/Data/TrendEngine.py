@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+from Utils.Data.DataLoader import SENTIMENT_CATEGORIES
+from Utils.Data.ProcessCache import process_cache
+from Utils.Data.SpatialIndex import _concat_ranges
+
+# --- Variables Globales ---
+# Granularidades soportadas: clave -> etiqueta
+GRANULARITIES = {
+    'D': 'Día',
+    'W': 'Semana',
+    'M': 'Mes',
+}
+
+# Medidas acumuladas por (entidad, periodo); 'rated' cuenta las reseñas con rating
+# (el promedio se divide entre ellas, no entre todas las reseñas)
+MEASURES = ['reviews', 'rated', 'rating_sum', 'positive', 'neutral', 'negative']
+_SENTIMENT_MEASURES = {'Positivo': 'positive', 'Neutral': 'neutral', 'Negativo': 'negative'}
+
+TREND_COLUMNS = ('business_id', 'rating', 'sentiment', 'time_created')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+# Factor para combinar (entidad, periodo) en una sola llave ordenable
+_PERIOD_SPAN = 1 << 32
+
+
+# --------------------------------------------------------------------------------------
+# CÓDIGOS DE PERIODO (enteros; el 1970-01-05 fue lunes, inicio de semana)
+# --------------------------------------------------------------------------------------
+def period_codes(timestamps, granularity):
+    """Convierte fechas a códigos enteros de día, semana (lunes) o mes."""
+    days = (np.asarray(timestamps, dtype='datetime64[D]') - _EPOCH).astype(np.int64)
+    if granularity == 'D':
+        return days
+    if granularity == 'W':
+        return (days - 4) // 7
+    if granularity == 'M':
+        return np.asarray(timestamps, dtype='datetime64[M]').astype(np.int64)
+    raise ValueError(f"Granularidad no soportada: {granularity}")
+
+
+def period_starts(codes, granularity):
+    """Fecha de inicio de cada código de periodo."""
+    codes = np.asarray(codes, dtype=np.int64)
+    if granularity == 'D':
+        return pd.to_datetime(_EPOCH + codes.astype('timedelta64[D]'))
+    if granularity == 'W':
+        return pd.to_datetime(_EPOCH + (codes * 7 + 4).astype('timedelta64[D]'))
+    return pd.to_datetime(codes.astype('datetime64[M]'))
+
+
+# --------------------------------------------------------------------------------------
+# CONSTRUCCIÓN DE ROLLUPS
+# Cada rollup guarda, ordenado por (entidad, periodo), una fila por combinación con
+# reseñas y las sumas acumuladas de cada medida (con un cero inicial). La suma de
+# cualquier rango contiguo es cum[hi] - cum[lo].
+# --------------------------------------------------------------------------------------
+def _measure_matrix(reviews):
+    """Una fila por reseña: 1, si tiene rating, rating (0 si falta) y one-hot del sentimiento."""
+    sentiment = pd.Categorical(reviews['sentiment'], categories=SENTIMENT_CATEGORIES)
+    values = np.zeros((len(reviews), len(MEASURES)), dtype=np.int64)
+    values[:, MEASURES.index('reviews')] = 1
+    values[:, MEASURES.index('rated')] = reviews['rating'].notna().to_numpy()
+    values[:, MEASURES.index('rating_sum')] = reviews['rating'].to_numpy(dtype=np.float64, na_value=0).astype(np.int64)
+    for sentiment_name, measure in _SENTIMENT_MEASURES.items():
+        values[:, MEASURES.index(measure)] = sentiment.codes == SENTIMENT_CATEGORIES.index(sentiment_name)
+    return values
+
+
+def _build_rollup(entity, periods, values):
+    keys = entity.astype(np.int64) * _PERIOD_SPAN + periods
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    sums = np.column_stack([
+        np.bincount(inverse, weights=values[:, col], minlength=len(unique_keys))
+        for col in range(values.shape[1])
+    ]).astype(np.int64).reshape(len(unique_keys), values.shape[1])
+    cumulative = np.vstack([np.zeros((1, values.shape[1]), dtype=np.int64), np.cumsum(sums, axis=0)])
+    return {
+        'keys': unique_keys,
+        'period': unique_keys % _PERIOD_SPAN,
+        'cumulative': cumulative,
+    }
+
+
+def build_trend_rollups(reviews, businesses):
+    """
+    Parsea una vez las fechas y construye rollups diarios, semanales y mensuales:
+    por negocio (entidad = posición en `businesses`), por ciudad y global.
+    """
+    reviews = reviews[reviews['time_created'].notna()]
+    return _rollups_from_values(reviews['business_id'], reviews['time_created'].to_numpy(),
+                                _measure_matrix(reviews), businesses)
+
+
+def build_trend_rollups_from_daily(daily, businesses):
+    """
+    Rollups a partir de medidas ya sumadas por negocio y día (AnalyticsBackend.trend_daily_sql):
+    las medidas son aditivas, así que el resultado es el mismo que con las reseñas.
+    """
+    values = daily[MEASURES].to_numpy(dtype=np.int64)
+    return _rollups_from_values(daily['business_id'], daily['day'].to_numpy(), values, businesses)
+
+
+def _rollups_from_values(review_business_ids, timestamps, values, businesses):
+    business_pos = pd.Index(businesses['business_id'].astype(object)).get_indexer(
+        pd.Series(review_business_ids).astype(object)
+    )
+    city = pd.Categorical(businesses['city'].astype(object))
+    known = business_pos >= 0
+    review_city = np.where(known, city.codes[np.where(known, business_pos, 0)], -1)
+
+    rollups = {
+        'cities': list(city.categories),
+        'first_date': pd.Timestamp(timestamps.min()).date() if len(timestamps) else None,
+        'last_date': pd.Timestamp(timestamps.max()).date() if len(timestamps) else None,
+    }
+    for granularity in GRANULARITIES:
+        periods = period_codes(timestamps, granularity)
+        has_city = review_city >= 0
+        rollups[granularity] = {
+            'business': _build_rollup(business_pos[known], periods[known], values[known]),
+            'city': _build_rollup(review_city[has_city], periods[has_city], values[has_city]),
+            'all': _build_rollup(np.zeros(len(periods), dtype=np.int64), periods, values),
+        }
+    return rollups
+
+
+@process_cache(max_entries=2)
+def _cached_trend_rollups(signature, _reviews, _businesses):
+    return build_trend_rollups(_reviews, _businesses)
+
+
+@process_cache(max_entries=2)
+def _cached_backend_trend_rollups(signature, _backend, _businesses):
+    from Utils.Data.AnalyticsBackend import trend_daily_sql
+    return build_trend_rollups_from_daily(trend_daily_sql(_backend), _businesses)
+
+
+def get_trend_rollups(reviews, businesses, signature=None, backend=None):
+    """
+    Rollups de tendencias, construidos una vez por proceso cuando se da la firma de los datos.
+    Con `backend` (AnalyticsBackend) las reseñas se agregan por día en la base y `reviews` no se usa.
+    """
+    if backend is not None:
+        return _cached_backend_trend_rollups((backend['signature'], signature), backend, businesses)
+    if signature is None:
+        return build_trend_rollups(reviews, businesses)
+    return _cached_trend_rollups(signature, reviews, businesses)
+
+
+# --------------------------------------------------------------------------------------
+# CONSULTAS
+# --------------------------------------------------------------------------------------
+def _entity_ranges(rollup, entities, start_code, end_code):
+    """Rangos [lo, hi) del rollup para cada entidad dentro de [start_code, end_code]."""
+    entities = np.asarray(entities, dtype=np.int64) * _PERIOD_SPAN
+    lo = np.searchsorted(rollup['keys'], entities + start_code, side='left')
+    hi = np.searchsorted(rollup['keys'], entities + end_code, side='right')
+    return lo, np.maximum(hi, lo)
+
+
+def range_totals(rollup, entities, start_code, end_code):
+    """Totales de cada medida por entidad en el rango de periodos (restas de acumulados)."""
+    lo, hi = _entity_ranges(rollup, entities, start_code, end_code)
+    cumulative = rollup['cumulative']
+    return pd.DataFrame(cumulative[hi] - cumulative[lo], columns=MEASURES)
+
+
+def trend_series(rollups, granularity, start, end, scope='all', entities=None):
+    """
+    Serie por periodo (reseñas, rating promedio y proporción de cada sentimiento) para
+    el rango de fechas [start, end]. `scope` es 'all', 'business' o 'city'; con
+    'business'/'city', `entities` son las posiciones de negocios o códigos de ciudad.
+    """
+    rollup = rollups[granularity][scope]
+    start_code = int(period_codes(np.array([start], dtype='datetime64[D]'), granularity)[0])
+    end_code = int(period_codes(np.array([end], dtype='datetime64[D]'), granularity)[0])
+    if scope == 'all':
+        entities = [0]
+
+    rows = _concat_ranges(*_entity_ranges(rollup, entities, start_code, end_code))
+
+    n_periods = max(end_code - start_code + 1, 0)
+    slot = rollup['period'][rows] - start_code
+    # Valores de cada fila del rollup = diferencia de acumulados consecutivos
+    row_values = rollup['cumulative'][rows + 1] - rollup['cumulative'][rows]
+    totals = np.column_stack([
+        np.bincount(slot, weights=row_values[:, col], minlength=n_periods)
+        for col in range(len(MEASURES))
+    ]).astype(np.int64).reshape(n_periods, len(MEASURES))
+
+    series = pd.DataFrame(totals, columns=MEASURES,
+                          index=period_starts(np.arange(start_code, end_code + 1), granularity))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reviews = series['reviews'].where(series['reviews'] > 0)
+        series['mean_rating'] = series['rating_sum'] / series['rated'].where(series['rated'] > 0)
+        for measure in _SENTIMENT_MEASURES.values():
+            series[f'{measure}_share'] = series[measure] / reviews
+    return series
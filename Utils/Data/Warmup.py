@@ -0,0 +1,186 @@
+"""
+Precalentamiento del dashboard: importa las dependencias pesadas y llena los cachés de
+datos e índices antes de que se conecte la primera sesión.
+
+Uso (desde la raíz del proyecto):
+
+    python -m Utils.Data.Warmup [build]                # construye cachés/índices y reporta tiempos
+    python -m Utils.Data.Warmup serve [opciones de streamlit run]
+    python -m Utils.Data.Warmup serve --no-warmup --server.port 8501
+
+`serve` levanta `streamlit run streamlit_app.py` en este mismo proceso y precalienta en
+un hilo en segundo plano: los cachés de la capa de datos (ProcessCache.process_cache) son del proceso,
+así que la primera sesión encuentra los datos, el índice de filtros, el espacial, el de
+n-gramas, el de búsqueda, las quejas por negocio y el cubo de KPIs ya construidos (o
+espera a que terminen, sin repetirlos).
+Sin `serve` solo se generan los índices persistidos en disco (p. ej. al construir la imagen).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+# --- Variables Globales ---
+APP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'streamlit_app.py'))
+
+# Espera máxima a que el servidor de Streamlit cree su runtime antes de precalentar
+RUNTIME_WAIT_S = 30
+WARMUP_THREAD_NAME = 'shiny-stats-warmup'
+
+LOGGER = logging.getLogger('shiny_stats.startup')
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.propagate = False
+
+
+# --------------------------------------------------------------------------------------
+# PASOS DEL PRECALENTAMIENTO (mismas llamadas y firmas que usa el dashboard)
+# --------------------------------------------------------------------------------------
+def _import_map_dependencies(context):
+    import pydeck  # noqa: F401
+
+
+def _import_wordcloud_dependencies(context):
+    import matplotlib.figure  # noqa: F401
+    import wordcloud  # noqa: F401
+
+
+def _load_businesses(context):
+    from Utils.Data import DataLoader as data_loader
+    context['businesses'] = data_loader.load_business_data()
+    context['business_signature'] = data_loader.dataset_signature(data_loader.BUSINESS_FILE)
+
+
+def _build_business_indexes(context):
+    from Utils.Data.FilterEngine import get_filter_index
+    from Utils.Data.Ranking import get_score_components
+    from Utils.Data.SpatialIndex import get_spatial_index
+    df, signature = context['businesses'], context['business_signature']
+    get_filter_index(df, signature)
+    get_spatial_index(df, signature)
+    get_score_components(df, signature)
+
+
+def _prepare_backend(context):
+    from Utils.Data.AnalyticsBackend import get_analytics_backend
+    from Utils.Data.NgramIndex import ENGLISH_STOPWORDS
+    context['backend'] = get_analytics_backend(ENGLISH_STOPWORDS)
+
+
+def _load_reviews(context):
+    from Utils.Data import DataLoader as data_loader
+    if context.get('backend') is None:
+        context['reviews'] = data_loader.load_reviews_data(columns=data_loader.REVIEW_SEARCH_COLUMNS)
+        context['reviews_signature'] = data_loader.dataset_signature(data_loader.REVIEWS_FILE)
+
+
+def _build_review_indexes(context):
+    from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, get_reviews_ngram_index
+    from Utils.Data.SearchIndex import get_search_index
+    from Utils.Data.SpatialIndex import get_group_index
+    reviews = context.get('reviews')
+    if reviews is None:
+        return
+    get_search_index(get_reviews_ngram_index(reviews['text'], ENGLISH_STOPWORDS))
+    get_group_index(reviews['business_id'], context['reviews_signature'])
+
+
+def _build_complaints(context):
+    from Utils.Widgets.Leaderboard import load_competitor_complaints
+    load_competitor_complaints(context.get('reviews'), context.get('backend'), context['workers'])
+
+
+def _build_filter_cube(context):
+    from Utils.Data import DataLoader as data_loader
+    from Utils.Data.FilterCube import get_filter_cube
+    from Utils.Data.Queries import review_sentiment_counts
+    signature = (context['business_signature'], data_loader.dataset_signature(data_loader.REVIEWS_FILE))
+    get_filter_cube(context['businesses'], review_sentiment_counts(context.get('backend')), signature)
+
+
+def _build_trend_rollups(context):
+    from Utils.Widgets.TrendChart import load_trend_rollups
+    load_trend_rollups(context['businesses'], context['business_signature'], context.get('backend'))
+
+
+WARMUP_STEPS = (
+    ("Importar pydeck", _import_map_dependencies),
+    ("Importar wordcloud y matplotlib", _import_wordcloud_dependencies),
+    ("Carga de negocios", _load_businesses),
+    ("Índices de negocios (filtros, espacial, ranking)", _build_business_indexes),
+    ("Backend analítico", _prepare_backend),
+    ("Carga de reseñas", _load_reviews),
+    ("Índices de reseñas (n-gramas, búsqueda, por negocio)", _build_review_indexes),
+    ("Quejas por negocio", _build_complaints),
+    ("Cubo de KPIs", _build_filter_cube),
+    ("Rollups de tendencias", _build_trend_rollups),
+)
+
+
+def warm_up(workers=1):
+    """
+    Ejecuta los pasos de precalentamiento en orden y devuelve el reporte
+    ({total_ms, steps: [{step, wall_ms, error}]}); un paso que falla no detiene los demás.
+    `workers` son los procesos para las quejas por negocio: 1 dentro de un servidor (no se
+    bifurca un proceso con varios hilos), None (todos los núcleos) en `build`.
+    """
+    started = time.perf_counter()
+    context, steps = {'workers': workers}, []
+    for name, step in WARMUP_STEPS:
+        step_started = time.perf_counter()
+        error = None
+        try:
+            step(context)
+        except Exception as exc:  # El dashboard mostrará el error en la primera sesión
+            error = f"{type(exc).__name__}: {exc}"
+            LOGGER.warning("Falló el paso de precalentamiento '%s': %s", name, error)
+        steps.append({'step': name, 'wall_ms': round((time.perf_counter() - step_started) * 1000, 2), 'error': error})
+    report = {'total_ms': round((time.perf_counter() - started) * 1000, 2), 'steps': steps}
+    LOGGER.info(json.dumps({'warmup': report}, ensure_ascii=False))
+    return report
+
+
+def _warm_up_when_ready():
+    """Espera a que arranque el runtime de Streamlit (sin competir con su arranque) y precalienta."""
+    from streamlit.runtime import Runtime
+    deadline = time.monotonic() + RUNTIME_WAIT_S
+    while not Runtime.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    warm_up()
+
+
+def serve(streamlit_args, warmup=True):
+    """Levanta el dashboard (equivalente a `streamlit run`) precalentando en segundo plano."""
+    from streamlit.web import cli as stcli
+    if warmup:
+        threading.Thread(target=_warm_up_when_ready, name=WARMUP_THREAD_NAME, daemon=True).start()
+    sys.argv = ['streamlit', 'run', APP_PATH, *streamlit_args]
+    sys.exit(stcli.main())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precalienta los cachés del dashboard; `serve` además lo levanta (las opciones extra van a streamlit run)."
+    )
+    parser.add_argument('command', nargs='?', choices=('build', 'serve'), default='build')
+    parser.add_argument('--no-warmup', action='store_true', help="Con `serve`, no precalentar.")
+    args, streamlit_args = parser.parse_known_args()
+    if args.command == 'serve':
+        serve(streamlit_args, warmup=not args.no_warmup)
+        return
+
+    report = warm_up(workers=None)
+    for step in report['steps']:
+        status = f"  ERROR {step['error']}" if step['error'] else ''
+        print(f"{step['step']:<55} {step['wall_ms']:>10.1f} ms{status}")
+    print(f"{'Total':<55} {report['total_ms']:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+"""
+Recolector asíncrono de negocios y reseñas de la API Yelp Fusion v3.
+
+Uso (desde la raíz del proyecto; requiere `pip install aiohttp`):
+
+    YELP_API_KEY=... python -m Utils.Data.YelpFetcher --output-dir Datasets/scrape/2025-10 \\
+        --variant "term=car detailing" --sort-by best_match distance rating --qps 8 --concurrency 16
+
+Recorre cada combinación ciudad x variante x orden (`source_city_query`, `source_variant`,
+`source_sort_by`), página por página, y pide las reseñas de cada negocio nuevo. Todas
+las peticiones comparten una sesión HTTP con conexiones persistentes y un token bucket
+(--qps); los 429/5xx y errores de red se reintentan con backoff exponencial.
+
+El avance se guarda en `cursor.json` dentro de --output-dir: al volver a ejecutar el
+mismo comando se retoma donde quedó. Al terminar se escriben `businesses_final.csv` y
+`reviews.csv` con el esquema de los datasets del dashboard (sin duplicados); con
+--ingest las reseñas se etiquetan con Utils.Data.SentimentScoring y el lote se agrega
+además al almacén de Utils.Data.IngestionStore.
+
+Para pruebas sin red: python -m Utils.Data.MockYelpServer (ver ese módulo).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import random
+import time
+from urllib.parse import parse_qsl
+
+import pandas as pd
+
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.GenMockData import FLORIDA_CITIES
+
+# --- Variables Globales ---
+API_BASE = 'https://api.yelp.com/v3'
+API_KEY_ENV_VAR = 'YELP_API_KEY'
+
+SEARCH_VARIANTS = ['term=car detailing']
+SORT_BY_OPTIONS = ['best_match', 'distance', 'rating']
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_RESULTS = 240   # La API no devuelve más allá de offset + limit = 240
+REVIEWS_PER_BUSINESS = 3
+
+SCRAPE_DIR = os.path.join(data_loader.DATASETS_DIR, 'scrape')
+CURSOR_FILE = 'cursor.json'
+RAW_BUSINESSES_FILE = 'businesses_raw.csv'
+RAW_REVIEWS_FILE = 'reviews_raw.csv'
+BUSINESSES_OUTPUT_FILE = 'businesses_final.csv'
+REVIEWS_OUTPUT_FILE = 'reviews.csv'
+
+BUSINESS_COLUMNS = [
+    'business_id', 'name', 'address', 'city', 'state', 'zip_code', 'phone', 'categories', 'rating',
+    'review_count', 'price', 'latitude', 'longitude', 'url', 'source_city_query', 'source_variant', 'source_sort_by',
+]
+REVIEW_COLUMNS = ['review_id', 'business_id', 'user_id', 'user_name', 'rating', 'text', 'time_created', 'url']
+
+# Errores por stderr: stdout queda para las estadísticas JSON de main()
+LOGGER = logging.getLogger('shiny_stats.fetcher')
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.propagate = False
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+REQUEST_TIMEOUT_SECONDS = 30
+CURSOR_FLUSH_SECONDS = 2.0
+
+
+class FetchError(RuntimeError):
+    """Respuesta no recuperable de la API (o reintentos agotados)."""
+
+
+# --------------------------------------------------------------------------------------
+# LIMITADOR DE TASA (token bucket compartido por todas las tareas)
+# --------------------------------------------------------------------------------------
+class TokenBucket:
+    """Permite `rate` peticiones por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# --------------------------------------------------------------------------------------
+# CONVERSIÓN AL ESQUEMA DE LOS DATASETS
+# --------------------------------------------------------------------------------------
+def business_row(business, query):
+    """Fila de businesses_final.csv a partir de un negocio de /businesses/search."""
+    location = business.get('location') or {}
+    coordinates = business.get('coordinates') or {}
+    return {
+        'business_id': business['id'],
+        'name': business.get('name'),
+        'address': ' '.join(location.get('display_address') or []),
+        'city': location.get('city'),
+        'state': location.get('state'),
+        'zip_code': location.get('zip_code'),
+        'phone': business.get('display_phone'),
+        'categories': ', '.join(category['title'] for category in business.get('categories') or []),
+        'rating': business.get('rating'),
+        'review_count': business.get('review_count'),
+        'price': business.get('price'),
+        'latitude': coordinates.get('latitude'),
+        'longitude': coordinates.get('longitude'),
+        'url': business.get('url'),
+        'source_city_query': query['city'],
+        'source_variant': query['variant'],
+        'source_sort_by': query['sort_by'],
+    }
+
+
+def review_row(review, business_id):
+    """Fila de reviews.csv a partir de una reseña de /businesses/{id}/reviews."""
+    user = review.get('user') or {}
+    return {
+        'review_id': review['id'],
+        'business_id': business_id,
+        'user_id': user.get('id'),
+        'user_name': user.get('name'),
+        'rating': review.get('rating'),
+        'text': review.get('text'),
+        'time_created': review.get('time_created'),
+        'url': review.get('url'),
+    }
+
+
+# --------------------------------------------------------------------------------------
+# CURSOR REANUDABLE Y SALIDA POR ADICIÓN
+# --------------------------------------------------------------------------------------
+def _query_key(query):
+    return f"{query['city']}|{query['variant']}|{query['sort_by']}"
+
+
+class ScrapeCursor:
+    """
+    Páginas ya descargadas, total de cada búsqueda y negocios con reseñas completas.
+    Las filas se agregan a los CSV crudos antes de marcar la página como hecha; si el
+    proceso se corta entre ambos pasos, la página se repite y se deduplica al final.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, CURSOR_FILE)
+        state = {}
+        if os.path.exists(self.path):
+            with open(self.path) as handle:
+                state = json.load(handle)
+        self.totals = state.get('totals', {})
+        self.pages_done = set(state.get('pages_done', []))
+        self.businesses = state.get('businesses', [])
+        self.reviews_done = set(state.get('reviews_done', []))
+        self.known = set(self.businesses)
+        self.saved = time.monotonic()
+        self.files = {}
+
+    def save(self, force=False):
+        if not force and time.monotonic() - self.saved < CURSOR_FLUSH_SECONDS:
+            return
+        for handle in self.files.values():
+            handle.flush()
+        state = {
+            'totals': self.totals,
+            'pages_done': sorted(self.pages_done),
+            'businesses': self.businesses,
+            'reviews_done': sorted(self.reviews_done),
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump(state, handle)
+        os.replace(tmp_path, self.path)
+        self.saved = time.monotonic()
+
+    def append_rows(self, name, columns, rows):
+        if name not in self.files:
+            path = os.path.join(self.output_dir, name)
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            self.files[name] = open(path, 'a', newline='', encoding='utf-8')
+            if new_file:
+                csv.DictWriter(self.files[name], fieldnames=columns).writeheader()
+        csv.DictWriter(self.files[name], fieldnames=columns).writerows(rows)
+
+    def close(self):
+        self.save(force=True)
+        for handle in self.files.values():
+            handle.close()
+        self.files = {}
+
+
+# --------------------------------------------------------------------------------------
+# RECOLECTOR
+# --------------------------------------------------------------------------------------
+class YelpFetcher:
+    def __init__(self, session, api_key, output_dir, api_base=API_BASE, qps=8.0,
+                 concurrency=16, reviews_per_business=REVIEWS_PER_BUSINESS):
+        self.session = session
+        self.headers = {'Authorization': f"Bearer {api_key}", 'Accept': 'application/json'}
+        self.api_base = api_base.rstrip('/')
+        self.bucket = TokenBucket(qps, capacity=max(1, min(qps, concurrency)))
+        self.concurrency = concurrency
+        self.reviews_per_business = reviews_per_business
+        self.cursor = ScrapeCursor(output_dir)
+        self.queue = asyncio.Queue()
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'businesses': 0, 'reviews': 0, 'errors': 0}
+
+    async def get_json(self, path, params):
+        """GET con token bucket y reintentos (429/5xx/errores de red) con backoff exponencial."""
+        import aiohttp
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                async with self.session.get(self.api_base + path, params=params, headers=self.headers) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    if response.status not in RETRY_STATUSES:
+                        raise FetchError(f"{response.status} en {path}: {await response.text()}")
+                    if response.status == 429:
+                        self.stats['throttled'] += 1
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if attempt == MAX_RETRIES:
+                    raise FetchError(f"Error de red en {path}: {error!r}")
+            if attempt == MAX_RETRIES:
+                break
+            self.stats['retries'] += 1
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay = max(float(retry_after or 0), delay * random.uniform(0.5, 1.0))
+            await asyncio.sleep(delay)
+        raise FetchError(f"Reintentos agotados en {path}")
+
+    # --- Tareas (cada una se encola como una tupla) ---
+    async def search_page(self, query, offset):
+        params = dict(parse_qsl(query['variant']))
+        params.update(location=f"{query['city']}, FL", sort_by=query['sort_by'],
+                      limit=min(SEARCH_PAGE_SIZE, SEARCH_MAX_RESULTS - offset), offset=offset)
+        payload = await self.get_json('/businesses/search', params)
+
+        key = _query_key(query)
+        if key not in self.cursor.totals:
+            self.cursor.totals[key] = total = min(payload.get('total', 0), SEARCH_MAX_RESULTS)
+            for next_offset in range(offset + SEARCH_PAGE_SIZE, total, SEARCH_PAGE_SIZE):
+                self.queue.put_nowait(('search', query, next_offset))
+
+        businesses = payload.get('businesses') or []
+        self.cursor.append_rows(RAW_BUSINESSES_FILE, BUSINESS_COLUMNS,
+                                [business_row(business, query) for business in businesses])
+        for business in businesses:
+            if business['id'] not in self.cursor.known:
+                self.cursor.known.add(business['id'])
+                self.cursor.businesses.append(business['id'])
+                self.queue.put_nowait(('reviews', business['id']))
+        self.cursor.pages_done.add(f"{key}|{offset}")
+        self.stats['businesses'] += len(businesses)
+
+    async def business_reviews(self, business_id):
+        payload = await self.get_json(f"/businesses/{business_id}/reviews",
+                                      {'limit': self.reviews_per_business, 'sort_by': 'newest'})
+        reviews = payload.get('reviews') or []
+        self.cursor.append_rows(RAW_REVIEWS_FILE, REVIEW_COLUMNS, [review_row(review, business_id) for review in reviews])
+        self.cursor.reviews_done.add(business_id)
+        self.stats['reviews'] += len(reviews)
+
+    async def worker(self):
+        while True:
+            task = await self.queue.get()
+            try:
+                if task[0] == 'search':
+                    await self.search_page(task[1], task[2])
+                else:
+                    await self.business_reviews(task[1])
+                self.cursor.save()
+            except FetchError as error:
+                # Se registra y se sigue; la tarea queda pendiente para la siguiente ejecución
+                self.stats['errors'] += 1
+                LOGGER.error("Tarea %s fallida: %s", task, error)
+            except Exception:
+                # Respuesta inesperada o error de disco: el worker no muere (si murieran
+                # todos, queue.join() esperaría para siempre); se registra con su traceback
+                self.stats['errors'] += 1
+                LOGGER.exception("Tarea %s fallida por un error inesperado", task)
+            finally:
+                self.queue.task_done()
+
+    def enqueue_pending(self, queries):
+        """Encola lo que falta según el cursor (todo, en la primera ejecución)."""
+        for query in queries:
+            key = _query_key(query)
+            total = self.cursor.totals.get(key)
+            offsets = [0] if total is None else range(0, total, SEARCH_PAGE_SIZE)
+            for offset in offsets:
+                if f"{key}|{offset}" not in self.cursor.pages_done:
+                    self.queue.put_nowait(('search', query, offset))
+        for business_id in self.cursor.businesses:
+            if business_id not in self.cursor.reviews_done:
+                self.queue.put_nowait(('reviews', business_id))
+
+    async def run(self, queries):
+        self.enqueue_pending(queries)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+        try:
+            await self.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.cursor.close()
+        return self.stats
+
+
+def build_queries(cities, variants, sort_by):
+    return [{'city': city, 'variant': variant, 'sort_by': order}
+            for city in cities for variant in variants for order in sort_by]
+
+
+async def fetch_all(queries, output_dir, api_key, api_base=API_BASE, qps=8.0, concurrency=16,
+                    reviews_per_business=REVIEWS_PER_BUSINESS):
+    """Ejecuta la recolección con una sola sesión HTTP (pool de conexiones persistentes)."""
+    try:
+        import aiohttp
+    except ImportError:
+        raise SystemExit("El recolector requiere aiohttp: pip install aiohttp")
+
+    os.makedirs(output_dir, exist_ok=True)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        fetcher = YelpFetcher(session, api_key, output_dir, api_base, qps, concurrency, reviews_per_business)
+        return await fetcher.run(queries)
+
+
+def finalize_outputs(output_dir):
+    """Escribe los CSV finales sin duplicados (primera aparición de cada negocio y reseña)."""
+    paths = {}
+    for raw_file, output_file, key, columns in (
+        (RAW_BUSINESSES_FILE, BUSINESSES_OUTPUT_FILE, 'business_id', BUSINESS_COLUMNS),
+        (RAW_REVIEWS_FILE, REVIEWS_OUTPUT_FILE, 'review_id', REVIEW_COLUMNS),
+    ):
+        raw_path = os.path.join(output_dir, raw_file)
+        df = pd.read_csv(raw_path, dtype={key: str}) if os.path.exists(raw_path) else pd.DataFrame(columns=columns)
+        paths[output_file] = os.path.join(output_dir, output_file)
+        df.drop_duplicates(key, keep='first').to_csv(paths[output_file], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recolecta negocios y reseñas de Yelp (asíncrono y reanudable).")
+    parser.add_argument('--output-dir', default=os.path.join(SCRAPE_DIR, time.strftime('%Y-%m-%d')))
+    parser.add_argument('--api-base', default=API_BASE)
+    parser.add_argument('--api-key', default=os.environ.get(API_KEY_ENV_VAR))
+    parser.add_argument('--cities', nargs='+', default=list(FLORIDA_CITIES))
+    parser.add_argument('--variant', nargs='+', default=SEARCH_VARIANTS, help="Parámetros extra de búsqueda (p. ej. 'term=car detailing').")
+    parser.add_argument('--sort-by', nargs='+', default=SORT_BY_OPTIONS)
+    parser.add_argument('--qps', type=float, default=8.0, help="Peticiones por segundo (token bucket).")
+    parser.add_argument('--concurrency', type=int, default=16, help="Peticiones simultáneas (tamaño del pool).")
+    parser.add_argument('--reviews-per-business', type=int, default=REVIEWS_PER_BUSINESS)
+    parser.add_argument('--ingest', action='store_true', help="Agrega el resultado al almacén de ingesta.")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error(f"Indica --api-key o la variable de entorno {API_KEY_ENV_VAR}.")
+
+    started = time.perf_counter()
+    queries = build_queries(args.cities, args.variant, args.sort_by)
+    try:
+        stats = asyncio.run(fetch_all(queries, args.output_dir, args.api_key, args.api_base, args.qps,
+                                      args.concurrency, args.reviews_per_business))
+    except KeyboardInterrupt:
+        raise SystemExit(f"Interrumpido; el avance quedó en {os.path.join(args.output_dir, CURSOR_FILE)}")
+    elapsed = time.perf_counter() - started
+    paths = finalize_outputs(args.output_dir)
+    print(json.dumps(stats))
+    print(f"{stats['requests']} peticiones en {elapsed:.1f} s ({stats['requests'] / max(elapsed, 1e-9):.1f}/s); "
+          f"resultado en {args.output_dir}")
+
+    if args.ingest:
+        from Utils.Data.IngestionStore import ingest_batch
+        from Utils.Data.SentimentScoring import label_reviews_file
+        # El almacén solo acepta reseñas con sentimiento (cuentan en los conteos por negocio)
+        labeled_path, _, _ = label_reviews_file(paths[REVIEWS_OUTPUT_FILE])
+        entry = ingest_batch(pd.read_csv(paths[BUSINESSES_OUTPUT_FILE], dtype={'business_id': str}),
+                             pd.read_csv(labeled_path, dtype={'review_id': str, 'business_id': str}),
+                             source={'scrape': args.output_dir})
+        print("El lote ya estaba ingerido." if entry is None else
+              f"Ingerido como lote {entry['batch']}: {entry.get('new_reviews', 0)} reseñas nuevas.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+
+import streamlit as st
+import pandas as pd
+
+from Utils.Data.CompactTables import footprint_summary
+
+# --------------------------------------------------------------------------------------
+# PANEL DE DEPURACIÓN (solo visible con la instrumentación activa, p. ej. SHINY_STATS_PROFILE=1)
+# --------------------------------------------------------------------------------------
+def stage_table(report):
+    """Tabla de etapas del rerun con sangría por nivel y porcentaje del total."""
+    stages = pd.DataFrame(report['stages'])
+    if stages.empty:
+        return stages
+    stages['Etapa'] = [' ' * depth + ('↳ ' if depth else '') + name
+                       for name, depth in zip(stages['stage'], stages['depth'])]
+    stages['% del rerun'] = (stages['wall_ms'] / report['total_ms'] * 100).round(1)
+    columns = {'Etapa': 'Etapa', 'wall_ms': 'Tiempo (ms)', 'cpu_ms': 'CPU (ms)', '% del rerun': '% del rerun'}
+    if 'peak_mb' in stages.columns:
+        columns.update(alloc_mb='Asignado (MB)', peak_mb='Pico (MB)')
+    return stages[list(columns)].rename(columns=columns)
+
+
+def memory_table(tables):
+    """Filas, MB y bytes por fila de cada tabla cacheada ({nombre: DataFrame o None})."""
+    rows = [{'Tabla': name, **footprint_summary(df)} for name, df in tables.items() if df is not None]
+    columns = {'Tabla': 'Tabla', 'rows': 'Filas', 'mb': 'Memoria (MB)', 'bytes_per_row': 'Bytes por fila'}
+    return pd.DataFrame(rows, columns=list(columns)).rename(columns=columns)
+
+
+def show_debug_panel(report, tables=None):
+    """
+    Muestra en la barra lateral el desglose del último rerun, el historial de la sesión y,
+    con `tables`, la memoria de las tablas cacheadas por proceso.
+    """
+    if report is None:
+        return
+
+    with st.sidebar.expander("🛠️ Instrumentación del rerun", expanded=True):
+        col_total, col_cpu = st.columns(2)
+        col_total.metric("Rerun", f"{report['total_ms']:,.0f} ms")
+        col_cpu.metric("CPU", f"{report['cpu_ms']:,.0f} ms")
+
+        table = stage_table(report)
+        if table.empty:
+            st.caption("No se registraron etapas.")
+        else:
+            st.dataframe(table, hide_index=True, width="stretch")
+            measured = sum(stage['wall_ms'] for stage in report['stages'] if stage['depth'] == 0)
+            st.caption(f"Sin medir (Streamlit y código fuera de etapas): "
+                       f"{max(report['total_ms'] - measured, 0):,.0f} ms")
+
+        history = st.session_state.get('_instrumentation_history', [])
+        if len(history) > 1:
+            st.markdown("**Últimos reruns (ms)**")
+            st.bar_chart(pd.Series([item['total_ms'] for item in history], name='Rerun (ms)'))
+
+        if tables:
+            st.markdown("**Memoria de tablas (compartidas por todas las sesiones)**")
+            st.dataframe(memory_table(tables), hide_index=True, width="stretch")
+
+        profile_path = report.get('profile_path')
+        if profile_path and os.path.exists(profile_path):
+            with open(profile_path, 'rb') as handle:
+                st.download_button(
+                    label="Descargar perfil del rerun",
+                    data=handle.read(),
+                    file_name=os.path.basename(profile_path),
+                    mime='text/html' if profile_path.endswith('.html') else 'application/octet-stream',
+                    on_click="ignore",
+                )
@@ -1,19 +1,56 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pydeck as pdk
+
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data.Queries import map_cells
+from Utils.Data.SpatialAggregation import share_to_color
+
+# --- Variables Globales ---
+MAP_MODES = {
+    "Negocios (puntos)": 'points',
+    "Hexágonos (agregado)": 'hexbin',
+    "Mapa de calor (reseñas negativas)": 'heatmap',
+}
+
+# Columnas que se envían al navegador en el modo de puntos (posición, color y tooltip)
+POINT_LAYER_COLUMNS = ['longitude', 'latitude', 'color', 'name', 'rating', 'sentiment', 'review_count']
 
 # --------------------------------------------------------------------------------------
 # FUNCIÓN DE VISUALIZACIÓN DEL MAPA
 # --------------------------------------------------------------------------------------
-def show_emotion_map_dashboard(df_filtered):
+def show_emotion_map_dashboard(df_filtered, backend=None):
    
     st.header("🗺️ Mapa de Sentimiento de Reseñas en Florida") # <-- CAMBIADO DE st.title a st.header
 
     st.info(f"Mostrando {len(df_filtered)} negocios de detailing en el mapa según los filtros seleccionados.")
 
+    # --- Modo de visualización ---
+    # Los modos agregados binnean en el servidor y solo envían las celdas al navegador
+    map_mode = MAP_MODES[st.radio(
+        "Modo de visualización:",
+        options=list(MAP_MODES),
+        horizontal=True,
+        key="map_mode_selector"
+    )]
+
     # --- Renderizar el Mapa ---
-    render_map_viz(df_filtered)
+    if map_mode == 'points':
+        render_map_viz(df_filtered)
+    else:
+        cell_km = st.slider(
+            "Tamaño del hexágono (km):",
+            min_value=5,
+            max_value=50,
+            value=15,
+            step=5,
+            key="hex_cell_km"
+        )
+        with stage("Agregación hexagonal"), st.spinner("Agregando el mapa..."):
+            cells = map_cells(df_filtered, map_mode, cell_km, backend)
+        if map_mode == 'hexbin':
+            render_hexbin_viz(cells, cell_km)
+        else:
+            render_heatmap_viz(cells)
+        return
 
     # --- Leyenda del Mapa ---
     st.markdown("""
@@ -27,25 +64,33 @@ def show_emotion_map_dashboard(df_filtered):
     </div>
     """, unsafe_allow_html=True)
 
+# pydeck se importa al dibujar el mapa y no al cargar el módulo (arranque en frío más rápido)
+def _florida_view_state(pitch=40):
+    import pydeck as pdk
+    # Vista inicial del mapa (centrado en Florida)
+    return pdk.ViewState(
+        latitude=28.5,
+        longitude=-81.5,
+        zoom=6,
+        pitch=pitch,
+    )
+
 # --------------------------------------------------------------------------------------
 # FUNCIÓN DE CREACIÓN DEL MAPA
 # --------------------------------------------------------------------------------------
 def render_map_viz(df):
 
     # 1. Definir la vista inicial del mapa (centrado en Florida)
-    view_state = pdk.ViewState(
-        latitude=28.5,
-        longitude=-81.5,
-        zoom=6,
-        pitch=40,
-    )
+    import pydeck as pdk
+    view_state = _florida_view_state()
 
     # 2. Definir la capa de Scatterplot
     # Usa la columna 'color' que creamos en el dataframe
     # Usa el conteo de reseñas para el radio del punto
+    # Solo se envían las columnas que usan la capa y el tooltip (no URLs ni texto largo)
     scatter_layer = pdk.Layer(
         "ScatterplotLayer",
-        df,
+        df[[col for col in POINT_LAYER_COLUMNS if col in df.columns]],
         get_position=["longitude", "latitude"],
         auto_highlight=True,
         get_fill_color="color",  # Usa la columna 'color' (RGB) para el color de relleno
@@ -67,4 +112,67 @@ def render_map_viz(df):
         }
     )
 
-    st.pydeck_chart(r)
+    with stage("Serialización pydeck"):
+        st.pydeck_chart(r)
+
+# --------------------------------------------------------------------------------------
+# MAPAS AGREGADOS (hexágonos y mapa de calor)
+# --------------------------------------------------------------------------------------
+def render_hexbin_viz(cells, cell_km=15):
+    """Columnas hexagonales: altura = negocios por celda, color = % de negocios negativos."""
+    cells = cells.assign(
+        color=share_to_color(cells['negative_share']),
+        negative_pct=(cells['negative_share'] * 100).round(1),
+    )
+
+    import pydeck as pdk
+    hex_layer = pdk.Layer(
+        "ColumnLayer",
+        cells[['longitude', 'latitude', 'color', 'businesses', 'reviews', 'mean_rating', 'negative_pct']],
+        get_position=["longitude", "latitude"],
+        get_elevation="businesses",
+        elevation_scale=800,
+        disk_resolution=6, # Columna de 6 lados = hexágono
+        radius=cell_km * 1000 * 0.9, # Radio en metros (con un margen entre celdas)
+        get_fill_color="color",
+        extruded=True,
+        auto_highlight=True,
+        pickable=True,
+    )
+
+    r = pdk.Deck(
+        layers=[hex_layer],
+        initial_view_state=_florida_view_state(pitch=45),
+        tooltip={
+            "html": "<b>Negocios:</b> {businesses}<br><b>Rating promedio:</b> {mean_rating}<br><b>Negativos:</b> {negative_pct}%<br><b>Reseñas:</b> {reviews}",
+            "style": {"backgroundColor": "steelblue", "color": "white"}
+        }
+    )
+
+    with stage("Serialización pydeck"):
+        st.pydeck_chart(r)
+
+def render_heatmap_viz(cells):
+    """Mapa de calor de reseñas negativas (peso = reseñas negativas agregadas por celda)."""
+    cells = cells[cells['weight'] > 0]
+    if cells.empty:
+        st.warning("No hay reseñas negativas para los negocios filtrados.")
+        return
+
+    import pydeck as pdk
+    heatmap_layer = pdk.Layer(
+        "HeatmapLayer",
+        cells[['longitude', 'latitude', 'weight']],
+        get_position=["longitude", "latitude"],
+        get_weight="weight",
+        aggregation="SUM",
+        radius_pixels=60,
+    )
+
+    r = pdk.Deck(
+        layers=[heatmap_layer],
+        initial_view_state=_florida_view_state(pitch=0),
+    )
+
+    with stage("Serialización pydeck"):
+        st.pydeck_chart(r)
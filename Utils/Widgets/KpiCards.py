@@ -0,0 +1,65 @@
+import streamlit as st
+
+from Utils.Data.Queries import business_kpis
+
+# --- Variables Globales ---
+SENTIMENT_ICONS = {
+    'Positivo': '🟢',
+    'Neutral': '🟡',
+    'Negativo': '🔴',
+}
+
+CITY_COLUMNS = {
+    'businesses': 'Negocios',
+    'mean_rating': 'Rating promedio',
+    'yelp_reviews': 'Reseñas en Yelp',
+    'analyzed_reviews': 'Reseñas analizadas',
+}
+
+# --------------------------------------------------------------------------------------
+# DATOS DE LOS KPIs (cubo de agregados: se suman celdas, no se recorren los negocios)
+# --------------------------------------------------------------------------------------
+def load_business_kpis(df_businesses, filters, business_signature=None, backend=None):
+    """KPIs de los negocios que cumplen los filtros de la barra lateral (None si faltan las reseñas)."""
+    try:
+        with st.spinner("Preparando el cubo de KPIs..."):
+            return business_kpis(df_businesses, filters, business_signature, backend)
+    except FileNotFoundError:
+        st.error("Error: El archivo 'reviews_final_with_sentiment.csv' no se encontró. Asegúrate de que esté en la carpeta 'Datasets'.")
+        return None
+
+# --------------------------------------------------------------------------------------
+# TARJETAS DE KPIs
+# --------------------------------------------------------------------------------------
+def show_kpi_cards(summary):
+    """Tarjetas con negocios, rating promedio, reseñas y mezcla de sentimiento, más el desglose por ciudad."""
+    if summary is None:
+        return
+
+    col_businesses, col_rating, col_reviews, col_negative = st.columns(4)
+    col_businesses.metric("Negocios", f"{summary['businesses']:,}")
+    mean_rating = summary['mean_rating']
+    col_rating.metric(
+        "Rating promedio",
+        "—" if mean_rating is None else f"{mean_rating:.2f} ⭐",
+        help="Promedio de los negocios con rating (sin contar los que aún no tienen reseñas)."
+    )
+    col_reviews.metric("Reseñas en Yelp", f"{summary['yelp_reviews']:,}")
+    col_negative.metric(
+        "Reseñas negativas",
+        f"{summary['sentiment_mix']['Negativo']:.1%}",
+        help="Proporción de las reseñas analizadas con sentimiento Negativo."
+    )
+
+    mix = " · ".join(f"{SENTIMENT_ICONS[sentiment]} {sentiment} {share:.0%}"
+                     for sentiment, share in summary['sentiment_mix'].items())
+    st.caption(f"Mezcla de sentimiento de las {summary['analyzed_reviews']:,} reseñas analizadas: {mix}")
+
+    with st.expander("Reseñas por ciudad"):
+        by_city = summary['by_city'].rename(columns=CITY_COLUMNS).rename_axis('Ciudad').reset_index()
+        st.dataframe(
+            by_city,
+            hide_index=True,
+            width="stretch",
+            column_config={'Rating promedio': st.column_config.NumberColumn(format="%.2f")}
+        )
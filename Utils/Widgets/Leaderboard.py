@@ -1,59 +1,77 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 
-def calculate_ranking_score(df, sentiment_weight=0.5):
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data.ComplaintEngine import get_complaints
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, get_reviews_ngram_index
+from Utils.Data.Queries import ranked_businesses
+from Utils.Data.Ranking import build_score_components
+
+# Lugares por página en la tabla del ranking completo (del 4º en adelante)
+RANKING_PAGE_SIZE = 50
+NO_COMPLAINTS = "Sin quejas registradas"
+
+def load_competitor_complaints(df_reviews=None, backend=None, workers=1):
     """
-    Calcula un score de ranking combinando el rating de estrellas y el sentimiento.
+    Quejas principales por negocio (Serie business_id -> texto), precalculadas por
+    ComplaintEngine una vez por versión de las reseñas; None si no hay reseñas.
+    Desde el dashboard se calculan en el mismo proceso (`workers`=1).
     """
-    
-    # 1. Mapeo de Sentimiento a Score Numérico (0 a 1)
-    sentiment_to_score = {
-        'Positivo': 1.0,
-        'Neutral': 0.5,
-        'Negativo': 0.0,
-    }
-    df['sentiment_score'] = df['sentiment'].map(sentiment_to_score)
-    
-    # 2. Normalización del Rating (de 1.0-5.0 a 0-1)
-    MIN_RATING = 1.0
-    MAX_RATING = 5.0
-    df['rating_norm'] = (df['rating'] - MIN_RATING) / (MAX_RATING - MIN_RATING)
-    
-    # 3. Cálculo del Score Combinado (Promedio Ponderado 50/50)
-    df['combined_score'] = (
-        (df['rating_norm'] * (1 - sentiment_weight)) + 
-        (df['sentiment_score'] * sentiment_weight)
-    )
-    
-    # Formatear el score a porcentaje para mejor visualización
-    df['ranking_score'] = (df['combined_score'] * 100).round(1)
-    
-    return df
+    if backend is not None:
+        return get_complaints(backend=backend, workers=workers)['by_business']
+    if df_reviews is None or df_reviews.empty:
+        return None
+    ngram_index = get_reviews_ngram_index(df_reviews['text'], ENGLISH_STOPWORDS)
+    return get_complaints(df_reviews, ngram_index, workers=workers)['by_business']
 
-def show_leaderboard(df_data):
-    """Muestra el leaderboard de las mejores compañías de detailing con formato de podio."""
+def _complaints_for(rows, complaints):
+    """Texto de quejas de cada fila (por business_id)."""
+    return rows['business_id'].astype(object).map(complaints).fillna(NO_COMPLAINTS)
+
+def show_leaderboard(df_data, score_components=None, backend=None, filters=None, complaints=None):
+    """
+    Muestra el leaderboard de las mejores compañías de detailing con formato de podio.
+    `score_components` (Ranking.get_score_components sobre el dataset completo) evita
+    recalcular las columnas normalizadas; en ese caso el índice de `df_data` debe ser
+    la posición de cada negocio en el dataset completo (como lo devuelve la barra lateral).
+    Con `backend` y `filters` (Sidebar.selected_filters) el ranking se ordena y pagina en SQL.
+    `complaints` (load_competitor_complaints) agrega las quejas principales de cada negocio.
+    """
+
+    # 1. Componentes del score (precalculados) y posiciones de los negocios filtrados
+    if score_components is None:
+        score_components = build_score_components(df_data)
+        positions = np.arange(len(df_data))
+        df_data = df_data.set_axis(positions)
+    else:
+        positions = df_data.index.to_numpy()
 
-    # 1. Calcular el score
-    df_ranked = calculate_ranking_score(df_data.copy(), sentiment_weight=0.5) 
-    
-    # 2. Ordenar por ranking_score (principal) y review_count (desempate)
-    # El desempate se aplica cuando los 'ranking_score' son iguales.
-    df_ranked = df_ranked.sort_values(
-        by=['ranking_score', 'review_count'], # Ordenar por Score, luego por conteo de reseñas
-        ascending=[False, False] # Ambos deben ser descendentes (mayor es mejor)
-    ).reset_index(drop=True)
-    df_ranked['Rank'] = df_ranked.index + 1
-    
     st.subheader("🏆 Leaderboard de Desempeño Combinado")
-    st.markdown("""
-    Este ranking combina el **Rating de Estrellas** (desempeño histórico) y el **Score de Emoción** (desempeño reciente), ponderados al 50/50. 
+
+    # El peso del sentimiento es un parámetro en vivo: solo cambia la suma ponderada
+    sentiment_weight = st.slider(
+        "Peso del Score de Emoción en el ranking:",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.5,
+        step=0.05,
+        key="leaderboard_sentiment_weight",
+        help="0 = solo Rating de Estrellas, 1 = solo Score de Emoción."
+    )
+    rating_pct = round((1 - sentiment_weight) * 100)
+    sentiment_pct = round(sentiment_weight * 100)
+
+    st.markdown(f"""
+    Este ranking combina el **Rating de Estrellas** (desempeño histórico) y el **Score de Emoción** (desempeño reciente), ponderados al {rating_pct}/{sentiment_pct}. 
     
     **Criterio de Desempate:** Para negocios con el mismo **Score Combinado**, se utiliza el **Total de Reseñas** para determinar la posición más alta, premiando la popularidad y el volumen de datos.
     """)
     
-    # 3. Separar Top 3 y el resto
-    df_top3 = df_ranked.head(3)
-    df_rest = df_ranked.iloc[3:]
+    # 2. Top 3 por selección parcial (sin ordenar todo el ranking)
+    # El desempate se aplica cuando los 'ranking_score' son iguales (Total de Reseñas).
+    with stage("Ranking (podio)"):
+        df_top3 = ranked_businesses(df_data, score_components, positions, sentiment_weight,
+                                    limit=3, offset=0, backend=backend, filters=filters)
 
     # 4. Mostrar el Podio (Top 3)
     if not df_top3.empty:
@@ -85,6 +103,10 @@ def show_leaderboard(df_data):
                 rating = item['rating']
                 sentiment = item['sentiment']
                 review_count = item['review_count']
+                complaints_html = ""
+                if complaints is not None:
+                    complaints_html = (f'<p style="color: white; margin: 0; font-size: 0.8rem;">'
+                                       f'Quejas: {_complaints_for(df_podium.iloc[[idx]], complaints).iloc[0]}</p>')
                 
                 # Diseño de la tarjeta con HTML/CSS para el podio
                 col.markdown(f"""
@@ -105,6 +127,7 @@ def show_leaderboard(df_data):
                     <p style="color: white; font-size: 1.2rem; font-weight: bold;">Score: {score}%</p>
                     <p style="color: white; margin: 0;">Rating: {rating} ⭐ | Emoción: {sentiment}</p>
                     <p style="color: white; margin: 0; font-size: 0.9rem;">Total Reseñas: {review_count}</p>
+                    {complaints_html}
                 </div>
                 """, unsafe_allow_html=True)
             else:
@@ -131,7 +154,7 @@ def show_leaderboard(df_data):
         render_podium_item(
             col=col2, 
             rank=2, 
-            df_podium=df_ranked, 
+            df_podium=df_top3, 
             title="2º PLATA", 
             color_hex="#78706E", # Gris oscuro/Plata
             emoji="🥈", 
@@ -142,7 +165,7 @@ def show_leaderboard(df_data):
         render_podium_item(
             col=col1, 
             rank=1, 
-            df_podium=df_ranked, 
+            df_podium=df_top3, 
             title="1º ORO", 
             color_hex=" #B59410", # Dorado
             emoji="🥇", 
@@ -153,7 +176,7 @@ def show_leaderboard(df_data):
         render_podium_item(
             col=col3, 
             rank=3, 
-            df_podium=df_ranked, 
+            df_podium=df_top3, 
             title="3º BRONCE", 
             color_hex="#804A00", # Bronce/Marrón
             emoji="🥉", 
@@ -165,16 +188,39 @@ def show_leaderboard(df_data):
 
     st.markdown("---")
     
-    # 5. Mostrar el resto del ranking (del 4º lugar en adelante)
-    if not df_rest.empty:
+    # 5. Mostrar el resto del ranking (del 4º lugar en adelante), paginado
+    total_rest = max(len(positions) - 3, 0)
+    if total_rest > 0:
         st.subheader("Ranking Completo (Top 4 en adelante)")
+
+        n_pages = -(-total_rest // RANKING_PAGE_SIZE)
+        # Si los filtros reducen el ranking, la página guardada puede quedar fuera de rango
+        if 'leaderboard_page' not in st.session_state:
+            st.session_state['leaderboard_page'] = 1
+        elif st.session_state['leaderboard_page'] > n_pages:
+            st.session_state['leaderboard_page'] = n_pages
+        page = st.number_input(
+            f"Página (de {n_pages}):",
+            min_value=1,
+            max_value=n_pages,
+            step=1,
+            key="leaderboard_page"
+        )
+
+        # Solo se ordenan los lugares hasta la página solicitada
+        with stage("Ranking (página)"):
+            df_rest = ranked_businesses(df_data, score_components, positions, sentiment_weight,
+                                        limit=RANKING_PAGE_SIZE, offset=3 + (int(page) - 1) * RANKING_PAGE_SIZE,
+                                        backend=backend, filters=filters)
         
         df_display_rest = df_rest[['Rank', 'name', 'rating', 'sentiment', 'review_count', 'ranking_score']]
         df_display_rest.columns = ['Rank', 'Compañía', 'Rating (Estrellas)', 'Emoción Reciente', 'Total Reseñas', 'Score Combinado (%)']
+        if complaints is not None:
+            df_display_rest = df_display_rest.assign(**{'Principales Quejas': _complaints_for(df_rest, complaints)})
         
         st.dataframe(
             df_display_rest,
             height=300,
-            use_container_width=True,
+            width="stretch",
             hide_index=True,
         )
@@ -0,0 +1,128 @@
+import time
+
+import streamlit as st
+import pandas as pd
+
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data.DataLoader import SENTIMENT_CATEGORIES
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, get_reviews_ngram_index
+from Utils.Data.Queries import location_mask
+from Utils.Data.SearchIndex import get_search_index, search_reviews
+from Utils.Widgets.WordMap import REVIEW_SEARCH_KEY
+
+# --- Variables Globales ---
+# Reseñas listadas por búsqueda (el conteo por sentimiento y por negocio usa todas)
+SEARCH_RESULT_ROWS = 200
+SEARCH_TOP_BUSINESSES = 10
+
+REVIEW_LIST_COLUMNS = ['time_created', 'name', 'rating', 'sentiment', 'text']
+
+# --------------------------------------------------------------------------------------
+# RESULTADOS
+# --------------------------------------------------------------------------------------
+def business_breakdown(matches, df_businesses):
+    """Coincidencias por negocio y sentimiento, con nombre y ciudad del negocio."""
+    # business_id puede ser categoría (tabla compacta): se agrupa por valor, no por categoría
+    counts = pd.crosstab(matches['business_id'].astype(object), matches['sentiment'], dropna=False)
+    counts = counts.reindex(columns=SENTIMENT_CATEGORIES, fill_value=0)
+    counts.insert(0, 'Coincidencias', counts.sum(axis=1))
+    counts = counts[counts['Coincidencias'] > 0].sort_values('Coincidencias', ascending=False)
+
+    info = df_businesses[['business_id', 'name', 'city']].drop_duplicates('business_id').set_index('business_id')
+    table = info.join(counts, how='right').rename(columns={'name': 'Negocio', 'city': 'Ciudad'})
+    # Reseñas de negocios que no están en el dataset de negocios: se muestra su id
+    table['Negocio'] = table['Negocio'].fillna(pd.Series(table.index, index=table.index))
+    return table
+
+
+def show_search_results(matches, by_business, selected_sentiment):
+    """Lista de reseñas encontradas, con desglose por negocio."""
+    st.subheader("🏢 Negocios con más menciones")
+    top = by_business.head(SEARCH_TOP_BUSINESSES)
+    st.dataframe(top, hide_index=True, width="stretch")
+
+    business_ids = top.index.tolist()
+    selected_business = st.selectbox(
+        "Ver reseñas de:",
+        options=["Todos"] + business_ids,
+        format_func=lambda business_id: business_id if business_id == "Todos" else by_business.at[business_id, 'Negocio'],
+        key="review_search_business"
+    )
+
+    reviews = matches
+    if selected_sentiment != "Todas":
+        reviews = reviews[reviews['sentiment'] == selected_sentiment]
+    if selected_business != "Todos":
+        reviews = reviews[reviews['business_id'] == selected_business]
+
+    st.subheader(f"💬 Reseñas ({len(reviews):,})")
+    if len(reviews) > SEARCH_RESULT_ROWS:
+        st.caption(f"Se muestran las {SEARCH_RESULT_ROWS} reseñas con más menciones.")
+    reviews = reviews.head(SEARCH_RESULT_ROWS).join(by_business['Negocio'].rename('name'), on='business_id')
+    st.dataframe(
+        reviews[[col for col in REVIEW_LIST_COLUMNS if col in reviews.columns]],
+        hide_index=True,
+        width="stretch"
+    )
+
+# --------------------------------------------------------------------------------------
+# DASHBOARD DE BÚSQUEDA
+# --------------------------------------------------------------------------------------
+def show_review_search(df_reviews, df_businesses, business_ids=None):
+    """
+    Busca una palabra o frase en las reseñas (índice invertido de n-gramas, mismo
+    tokenizador y stopwords que el Word Map). `business_ids` limita la búsqueda al
+    filtro de ubicación. Con el backend analítico `df_reviews` es None y la búsqueda
+    no está disponible (requiere el texto de las reseñas en memoria).
+    """
+    st.header("🔎 Búsqueda en Reseñas")
+    if df_reviews is None:
+        st.info("La búsqueda de reseñas usa el índice en memoria y no está disponible con el backend analítico (SHINY_STATS_BACKEND).")
+        return
+    if df_reviews.empty:
+        st.warning("No se puede buscar: el DataFrame de reseñas está vacío.")
+        return
+
+    col_query, col_sentiment = st.columns([3, 1])
+    with col_query:
+        query = st.text_input(
+            "Buscar palabra o frase:",
+            key=REVIEW_SEARCH_KEY,
+            placeholder="p. ej. water spots",
+            help="También puedes elegir un término debajo del Word Map."
+        )
+    with col_sentiment:
+        selected_sentiment = st.selectbox(
+            "Emoción:",
+            options=["Todas"] + SENTIMENT_CATEGORIES,
+            key="review_search_sentiment"
+        )
+
+    if not query.strip():
+        st.caption("Escribe una palabra o frase, o elige un término del Word Map, para ver las reseñas que la mencionan.")
+        return
+
+    with stage("Índice de búsqueda"), st.spinner("Indexando búsqueda de reseñas..."):
+        ngram_index = get_reviews_ngram_index(df_reviews['text'], ENGLISH_STOPWORDS)
+        search_index = get_search_index(ngram_index)
+    doc_mask = None if business_ids is None else location_mask(df_reviews, business_ids)
+
+    with stage("Búsqueda de reseñas"):
+        start = time.perf_counter()
+        positions, _ = search_reviews(search_index, query, ENGLISH_STOPWORDS, doc_mask=doc_mask)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if not len(positions):
+        st.info(f"Ninguna reseña menciona '{query}' (las stopwords del Word Map se ignoran en la búsqueda).")
+        return
+
+    # --- Conteo por sentimiento (todas las coincidencias) ---
+    matches = df_reviews.take(positions)
+    sentiment_counts = matches['sentiment'].value_counts()
+    metric_cols = st.columns(len(SENTIMENT_CATEGORIES) + 1)
+    metric_cols[0].metric("Reseñas", f"{len(matches):,}")
+    for col, sentiment in zip(metric_cols[1:], SENTIMENT_CATEGORIES):
+        col.metric(sentiment, f"{int(sentiment_counts.get(sentiment, 0)):,}")
+    st.caption(f"{len(matches):,} reseñas encontradas en {elapsed_ms:.1f} ms.")
+
+    show_search_results(matches, business_breakdown(matches, df_businesses), selected_sentiment)
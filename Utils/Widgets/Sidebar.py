@@ -1,19 +1,19 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pydeck as pdk  
+
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data.Export import EXPORT_FORMATS, export_bytes, lazy_export
+from Utils.Data.FilterEngine import get_filter_index, sentiment_colors
+from Utils.Data.Queries import business_filters, city_centers, filter_business_positions, location_positions
+
+# Opción del filtro de ubicación que desactiva el radio
+ALL_LOCATIONS = "Todo Florida"
+DEFAULT_RADIUS_KM = 25
 
 # Helper function to convert DataFrame to CSV for download
 # La columna 'color' es para visualización y se elimina para una descarga limpia.
 def convert_df_to_csv(df):
-    if 'color' in df.columns:
-        # Se elimina la columna de color para el archivo de descarga
-        df_download = df.drop(columns=['color']) 
-    else:
-        df_download = df.copy()
-    
     # Convierte el DataFrame a una cadena CSV codificada en UTF-8
-    return df_download.to_csv(index=False).encode('utf-8')
+    return export_bytes(df, 'csv')
 
 # Inicializador de estado de la sesión (se sigue usando para que los toggles mantengan su estado)
 def _initialize_sentiment_state():
@@ -26,8 +26,54 @@ def _initialize_sentiment_state():
         st.session_state['selected_negativo'] = True
 
 
-def create_sidebar_filter(df_data):
-    """Crea la barra lateral con opciones de filtrado y el botón de descarga."""
+def _selected_sentiments():
+    """Sentimientos activos en los toggles de la barra lateral."""
+    selected_sentiments = []
+    if st.session_state['selected_positivo']:
+        selected_sentiments.append('Positivo')
+    if st.session_state['selected_negativo']:
+        selected_sentiments.append('Negativo')
+    if st.session_state['selected_neutral']:
+        selected_sentiments.append('Neutral')
+    return selected_sentiments
+
+
+def selected_location(df_data, data_signature=None):
+    """
+    Ubicación elegida en la barra lateral: (llave, posiciones) con las posiciones de los
+    negocios dentro del radio de la ciudad, o (None, None) si no hay filtro de ubicación.
+    La consulta usa el índice espacial (rejilla), sin recorrer toda la tabla.
+    """
+    city = st.session_state.get('location_city', ALL_LOCATIONS)
+    if city == ALL_LOCATIONS:
+        return None, None
+    radius_km = st.session_state.get('location_radius_km', DEFAULT_RADIUS_KM)
+    positions = location_positions(df_data, city, radius_km, data_signature)
+    if positions is None:
+        return None, None
+    return (city, radius_km), positions
+
+
+def selected_filters(df_data, data_signature=None):
+    """
+    Filtros vigentes de la barra lateral como diccionario (sentimientos, rango de rating
+    y posiciones de la ubicación), para que otros widgets los resuelvan en el backend analítico.
+    """
+    _initialize_sentiment_state()
+    return business_filters(
+        _selected_sentiments(),
+        st.session_state.get('rating_min', 0.0),
+        st.session_state.get('rating_max', 5.0),
+        selected_location(df_data, data_signature)[1],
+    )
+
+
+def create_sidebar_filter(df_data, data_signature=None, backend=None):
+    """
+    Crea la barra lateral con opciones de filtrado y el botón de descarga.
+    `data_signature` (firma del dataset) permite reutilizar el índice de filtrado entre reruns.
+    Con `backend` (AnalyticsBackend) el filtro se resuelve con una consulta a la base.
+    """
     
     _initialize_sentiment_state()
     
@@ -65,13 +111,7 @@ def create_sidebar_filter(df_data):
     )
 
     # --- Recolectar las emociones seleccionadas para el filtrado ---
-    selected_sentiments = []
-    if st.session_state['selected_positivo']:
-        selected_sentiments.append('Positivo')
-    if st.session_state['selected_negativo']:
-        selected_sentiments.append('Negativo')
-    if st.session_state['selected_neutral']:
-        selected_sentiments.append('Neutral')
+    selected_sentiments = _selected_sentiments()
 
     if not selected_sentiments:
          st.sidebar.warning("Ninguna emoción seleccionada. El mapa estará vacío.")
@@ -82,7 +122,8 @@ def create_sidebar_filter(df_data):
         min_value=0.0,
         max_value=5.0,
         value=0.0,
-        step=0.5
+        step=0.5,
+        key="rating_min"
     )
 
     # Filtro 2: Calificación de Estrellas
@@ -91,28 +132,62 @@ def create_sidebar_filter(df_data):
         min_value=1.0,
         max_value=5.0,
         value=5.0,
-        step=0.5
+        step=0.5,
+        key="rating_max"
     )
 
+    # Filtro 3: Ubicación (ciudad + radio de búsqueda)
+    city_options = [ALL_LOCATIONS] + sorted(city_centers(df_data, data_signature))
+    selected_city = st.sidebar.selectbox(
+        "Ubicación 📍:",
+        options=city_options,
+        key="location_city",
+        help="Limita el mapa, el Word Map y el leaderboard a los negocios cercanos a una ciudad."
+    )
+    st.sidebar.slider(
+        "Radio de búsqueda (km):",
+        min_value=5,
+        max_value=200,
+        value=DEFAULT_RADIUS_KM,
+        step=5,
+        key="location_radius_km",
+        disabled=(selected_city == ALL_LOCATIONS)
+    )
+    location_key, selected_positions = selected_location(df_data, data_signature)
+
     # --- Aplicar Filtros ---
-    df_filtered = df_data[df_data['sentiment'].isin(selected_sentiments)]
-    df_filtered = df_filtered[df_filtered['rating'] >= min_rating]
-    df_filtered = df_filtered[df_filtered['rating'] <= max_rating]
+    # Una sola pasada sobre el índice precalculado; se materializa una única copia
+    with stage("Filtrado de negocios"):
+        filters = business_filters(selected_sentiments, min_rating, max_rating, selected_positions)
+        positions = filter_business_positions(df_data, filters, data_signature, backend)
+        df_filtered = df_data.take(positions)
 
     # --- Botón de Descarga ---
-    
-    # 1. Convertir el DataFrame filtrado a CSV
-    csv_data = convert_df_to_csv(df_filtered)
+    # El archivo se genera solo al hacer clic (callable) y se memoriza por firma de filtros,
+    # así mover un filtro ya no serializa la tabla completa.
     
     # Separador visual en el sidebar
     st.sidebar.markdown("---") 
 
+    # 1. Elegir el formato de exportación
+    export_format = st.sidebar.selectbox(
+        "Formato de descarga:",
+        options=list(EXPORT_FORMATS),
+        format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+        key="export_format_selector"
+    )
+    _, extension, mime = EXPORT_FORMATS[export_format]
+    filter_signature = None
+    if data_signature is not None:
+        filter_signature = (data_signature, tuple(selected_sentiments), min_rating, max_rating, location_key)
+
     # 2. Agregar el botón de descarga a la barra lateral
     st.sidebar.download_button(
-        label="Descargar Datos Filtrados (.csv) ⬇️",
-        data=csv_data,
-        file_name='shiny_stats_datos_filtrados.csv',
-        mime='text/csv',
+        label="Descargar Datos Filtrados ⬇️",
+        data=lazy_export(df_filtered, filter_signature, export_format),
+        file_name=f'shiny_stats_datos_filtrados{extension}',
+        mime=mime,
+        on_click="ignore",
         help="Descarga la base de datos de negocios con los filtros de la barra lateral aplicados."
     )
 
@@ -128,13 +203,7 @@ def create_sidebar_filter(df_data):
     2025 Universidad Panamericana
     """)
 
-    COLOR_MAPPING = {
-    'Positivo': [0, 128, 0, 180],    # Verde
-    'Negativo': [255, 0, 0, 180],    # Rojo
-    'Neutral': [255, 255, 0, 180],   # Amarillo
-    }
-
-    # Añadir la columna RGB para PyDeck
-    df_filtered['color'] = df_filtered['sentiment'].apply(lambda x: COLOR_MAPPING[x])
+    # Añadir la columna RGB para PyDeck (lectura directa de la tabla de colores)
+    df_filtered['color'] = sentiment_colors(get_filter_index(df_data, data_signature), positions)
 
     return df_filtered
\ No newline at end of file
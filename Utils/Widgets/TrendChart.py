@@ -0,0 +1,133 @@
+import streamlit as st
+import numpy as np
+
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data import DataLoader as data_loader
+from Utils.Data.TrendEngine import GRANULARITIES, TREND_COLUMNS, get_trend_rollups, trend_series
+
+# --- Variables Globales ---
+TREND_SCOPES = {
+    "Negocios filtrados": 'business',
+    "Ciudad": 'city',
+    "Negocios específicos": 'selected',
+}
+
+SHARE_LABELS = {
+    'positive_share': 'Positivo',
+    'neutral_share': 'Neutral',
+    'negative_share': 'Negativo',
+}
+
+# --------------------------------------------------------------------------------------
+# DATOS DE TENDENCIAS (rollups precalculados una vez por versión de los datasets)
+# --------------------------------------------------------------------------------------
+def load_trend_rollups(df_businesses, business_signature=None, backend=None):
+    """
+    Rollups día/semana/mes de las reseñas, agregados por negocio de `df_businesses` y por ciudad.
+    Con `backend` se agregan en la base analítica sin cargar las reseñas.
+    """
+    if backend is not None:
+        return get_trend_rollups(None, df_businesses, business_signature, backend=backend)
+    try:
+        reviews = data_loader.load_reviews_data(columns=TREND_COLUMNS)
+        reviews_signature = data_loader.dataset_signature(data_loader.REVIEWS_FILE)
+    except FileNotFoundError:
+        st.error("Error: El archivo 'reviews_final_with_sentiment.csv' no se encontró. Asegúrate de que esté en la carpeta 'Datasets'.")
+        return None
+    signature = None if business_signature is None else (reviews_signature, business_signature)
+    return get_trend_rollups(reviews, df_businesses, signature)
+
+# --------------------------------------------------------------------------------------
+# DASHBOARD DE TENDENCIAS
+# --------------------------------------------------------------------------------------
+def show_trend_dashboard(df_businesses, df_filtered, business_signature=None, backend=None):
+    """
+    Evolución del rating promedio y de la proporción de sentimientos en el tiempo.
+    El índice de `df_filtered` debe ser la posición de cada negocio en `df_businesses`
+    (como lo devuelve la barra lateral).
+    """
+    st.header("📈 Tendencias de Reputación en el Tiempo")
+
+    with stage("Rollups de tendencias"), st.spinner("Calculando tendencias..."):
+        rollups = load_trend_rollups(df_businesses, business_signature, backend)
+    if rollups is None or rollups['first_date'] is None:
+        st.warning("No hay reseñas con fecha para calcular tendencias.")
+        return
+
+    col_granularity, col_scope = st.columns(2)
+    with col_granularity:
+        granularity = st.radio(
+            "Agrupar por:",
+            options=list(GRANULARITIES),
+            format_func=GRANULARITIES.get,
+            index=2,
+            horizontal=True,
+            key="trend_granularity"
+        )
+    with col_scope:
+        scope = TREND_SCOPES[st.radio(
+            "Ámbito:",
+            options=list(TREND_SCOPES),
+            horizontal=True,
+            key="trend_scope"
+        )]
+
+    start, end = st.slider(
+        "Rango de fechas:",
+        min_value=rollups['first_date'],
+        max_value=rollups['last_date'],
+        value=(rollups['first_date'], rollups['last_date']),
+        format="YYYY-MM-DD",
+        key="trend_date_range"
+    )
+
+    # --- Selección de entidades (posiciones de negocios o códigos de ciudad) ---
+    if scope == 'city':
+        city = st.selectbox("Ciudad:", options=rollups['cities'], key="trend_city")
+        entity_scope, entities = 'city', [rollups['cities'].index(city)]
+        scope_label = city
+    elif scope == 'selected':
+        names = df_businesses['name'].astype(str)
+        chosen = st.multiselect(
+            "Negocios (p. ej. competidores):",
+            options=np.arange(len(df_businesses)),
+            format_func=lambda pos: f"{names.iat[pos]} ({df_businesses['city'].iat[pos]})",
+            key="trend_businesses"
+        )
+        if not chosen:
+            st.info("Selecciona uno o más negocios para ver su tendencia.")
+            return
+        entity_scope, entities = 'business', chosen
+        scope_label = f"{len(chosen)} negocio(s) seleccionados"
+    else:
+        entity_scope, entities = 'business', df_filtered.index.to_numpy()
+        scope_label = f"{len(df_filtered)} negocios filtrados"
+
+    with stage("Serie de tendencias"):
+        series = trend_series(rollups, granularity, start, end, entity_scope, entities)
+
+    total_reviews = int(series['reviews'].sum())
+    if total_reviews == 0:
+        st.warning(f"No hay reseñas de {scope_label} en el rango seleccionado.")
+        return
+
+    # --- Indicadores del rango ---
+    col_reviews, col_rating, col_negative = st.columns(3)
+    col_reviews.metric("Reseñas en el rango", f"{total_reviews:,}")
+    rated_reviews = int(series['rated'].sum())
+    col_rating.metric(
+        "Rating promedio",
+        "—" if rated_reviews == 0 else f"{series['rating_sum'].sum() / rated_reviews:.2f} ⭐",
+        help="Promedio de las reseñas con rating (sin contar las que no lo tienen)."
+    )
+    col_negative.metric("Reseñas negativas", f"{series['negative'].sum() / total_reviews:.1%}")
+
+    # --- Gráficas ---
+    st.subheader(f"Rating promedio por {GRANULARITIES[granularity].lower()} ({scope_label})")
+    st.line_chart(series[['mean_rating']].rename(columns={'mean_rating': 'Rating promedio'}))
+
+    st.subheader("Proporción de sentimientos")
+    st.area_chart(
+        series[list(SHARE_LABELS)].rename(columns=SHARE_LABELS).fillna(0.0),
+        color=["#008000", "#FFD700", "#FF0000"]
+    )
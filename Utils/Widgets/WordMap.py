@@ -1,128 +1,163 @@
+from collections import Counter
+from io import BytesIO
+
 import streamlit as st
 import pandas as pd
-from wordcloud import WordCloud, STOPWORDS
-import matplotlib.pyplot as plt
-import re
-from collections import Counter
-from nltk.util import ngrams
-
-# Definición de Stopwords en inglés
-# Combinamos las STOPWORDS estándar con términos comunes en el contexto de detailing/reseñas
-ENGLISH_STOPWORDS = set(STOPWORDS) | {
-    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
-    'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
-    'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
-    'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 
-    'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 
-    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 
-    'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 
-    'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 
-    'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 
-    'through', 'during', 'before', 'after', 'above', 'below', 'to', 
-    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 
-    'again', 'further', 'then', 'once', 'here', 'there', 'when', 
-    'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 
-    'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 
-    'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 
-    'can', 'will', 'just', 'don', 'should', 'now',
-    
-    # Palabras específicas del contexto de detailing que probablemente no aportan valor
-    'car', 'vehicle', 'auto', 'truck', 'my car', 'service', 'time', 
-    'place', 'shop', 'job', 'they', 'get', 'got', 'day', 'work', 
-    'did', 'was', 'were', 'really', 'much', 'so', 'had', 'looks',
-    'new', 'definitely', 'like', 'would', 'also', 'back', 'detailing', 'detail', 'great', 'good', 'amazing'
-}
-
-def load_reviews_data():
-    """Carga y limpia el dataset de reseñas con sentimiento."""
+
+from Utils.Benchmarks.Instrumentation import stage
+from Utils.Data import DataLoader as data_loader
+# Las stopwords viven en la capa de datos (NgramIndex); se reexportan para los widgets
+from Utils.Data.NgramIndex import ENGLISH_STOPWORDS, STOPWORDS_VERSION, get_reviews_ngram_index, ngram_frequencies, text_ngrams, tokenize
+from Utils.Data.Queries import review_doc_mask, review_ngram_frequencies
+
+WORDCLOUD_MAX_WORDS = 100
+# Máximo de imágenes renderizadas en caché (LRU por combinación de filtros)
+WORDCLOUD_CACHE_ENTRIES = 32
+# Términos del WordCloud ofrecidos como atajo a la búsqueda de reseñas (ReviewSearch.py)
+SEARCH_SHORTCUT_TERMS = 12
+REVIEW_SEARCH_KEY = "review_search_query"
+
+def load_reviews_data(columns=data_loader.WORD_MAP_COLUMNS):
+    """
+    Carga el dataset de reseñas con sentimiento (cacheado y tipado en DataLoader).
+    Por defecto solo lee las columnas que usa el Word Map.
+    """
     try:
-        # Usamos el dataset reviews_con_sentimiento.csv como lo solicitaste
-        df = pd.read_csv('Datasets/reviews_final_with_sentiment.csv')
-        
-        # Estandarizar la columna 'sentiment'
-        df['sentiment'] = df['sentiment'].str.title()
-        
-        # Asegurar que la columna de texto exista y sea una cadena
-        df['text'] = df['text'].astype(str)
-        return df
+        with st.spinner("Cargando reseñas..."):
+            return data_loader.load_reviews_data(columns=columns)
     except FileNotFoundError:
-        st.error("Error: El archivo 'reviews_con_sentimiento.csv' no se encontró. Asegúrate de que esté en la carpeta 'Datasets'.")
+        st.error("Error: El archivo 'reviews_final_with_sentiment.csv' no se encontró. Asegúrate de que esté en la carpeta 'Datasets'.")
         return pd.DataFrame()
 
 def generate_ngrams(text, n=1, stopwords=set()):
     """Genera n-gramas a partir de un texto y cuenta su frecuencia."""
-    # Limpiar y tokenizar el texto
-    words = re.findall(r'\b\w+\b', text.lower())
-    
-    # Filtrar stopwords
-    filtered_words = [word for word in words if word not in stopwords and not word.isdigit()]
-    
-    if n == 1:
-        # Para unigramas, el conteo es directo
-        return Counter(filtered_words)
-    else:
-        # Para n-gramas > 1
-        n_grams = ngrams(filtered_words, n)
-        # Unir las tuplas de n-gramas en cadenas
-        gram_strings = [' '.join(grams) for grams in n_grams]
-        return Counter(gram_strings)
+    # Limpiar, tokenizar y filtrar stopwords (mismo tokenizador que el índice de n-gramas)
+    filtered_words = tokenize(text, stopwords)
+    return Counter(text_ngrams(filtered_words, n))
+
+@st.cache_data(max_entries=WORDCLOUD_CACHE_ENTRIES, show_spinner="Generando mapa de palabras...")
+def render_wordcloud_png(selected_sentiment, ngram_n, stopwords_ver, data_signature, scope_key, _ngram_freqs):
+    """
+    Renderiza el WordCloud a bytes PNG. El caché (acotado, LRU) usa como llave los
+    filtros (sentimiento, n-grama y ubicación), la versión de stopwords y la firma de
+    los datos; las frecuencias no se hashean porque quedan determinadas por esos argumentos.
+    """
+    # Importaciones pesadas diferidas al primer render (wordcloud y matplotlib)
+    from wordcloud import WordCloud
+    from matplotlib.figure import Figure
+
+    wordcloud = WordCloud(
+        background_color="white",
+        width=800,
+        height=400,
+        colormap='viridis',
+        max_words=WORDCLOUD_MAX_WORDS
+    ).generate_from_frequencies(_ngram_freqs)
+
+    # Se usa Figure directamente (no pyplot): la figura no queda registrada en el
+    # estado global de matplotlib y se libera al salir de la función.
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+def _send_term_to_search():
+    """Copia el término elegido bajo el WordCloud al cuadro de búsqueda de reseñas."""
+    term = st.session_state.get("wordmap_term_pick")
+    if term:
+        st.session_state[REVIEW_SEARCH_KEY] = term
+
+def show_search_shortcuts(ngram_freqs):
+    """Los términos más frecuentes como botones: al elegir uno se buscan sus reseñas."""
+    top_terms = sorted(ngram_freqs, key=ngram_freqs.get, reverse=True)[:SEARCH_SHORTCUT_TERMS]
+    st.pills(
+        "Ver las reseñas que mencionan:",
+        options=top_terms,
+        selection_mode="single",
+        key="wordmap_term_pick",
+        on_change=_send_term_to_search,
+        help="El término se copia a la búsqueda de reseñas (más abajo)."
+    )
+
+def show_backend_word_map(backend, selected_sentiment, ngram_n, business_ids=None, scope_key=None):
+    """Word Map con las frecuencias agregadas en el backend analítico (sin cargar reseñas)."""
+    title_suffix = "Todas las Reseñas" if selected_sentiment == "Todas" else f"Emoción: {selected_sentiment}"
+    if business_ids is not None and scope_key:
+        title_suffix += f" | {scope_key[0]} ({scope_key[1]} km)"
+    st.subheader(f"📈 Tendencias de Frases Clave ({title_suffix})")
 
-def show_word_map(df_reviews, selected_sentiment, ngram_n):
+    with stage("Conteo de n-gramas"):
+        ngram_freqs = review_ngram_frequencies(
+            None, ngram_n, None if selected_sentiment == "Todas" else selected_sentiment,
+            business_ids, top_k=WORDCLOUD_MAX_WORDS, backend=backend
+        )
+    if not ngram_freqs:
+        st.info(f"No se encontraron {ngram_n}-gramas para mostrar con los filtros aplicados.")
+        return
+
+    with stage("WordCloud (layout y PNG)"):
+        png_bytes = render_wordcloud_png(
+            selected_sentiment, ngram_n, STOPWORDS_VERSION, backend['signature'], scope_key, ngram_freqs
+        )
+    st.image(png_bytes, width="stretch")
+
+
+def show_word_map(df_reviews, selected_sentiment, ngram_n, business_ids=None, scope_key=None):
     """
     Genera y muestra el WordCloud para el sentimiento y n-grama seleccionados.
+    `business_ids` limita las reseñas a esos negocios (filtro de ubicación) y
+    `scope_key` identifica ese filtro en el caché de imágenes.
     """
     if df_reviews.empty:
         st.warning("No se puede generar el mapa de palabras: el DataFrame de reseñas está vacío.")
         return
 
-    # 1. Filtrar reseñas por el sentimiento seleccionado
+    # 1. Filtrar reseñas por el sentimiento seleccionado (y la ubicación, si aplica)
     if selected_sentiment == "Todas":
-        df_filtered = df_reviews
+        doc_mask = review_doc_mask(df_reviews, None, business_ids)
         title_suffix = "Todas las Reseñas"
     else:
-        df_filtered = df_reviews[df_reviews['sentiment'] == selected_sentiment]
+        doc_mask = review_doc_mask(df_reviews, selected_sentiment, business_ids)
         title_suffix = f"Emoción: {selected_sentiment}"
 
+    if business_ids is not None and scope_key:
+        title_suffix += f" | {scope_key[0]} ({scope_key[1]} km)"
+
     st.subheader(f"📈 Tendencias de Frases Clave ({title_suffix})")
 
-    if df_filtered.empty:
+    if doc_mask is not None and not doc_mask.any():
         st.info(f"No hay reseñas con sentimiento '{selected_sentiment}' para generar el mapa de palabras.")
         return
 
-    # 2. Concatenar todo el texto
-    text_combined = " ".join(review for review in df_filtered['text'])
-
-    if not text_combined.strip():
-        st.info("El texto filtrado está vacío o solo contiene caracteres de espacio.")
-        return
-
-    # 3. Generar n-gramas y sus frecuencias
-    ngram_freqs = generate_ngrams(text_combined, n=ngram_n, stopwords=ENGLISH_STOPWORDS)
+    # 2. Obtener las frecuencias del índice precalculado de n-gramas
+    # (las reseñas se tokenizan una sola vez; aquí solo se suman vectores dispersos)
+    with stage("Índice de n-gramas"), st.spinner("Indexando n-gramas de las reseñas..."):
+        ngram_index = get_reviews_ngram_index(df_reviews['text'], ENGLISH_STOPWORDS)
+    with stage("Conteo de n-gramas"):
+        ngram_freqs = ngram_frequencies(ngram_index, ngram_n, doc_mask=doc_mask, top_k=WORDCLOUD_MAX_WORDS)
 
     if not ngram_freqs:
         st.info(f"No se encontraron {ngram_n}-gramas para mostrar con los filtros aplicados.")
         return
         
-    # 4. Crear el objeto WordCloud a partir de las frecuencias
-    wordcloud = WordCloud(
-        background_color="white",
-        width=800,
-        height=400,
-        colormap='viridis',
-        max_words=100
-    ).generate_from_frequencies(ngram_freqs)
-
-    # 5. Mostrar la imagen en Streamlit
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis("off")
-    st.pyplot(fig)
+    # 3. Renderizar (o recuperar del caché) la imagen y mostrarla en Streamlit
+    with stage("WordCloud (layout y PNG)"):
+        png_bytes = render_wordcloud_png(
+            selected_sentiment, ngram_n, STOPWORDS_VERSION, ngram_index['signature'], scope_key, ngram_freqs
+        )
+    st.image(png_bytes, width="stretch")
+    show_search_shortcuts(ngram_freqs)
 
 
-def word_map_dashboard(df_reviews):
+def word_map_dashboard(df_reviews, business_ids=None, scope_key=None, backend=None):
     """
     Componente del dashboard que permite al usuario seleccionar sentimiento y n-grama
-    y llama a la función de generación del WordCloud.
+    y llama a la función de generación del WordCloud. Con `backend` (AnalyticsBackend)
+    las frecuencias se consultan en la base y `df_reviews` puede ser None.
     """
     st.markdown("---") 
     st.header("🔍 Análisis de Tendencias por Emoción (Word Map)")
@@ -158,4 +193,7 @@ def word_map_dashboard(df_reviews):
         )
 
     # Generar y mostrar el WordCloud
-    show_word_map(df_reviews, selected_sentiment, ngram_n)
+    if backend is not None:
+        show_backend_word_map(backend, selected_sentiment, ngram_n, business_ids=business_ids, scope_key=scope_key)
+    else:
+        show_word_map(df_reviews, selected_sentiment, ngram_n, business_ids=business_ids, scope_key=scope_key)
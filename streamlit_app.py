@@ -1,47 +1,132 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pydeck as pdk
 
-from Utils.Data.GenMockData import generate_mock_data
-from Utils.Widgets.EmotionMap import render_map_viz
+from Utils.Benchmarks.Instrumentation import begin_rerun, discard_rerun, end_rerun, section_stage, stage
+from Utils.Data.AnalyticsBackend import get_analytics_backend
+from Utils.Data.DataLoader import BUSINESS_FILE, REVIEW_SEARCH_COLUMNS, dataset_signature, load_business_data
+from Utils.Data.Ranking import get_score_components
 from Utils.Widgets.EmotionMap import show_emotion_map_dashboard
+from Utils.Widgets.KpiCards import load_business_kpis, show_kpi_cards
 from Utils.Widgets.Sidebar import create_sidebar_filter
-from Utils.Widgets.Leaderboard import show_leaderboard
+from Utils.Widgets.Sidebar import selected_filters, selected_location
+from Utils.Widgets.Leaderboard import load_competitor_complaints, show_leaderboard
+from Utils.Widgets.ReviewSearch import show_review_search
+from Utils.Widgets.TrendChart import show_trend_dashboard
+from Utils.Widgets.DebugPanel import show_debug_panel
 from Utils.Widgets.WordMap import load_reviews_data # Importar la nueva función de carga
 from Utils.Widgets.WordMap import word_map_dashboard # Importar el nuevo dashboard
+from Utils.Widgets.WordMap import ENGLISH_STOPWORDS
 
 # --- Configuración de la Página de Streamlit ---
 st.set_page_config(layout="wide", page_title="Shiny Stats: Dashboard de BI Automotriz", page_icon="🚗")
 
-# --- ENCABEZADO PRINCIPAL ---
-st.title("✨ Shiny Stats: Dashboard de Inteligencia de Negocios Automotriz 🚗")
-st.markdown("""
-    **Transformando el Detailing en Florida con Data Science.**
-    Análisis de sentimientos en reseñas de Yelp para **identificar quejas**, 
-    optimizar la experiencia del cliente y obtener una ventaja competitiva.
-""")
-st.markdown("---") 
-# ---------------------------
+# Instrumentación opcional del rerun (SHINY_STATS_PROFILE=1; ?profile=1 en la URL solo
+# si el servidor define SHINY_STATS_PROFILE_ALLOW_URL=1)
+begin_rerun()
 
-# Cargar los datos de negocios (para Mapa y Leaderboard)
-df_data_businesses = pd.read_csv('Datasets/df_business_with_sentiment.csv') 
+# Si Streamlit interrumpe el script (rerun o stop), el registro se descarta en `finally`
+# para no dejar tracemalloc ni el perfilador encendidos
+try:
+    # --- ENCABEZADO PRINCIPAL ---
+    st.title("✨ Shiny Stats: Dashboard de Inteligencia de Negocios Automotriz 🚗")
+    st.markdown("""
+        **Transformando el Detailing en Florida con Data Science.**
+        Análisis de sentimientos en reseñas de Yelp para **identificar quejas**, 
+        optimizar la experiencia del cliente y obtener una ventaja competitiva.
+    """)
+    st.markdown("---") 
+    # ---------------------------
 
-# Cargar los datos de reseñas (para WordMap)
-df_data_reviews = load_reviews_data()
+    # Cargar los datos de negocios (para Mapa y Leaderboard)
+    # La lectura se cachea por proceso y solo se repite si el CSV cambia en disco.
+    with stage("Carga de negocios"), st.spinner("Cargando negocios..."):
+        df_data_businesses = load_business_data()
+        business_signature = dataset_signature(BUSINESS_FILE)
 
+    # Backend analítico opcional (SHINY_STATS_BACKEND=duckdb|sqlite): filtros, ranking,
+    # frecuencias del Word Map, conteos de reseñas (KPIs, mapa de calor) y tendencias se
+    # resuelven en la base y las reseñas no se cargan en memoria
+    with stage("Backend analítico"), st.spinner("Preparando la base analítica..."):
+        analytics_backend = get_analytics_backend(ENGLISH_STOPWORDS)
 
-# 1. Sidebar y Filtrado para el Mapa
-# La barra lateral filtra 'df_data_businesses' (negocios)
-df_filtered_businesses = create_sidebar_filter(df_data_businesses)
+    # Cargar los datos de reseñas (para WordMap y la búsqueda de reseñas)
+    with stage("Carga de reseñas"):
+        df_data_reviews = load_reviews_data(REVIEW_SEARCH_COLUMNS) if analytics_backend is None else None
 
-# 2. Mostrar el dashboard del mapa de emociones (usa df_filtered_businesses)
-show_emotion_map_dashboard(df_filtered_businesses)
 
-# 3. Word Map de Tendencias (usa df_data_reviews)
-st.markdown("---") # Separador para mejor visualización
-word_map_dashboard(df_data_reviews)
+    # --------------------------------------------------------------------------------------
+    # SECCIONES (st.fragment)
+    # Cada sección se vuelve a ejecutar sola cuando cambian sus propios controles, con los
+    # argumentos del último rerun completo; sus dependencias de datos son explícitamente esos
+    # argumentos. Los filtros de la barra lateral son la entrada compartida: al cambiarlos
+    # se vuelve a ejecutar el script completo (y con él todas las secciones).
+    # --------------------------------------------------------------------------------------
+    @st.fragment
+    def emotion_map_section(df_filtered, backend):
+        with section_stage("Mapa de emociones"):
+            show_emotion_map_dashboard(df_filtered, backend)
 
-# 4. Leaderboard de Ranking (usa df_filtered_businesses)
-st.markdown("---") # Separador para mejor visualización
-show_leaderboard(df_filtered_businesses)
+
+    @st.fragment
+    def reviews_section(df_reviews, df_businesses, business_ids, scope_key, backend):
+        # Word Map y búsqueda comparten sección: elegir un término de la nube llena la búsqueda
+        with section_stage("Word Map"):
+            word_map_dashboard(df_reviews, business_ids=business_ids, scope_key=scope_key, backend=backend)
+        with section_stage("Búsqueda de reseñas"):
+            show_review_search(df_reviews, df_businesses, business_ids=business_ids)
+
+
+    @st.fragment
+    def trend_section(df_businesses, df_filtered, signature, backend):
+        with section_stage("Tendencias"):
+            show_trend_dashboard(df_businesses, df_filtered, signature, backend)
+
+
+    @st.fragment
+    def leaderboard_section(df_filtered, score_components, backend, filters, df_reviews):
+        with section_stage("Leaderboard"):
+            # Quejas por negocio precalculadas (ComplaintEngine), sin recorrer texto al dibujar
+            with stage("Quejas por negocio"), st.spinner("Extrayendo quejas por negocio..."):
+                complaints = load_competitor_complaints(df_reviews, backend)
+            show_leaderboard(df_filtered, score_components, backend=backend, filters=filters, complaints=complaints)
+
+
+    # 1. Sidebar y Filtrado para el Mapa
+    # La barra lateral filtra 'df_data_businesses' (negocios)
+    with stage("Barra lateral"):
+        df_filtered_businesses = create_sidebar_filter(df_data_businesses, business_signature, analytics_backend)
+        location_key, location_positions = selected_location(df_data_businesses, business_signature)
+        location_business_ids = None
+        if location_positions is not None:
+            location_business_ids = df_data_businesses['business_id'].to_numpy()[location_positions]
+        sidebar_filters = selected_filters(df_data_businesses, business_signature)
+
+    # 1b. KPIs de los negocios filtrados (se suman celdas del cubo de agregados precalculado)
+    with stage("KPIs"):
+        show_kpi_cards(load_business_kpis(df_data_businesses, sidebar_filters, business_signature, analytics_backend))
+
+    # 2. Mostrar el dashboard del mapa de emociones (usa df_filtered_businesses)
+    emotion_map_section(df_filtered_businesses, analytics_backend)
+
+    # 3. Word Map de Tendencias y búsqueda (usa df_data_reviews, limitado a la ubicación elegida)
+    st.markdown("---") # Separador para mejor visualización
+    reviews_section(df_data_reviews, df_data_businesses, location_business_ids, location_key, analytics_backend)
+
+    # 4. Tendencias en el tiempo (rollups precalculados de reseñas, por negocio y ciudad)
+    st.markdown("---") # Separador para mejor visualización
+    trend_section(df_data_businesses, df_filtered_businesses, business_signature, analytics_backend)
+
+    # 5. Leaderboard de Ranking (usa df_filtered_businesses)
+    st.markdown("---") # Separador para mejor visualización
+    # Los componentes del score se calculan una vez sobre el dataset completo
+    leaderboard_section(
+        df_filtered_businesses,
+        get_score_components(df_data_businesses, business_signature),
+        analytics_backend,
+        sidebar_filters if analytics_backend else None,
+        df_data_reviews,
+    )
+
+    # Panel de depuración con el desglose del rerun (solo con la instrumentación activa)
+    show_debug_panel(end_rerun(), tables={'Negocios': df_data_businesses, 'Reseñas': df_data_reviews})
+finally:
+    discard_rerun()